@@ -340,9 +340,12 @@ class Annotator(TaskModel):
         """
         from texta_elastic.core import ElasticCore
 
+        from toolkit.elastic.index.field_cache import invalidate_field_cache
+
         ec = ElasticCore()
         for index in indices:
             ec.add_annotator_mapping(index)
+        invalidate_field_cache(indices)
 
 
     @staticmethod
@@ -354,9 +357,12 @@ class Annotator(TaskModel):
         """
         from texta_elastic.core import ElasticCore
 
+        from toolkit.elastic.index.field_cache import invalidate_field_cache
+
         ec = ElasticCore()
         for index in indices:
             ec.add_texta_meta_mapping(index)
+        invalidate_field_cache(indices)
 
 
 class AnnotatorGroup(models.Model):
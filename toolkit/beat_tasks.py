@@ -5,5 +5,9 @@ from toolkit.taskman import app
 @app.task(bind=True, base=BaseTask, name="sync_indices_in_elasticsearch", ignore_results=True)
 def sync_indices_in_elasticsearch(self):
     from texta_elastic.core import ElasticCore
+    from toolkit.elastic.index.field_cache import refresh_field_cache
+    from toolkit.elastic.index.stats import refresh_stale_index_stats
     ec = ElasticCore()
     ec.syncher()
+    refresh_field_cache()
+    refresh_stale_index_stats()
@@ -22,6 +22,7 @@ DEFAULT_LEARNING_RATE = 2e-5
 DEFAULT_EPS = 1e-8
 DEFAULT_MAX_LENGTH = 64
 DEFAULT_BATCH_SIZE = 32
+DEFAULT_INFERENCE_BATCH_SIZE = 32
 DEFAULT_BERT_MODEL = get_default_bert_model("bert-base-multilingual-cased")
 DEFAULT_NEGATIVE_MULTIPLIER = 1.0
 DEFAULT_REPORT_IGNORE_FIELDS = ["true_positive_rate", "false_positive_rate"]
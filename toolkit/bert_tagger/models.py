@@ -7,6 +7,7 @@ import tempfile
 import zipfile
 from typing import Dict, List, Union
 
+import torch
 from django.contrib.auth.models import User
 from django.core import serializers
 from django.db import models, transaction
@@ -14,6 +15,7 @@ from django.dispatch import receiver
 from django.http import HttpResponse
 from texta_bert_tagger.tagger import BertTagger as TextBertTagger
 from texta_elastic.searcher import EMPTY_QUERY
+from torch.utils.data import DataLoader, SequentialSampler, TensorDataset
 
 from toolkit.bert_tagger import choices
 from toolkit.constants import MAX_DESC_LEN
@@ -23,7 +25,13 @@ from toolkit.elastic.index.models import Index
 from toolkit.elastic.tools.feedback import Feedback
 from toolkit.helper_functions import get_core_setting
 from toolkit.model_constants import CommonModelMixin, FavoriteModelMixin
-from toolkit.settings import (BASE_DIR, BERT_CACHE_DIR, BERT_FINETUNED_MODEL_DIRECTORY, BERT_PRETRAINED_MODEL_DIRECTORY, CELERY_LONG_TERM_TASK_QUEUE)
+from toolkit.settings import (BASE_DIR, BERT_CACHE_DIR, BERT_FINETUNED_MODEL_DIRECTORY, BERT_PRETRAINED_MODEL_DIRECTORY, BERT_TAGGER_CACHE_MAX_ENTRIES, BERT_TAGGER_CACHE_MAX_SIZE_MB,
+                              CELERY_LONG_TERM_TASK_QUEUE)
+from toolkit.tools.model_cache import ModelCache
+
+
+# Global object for the process so tagger models won't get reloaded on each prediction.
+BERT_TAGGER_CACHE = ModelCache("BERT Tagger Cache", max_entries=BERT_TAGGER_CACHE_MAX_ENTRIES, max_size_mb=BERT_TAGGER_CACHE_MAX_SIZE_MB)
 
 
 class BertTagger(FavoriteModelMixin, CommonModelMixin):
@@ -214,6 +222,21 @@ class BertTagger(FavoriteModelMixin, CommonModelMixin):
         return tagger
 
 
+    @staticmethod
+    def estimate_memory_mb(tagger: TextBertTagger) -> float:
+        """Estimates the memory used by the weights of a loaded BERT tagger."""
+        return sum(param.numel() * param.element_size() for param in tagger.model.parameters()) / 1024 ** 2
+
+
+    def load_cached_tagger(self):
+        """
+        Load BERT tagger from the process cache, falls back to the disc.
+        Name of the model file changes on every retrain, hence it is used as the version of the cached model.
+        """
+        version = (self.model.name, self.use_gpu)
+        return BERT_TAGGER_CACHE.get(self.pk, version, self.load_tagger, size_mb=self.estimate_memory_mb)
+
+
     def apply_loaded_tagger(self, tagger: TextBertTagger, tagger_input: Union[str, Dict], input_type: str = "text", feedback: bool = False):
         """Apply loaded BERT tagger to doc or text."""
         # tag doc or text
@@ -237,12 +260,43 @@ class BertTagger(FavoriteModelMixin, CommonModelMixin):
         return prediction
 
 
+    def apply_loaded_tagger_on_texts(self, tagger: TextBertTagger, texts: List[str], batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE) -> List[dict]:
+        """
+        Apply loaded BERT tagger to a batch of texts.
+        Texts are tokenized and padded together and the model runs one forward pass per mini-batch,
+        predictions are returned in the order of the input texts.
+        """
+        if not texts:
+            return []
+        input_ids, attention_masks, _ = tagger.tokenize(texts)
+        dataset = TensorDataset(input_ids, attention_masks)
+        iterator = DataLoader(dataset, sampler=SequentialSampler(dataset), batch_size=batch_size)
+        # Put model in evaluation mode
+        tagger.model.eval()
+
+        predictions = []
+        for b_input_ids, b_input_mask in iterator:
+            with torch.no_grad():
+                outputs = tagger.model(b_input_ids.to(tagger.device), token_type_ids=None, attention_mask=b_input_mask.to(tagger.device))
+            probabilities = outputs["logits"].detach().cpu().softmax(1)
+            for text_probabilities in probabilities:
+                label_index = int(text_probabilities.argmax())
+                predictions.append({
+                    'probability': float(text_probabilities[label_index]),
+                    'tagger_id': self.id,
+                    'result': tagger.config.label_reverse_index[label_index]
+                })
+        return predictions
+
+
 @receiver(models.signals.post_delete, sender=BertTagger)
 def auto_delete_bert_tagger_on_delete(sender, instance: BertTagger, **kwargs):
     """
     Delete resources on the file-system upon BertTagger deletion.
     Triggered on individual model object and queryset BertTagger deletion.
     """
+    BERT_TAGGER_CACHE.invalidate(instance.pk)
+
     if instance.model:
         if os.path.isfile(instance.model.path):
             os.remove(instance.model.path)
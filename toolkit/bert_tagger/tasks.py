@@ -7,44 +7,29 @@ from typing import Dict, List, Union
 
 from celery.decorators import task
 from django.db import connections
-from elasticsearch.helpers import streaming_bulk
 from texta_bert_tagger.tagger import BertTagger
 from texta_elastic.core import ElasticCore
-from texta_elastic.document import ElasticDocument
-from texta_elastic.searcher import ElasticSearcher
 
 from toolkit.base_tasks import BaseTask, TransactionAwareTask
 from toolkit.bert_tagger import choices
-from toolkit.bert_tagger.models import BertTagger as BertTaggerObject
+from toolkit.bert_tagger.models import BERT_TAGGER_CACHE, BertTagger as BertTaggerObject
+from toolkit.elastic.tools.apply_to_index import index_applier
 from toolkit.elastic.tools.data_sample import DataSample
+from toolkit.elastic.tools.tasks import apply_to_index
 from toolkit.helper_functions import get_indices_from_object
-from toolkit.settings import BERT_CACHE_DIR, BERT_FINETUNED_MODEL_DIRECTORY, BERT_PRETRAINED_MODEL_DIRECTORY, CELERY_LONG_TERM_TASK_QUEUE, ERROR_LOGGER, INFO_LOGGER
+from toolkit.settings import BERT_CACHE_DIR, BERT_FINETUNED_MODEL_DIRECTORY, BERT_PRETRAINED_MODEL_DIRECTORY, CELERY_LONG_TERM_TASK_QUEUE, INFO_LOGGER
 from toolkit.tools.plots import create_tagger_plot
 from toolkit.tools.show_progress import ShowProgress
 
 
-# Global object for the worker so tagger models won't get reloaded on each task
-# Essentially an indefinite cache
-PERSISTENT_BERT_TAGGERS = {}
-
-
 @task(name="apply_persistent_bert_tagger", base=BaseTask)
 def apply_persistent_bert_tagger(tagger_input: Union[str, Dict], tagger_id: int, input_type: str = 'text', feedback: bool = False):
     """
-    Task to use Bert models stored in memory for fast re-use.
-    Stores models in dict.
+    Task to use Bert models stored in the memory of the worker for fast re-use.
+    Models are kept in the bounded cache of the worker process.
     """
-    global PERSISTENT_BERT_TAGGERS
     tagger_object = BertTaggerObject.objects.get(id=tagger_id)
-    try:
-        # load tagger object into cache if not there
-        if tagger_id not in PERSISTENT_BERT_TAGGERS:
-            PERSISTENT_BERT_TAGGERS[tagger_id] = tagger_object.load_tagger()
-        # select loaded tagger from cache
-        loaded_tagger = PERSISTENT_BERT_TAGGERS[tagger_id]
-        return tagger_object.apply_loaded_tagger(loaded_tagger, tagger_input, input_type=input_type, feedback=feedback)
-    except Exception as e:
-        raise
+    return apply_tagger(tagger_object, tagger_input, input_type=input_type, feedback=feedback)
 
 
 @task(name="train_bert_tagger", base=TransactionAwareTask)
@@ -171,6 +156,9 @@ def train_bert_tagger(tagger_id, testing=False):
         # declare the job done
         task_object.complete()
 
+        # Drop the previous model from the cache of this process, other processes notice the new model name.
+        BERT_TAGGER_CACHE.invalidate(tagger_id)
+
         # Cleanup after the transaction to ensure integrity database records.
         if model_path and model_path.exists():
             model_path.unlink(missing_ok=True)
@@ -184,9 +172,9 @@ def train_bert_tagger(tagger_id, testing=False):
 
 
 def apply_tagger(tagger_object: BertTaggerObject, tagger_input: Union[str, Dict], input_type: str = 'text', feedback: bool = False):
-    """ Apply BERT tagger on a text or a document. Wraps functions load_tagger and apply_loaded_tagger."""
-    # Load tagger
-    tagger = tagger_object.load_tagger()
+    """ Apply BERT tagger on a text or a document. Wraps functions load_cached_tagger and apply_loaded_tagger."""
+    # Load tagger from the process cache or the disc
+    tagger = tagger_object.load_cached_tagger()
     # Predict with the loaded tagger
     prediction = tagger_object.apply_loaded_tagger(tagger, tagger_input, input_type, feedback)
     return prediction
@@ -207,74 +195,59 @@ def to_texta_facts(tagger_result: List[Dict[str, Union[str, int, bool]]], field:
     return [new_fact]
 
 
-def update_generator(generator: ElasticSearcher, ec: ElasticCore, fields: List[str], fact_name: str, fact_value: str, tagger_object: BertTaggerObject, tagger: BertTagger = None):
-    for i, scroll_batch in enumerate(generator):
-        logging.getLogger(INFO_LOGGER).info(f"Appyling BERT Tagger with ID {tagger_object.id} to batch {i + 1}...")
-        for raw_doc in scroll_batch:
-            hit = raw_doc["_source"]
-            flat_hit = ec.flatten(hit)
-            existing_facts = hit.get("texta_facts", [])
+def apply_tagger_on_batch(tagger_object: BertTaggerObject, tagger: BertTagger, flat_hits: List[dict], fields: List[str], inference_batch_size: int) -> Dict[tuple, dict]:
+    """
+    Applies loaded tagger on every field of every document in the scroll batch in mini-batches of inference_batch_size.
+    Returns predictions keyed by the position of the document in the batch and the field name.
+    """
+    positions = []
+    texts = []
+    for doc_index, flat_hit in enumerate(flat_hits):
+        for field in fields:
+            text = flat_hit.get(field, None)
+            if text and isinstance(text, str):
+                positions.append((doc_index, field))
+                texts.append(text)
+
+    predictions = tagger_object.apply_loaded_tagger_on_texts(tagger, texts, batch_size=inference_batch_size)
+    return dict(zip(positions, predictions))
 
-            for field in fields:
-                text = flat_hit.get(field, None)
-                if text and isinstance(text, str):
 
-                    result = tagger_object.apply_loaded_tagger(tagger, text, input_type="text", feedback=False)
+@index_applier("bert_tagger")
+def get_tagger_batch_function(object_id: int, fields: List[str], fact_name: str, fact_value: str, inference_batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE):
+    tagger_object = BertTaggerObject.objects.get(pk=object_id)
+    tagger = tagger_object.load_cached_tagger()
+    ec = ElasticCore()
 
-                    # If tagger is binary and fact value is not specified by the user, use tagger description as fact value
-                    if result["result"] in ["true", "false"]:
-                        if not fact_value:
-                            fact_value = tagger_object.description
 
-                    # For multitag, use the prediction as fact value
-                    else:
-                        fact_value = result["result"]
+    def process_batch(sources: List[dict]) -> List[List[dict]]:
+        logging.getLogger(INFO_LOGGER).info(f"Appyling BERT Tagger with ID {object_id} to a batch of {len(sources)} documents...")
+        flat_hits = [ec.flatten(source) for source in sources]
+        batch_predictions = apply_tagger_on_batch(tagger_object, tagger, flat_hits, fields, inference_batch_size)
 
-                    new_facts = to_texta_facts(result, field, fact_name, fact_value)
-                    existing_facts.extend(new_facts)
+        batch_facts = [[] for _ in sources]
+        for (doc_index, field), result in batch_predictions.items():
+            # If tagger is binary and fact value is not specified by the user, use tagger description as fact value,
+            # for multitag, use the prediction as fact value.
+            if result["result"] in ["true", "false"]:
+                result_fact_value = fact_value or tagger_object.description
+            else:
+                result_fact_value = result["result"]
+            batch_facts[doc_index].extend(to_texta_facts(result, field, fact_name, result_fact_value))
+        return batch_facts
 
-            if existing_facts:
-                # Remove duplicates to avoid adding the same facts with repetitive use.
-                existing_facts = ElasticDocument.remove_duplicate_facts(existing_facts)
 
-            yield {
-                "_index": raw_doc["_index"],
-                "_id": raw_doc["_id"],
-                "_type": raw_doc.get("_type", "_doc"),
-                "_op_type": "update",
-                "_source": {"doc": {"texta_facts": existing_facts}}
-            }
+    return process_batch
 
 
 @task(name="apply_bert_tagger_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
-def apply_tagger_to_index(object_id: int, indices: List[str], fields: List[str], fact_name: str, fact_value: str, query: dict, bulk_size: int, max_chunk_bytes: int, es_timeout: int):
+def apply_tagger_to_index(object_id: int, indices: List[str], fields: List[str], fact_name: str, fact_value: str, query: dict, bulk_size: int, max_chunk_bytes: int, es_timeout: int, inference_batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE):
     """Apply BERT Tagger to index."""
     try:
         tagger_object = BertTaggerObject.objects.get(pk=object_id)
-        tagger = tagger_object.load_tagger()
-
         task_object = tagger_object.tasks.last()
-        progress = ShowProgress(task_object)
-
-        ec = ElasticCore()
-        [ec.add_texta_facts_mapping(index) for index in indices]
-
-        searcher = ElasticSearcher(
-            indices=indices,
-            field_data=fields + ["texta_facts"],  # Get facts to add upon existing ones.
-            query=query,
-            output=ElasticSearcher.OUT_RAW,
-            timeout=f"{es_timeout}m",
-            callback_progress=progress,
-            scroll_size=bulk_size
-        )
-
-        actions = update_generator(generator=searcher, ec=ec, fields=fields, fact_name=fact_name, fact_value=fact_value, tagger_object=tagger_object, tagger=tagger)
-        for success, info in streaming_bulk(client=ec.es, actions=actions, refresh="wait_for", chunk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, max_retries=3):
-            if not success:
-                logging.getLogger(ERROR_LOGGER).exception(json.dumps(info))
-
-        task_object.complete()
+        applier_kwargs = {"object_id": object_id, "fields": fields, "fact_name": fact_name, "fact_value": fact_value, "inference_batch_size": inference_batch_size}
+        apply_to_index("bert_tagger", applier_kwargs, task_object, indices=indices, fields=fields, query=query, bulk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, es_timeout=es_timeout)
         return True
 
     except Exception as e:
@@ -657,7 +657,8 @@ class BertTaggerObjectViewTests(APITransactionTestCase):
             "new_fact_name": self.new_multiclass_fact_name,
             "new_fact_value": self.new_fact_value,
             "indices": [{"name": self.test_index_copy}],
-            "fields": TEST_FIELD_CHOICE
+            "fields": TEST_FIELD_CHOICE,
+            "inference_batch_size": 8
         }
         response = self.client.post(url, payload, format='json')
         print_output('test_apply_multiclass_bert_tagger_to_index:response.data', response.data)
@@ -277,12 +277,13 @@ class BertTaggerViewSet(viewsets.ModelViewSet, BulkDelete, FeedbackModelView, Fa
             bulk_size = serializer.validated_data["bulk_size"]
             max_chunk_bytes = serializer.validated_data["max_chunk_bytes"]
             es_timeout = serializer.validated_data["es_timeout"]
+            inference_batch_size = serializer.validated_data["inference_batch_size"]
 
             if tagger_object.fact_name:
                 # Disable fact_value usage for multiclass taggers
                 fact_value = ""
 
-            args = (pk, indices, fields, fact_name, fact_value, query, bulk_size, max_chunk_bytes, es_timeout)
+            args = (pk, indices, fields, fact_name, fact_value, query, bulk_size, max_chunk_bytes, es_timeout, inference_batch_size)
             transaction.on_commit(lambda: apply_tagger_to_index.apply_async(args=args, queue=settings.CELERY_LONG_TERM_TASK_QUEUE))
 
             message = "Started process of applying BERT Tagger with id: {}".format(tagger_object.id)
@@ -4,7 +4,6 @@ from typing import List
 from django.contrib.auth.models import User
 from django.db import models
 from rest_framework.exceptions import ValidationError
-from texta_elastic.core import ElasticCore
 
 from toolkit.constants import MAX_DESC_LEN
 
@@ -18,6 +17,8 @@ class Project(models.Model):
     indices = models.ManyToManyField(Index, default=None)
     administrators = models.ManyToManyField(User, related_name="administrators")
     scopes = models.TextField(default=json.dumps([]))
+    # Tasks of the search exports, which have no model of their own.
+    export_tasks = models.ManyToManyField("core.Task", default=None)
 
     created_at = models.DateTimeField(auto_now_add=True, null=True)
     modified_at = models.DateTimeField(auto_now=True, null=True)
@@ -36,9 +37,12 @@ class Project(models.Model):
         """
         Method for retrieving all valid Elasticsearch fields for a given project.
         """
-        if not self.get_indices():
+        from toolkit.elastic.index.field_cache import get_fields
+
+        indices = self.get_indices()
+        if not indices:
             return []
-        field_data = ElasticCore().get_fields(indices=self.get_indices())
+        field_data = get_fields(indices)
         if path_list:
             field_data = [field["path"] for field in field_data]
         return field_data
@@ -15,6 +15,7 @@ from toolkit.core.user_profile.serializers import UserSerializer
 from toolkit.core.user_profile.validators import check_if_username_exist
 from toolkit.elastic.index.models import Index
 from toolkit.elastic.index.serializers import IndexSerializer
+from toolkit.elastic.tools.search_export import EXPORT_FORMATS, EXPORT_FORMAT_JSONL
 from toolkit.elastic.validators import check_for_existence
 from toolkit.helper_functions import wrap_in_list
 from toolkit.serializer_constants import FieldParseSerializer, IndicesSerializerMixin
@@ -24,6 +25,8 @@ class ExportSearcherResultsSerializer(serializers.Serializer):
     indices = serializers.ListField(child=serializers.CharField(), default=[])
     query = serializers.JSONField(help_text="Which query results to fetch.", default=EMPTY_QUERY)
     fields = serializers.ListField(help_text="Which fields to output.", child=serializers.CharField(), default=[])
+    file_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default=EXPORT_FORMAT_JSONL, help_text="Format of the exported file, JSON lines, CSV or Parquet.")
+    compress = serializers.BooleanField(default=False, help_text="Whether to compress the exported file with gzip.")
 
 
 class ProjectSearchByQuerySerializer(serializers.Serializer):
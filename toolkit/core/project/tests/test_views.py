@@ -3,16 +3,18 @@ import pathlib
 import uuid
 import json
 
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
 from texta_elastic.core import ElasticCore
 from time import sleep
 
 from toolkit.core.project.models import Project
+from toolkit.core.task.models import Task
 from toolkit.elastic.index.models import Index
 from toolkit.helper_functions import reindex_test_dataset
-from toolkit.settings import RELATIVE_PROJECT_DATA_PATH, SEARCHER_FOLDER_KEY
+from toolkit.settings import RELATIVE_PROJECT_DATA_PATH, SEARCHER_FOLDER_KEY, TEXTA_TAGS_KEY
 from toolkit.test_settings import REINDEXER_TEST_INDEX, TEST_INDEX, TEST_FACT_NAME, TEST_FIELD, TEST_MATCH_TEXT, TEST_QUERY, TEST_VERSION_PREFIX, VERSION_NAMESPACE
 from toolkit.tools.utils_for_tests import create_test_user, print_output, project_creation
 
@@ -312,47 +314,6 @@ class ProjectViewTests(APITestCase):
         self.assertTrue('num_dataset_importers' in response.data)
 
 
-    def test_search_export(self):
-        payload = {"indices": [TEST_INDEX, REINDEXER_TEST_INDEX]}
-        response = self.client.post(self.export_url, data=payload, format="json")
-        hosted_url = response.data
-        file_name = hosted_url.split("/")[-1]
-        self.assertTrue(response.status_code == status.HTTP_200_OK)
-        path = pathlib.Path(RELATIVE_PROJECT_DATA_PATH) / str(self.project.pk) / SEARCHER_FOLDER_KEY / file_name
-        self.assertTrue(path.exists() is True)
-
-        file_size = os.path.getsize(path)
-        self.assertTrue(file_size > 1)  # Check that file actually has content
-
-        # Check if file is downloadable.
-        response = self.client.get(hosted_url)
-        self.assertTrue(response.status_code == status.HTTP_200_OK)
-
-        # Try to access it without authorization.
-        self.client.logout()
-        response = self.client.get(hosted_url)
-        self.assertTrue(response.status_code != status.HTTP_200_OK)
-
-
-    def test_search_export_with_invalid_query(self):
-        payload = {"indices": [TEST_INDEX], "query": {"this": "is invalid"}}
-        response = self.client.post(self.export_url, data=payload, format="json")
-        self.assertTrue(response.status_code == status.HTTP_400_BAD_REQUEST)
-
-
-    def test_search_export_with_all_fields(self):
-        payload = {"indices": [TEST_INDEX], "fields": []}
-        response = self.client.post(self.export_url, data=payload, format="json")
-        print_output("test_search_export_with_all_fields:response.data", response.data)
-        self.assertTrue(response.status_code == status.HTTP_200_OK)
-
-        hosted_url = response.data
-        file_name = hosted_url.split("/")[-1]
-        path = pathlib.Path(RELATIVE_PROJECT_DATA_PATH) / str(self.project.pk) / SEARCHER_FOLDER_KEY / file_name
-        file_size = os.path.getsize(path)
-        self.assertTrue(file_size > 1)
-
-
     def test_search_by_query(self):
         url = f'{self.project_url}/elastic/search_by_query/'
         # check that project user has access and response is success
@@ -596,3 +557,106 @@ class ProjectViewTests(APITestCase):
     #
     # def test_that_admins_can_pick_any_scope_they_want_to(self):
     #     pass
+
+
+@override_settings(CELERY_ALWAYS_EAGER=True)
+class ExportSearchViewTests(APITransactionTestCase):
+
+    def setUp(self):
+        self.user = create_test_user(name='user', password='pw')
+        self.project = project_creation("ExportSearchViewTests", TEST_INDEX, self.user)
+        self.project.indices.add(Index.objects.get_or_create(name=REINDEXER_TEST_INDEX)[0])
+        self.export_url = reverse(f"{VERSION_NAMESPACE}:project-export-search", kwargs={"project_pk": self.project.pk})
+        self.client.login(username='user', password='pw')
+
+
+    def _get_export_path(self, response):
+        file_name = response.data["url"].split("/")[-1]
+        return pathlib.Path(RELATIVE_PROJECT_DATA_PATH) / str(self.project.pk) / SEARCHER_FOLDER_KEY / file_name
+
+
+    def _check_export_task(self, response):
+        self.assertTrue(response.status_code == status.HTTP_202_ACCEPTED)
+        self.assertTrue("detail" in response.data)
+        task_response = self.client.get(response.data["task_url"])
+        print_output("_check_export_task:task_response.data", task_response.data)
+        self.assertTrue(task_response.status_code == status.HTTP_200_OK)
+        self.assertTrue(task_response.data["status"] == Task.STATUS_COMPLETED)
+
+
+    def test_search_export(self):
+        payload = {"indices": [TEST_INDEX, REINDEXER_TEST_INDEX], "query": {"query": {"match_all": {}}, "size": 5, "sort": [{"_doc": "asc"}]}}
+        response = self.client.post(self.export_url, data=payload, format="json")
+        print_output("test_search_export:response.data", response.data)
+        self._check_export_task(response)
+        path = self._get_export_path(response)
+        self.assertTrue(path.exists() is True)
+
+        file_size = os.path.getsize(path)
+        self.assertTrue(file_size > 1)  # Check that file actually has content
+
+        # Check if file is downloadable.
+        hosted_url = response.data["url"]
+        response = self.client.get(hosted_url)
+        self.assertTrue(response.status_code == status.HTTP_200_OK)
+
+        # Try to access it without authorization.
+        self.client.logout()
+        response = self.client.get(hosted_url)
+        self.assertTrue(response.status_code != status.HTTP_200_OK)
+
+
+    def test_search_export_with_invalid_query(self):
+        payload = {"indices": [TEST_INDEX], "query": {"this": "is invalid"}}
+        response = self.client.post(self.export_url, data=payload, format="json")
+        self.assertTrue(response.status_code == status.HTTP_400_BAD_REQUEST)
+
+
+    def test_search_export_with_all_fields(self):
+        payload = {"indices": [TEST_INDEX], "fields": []}
+        response = self.client.post(self.export_url, data=payload, format="json")
+        print_output("test_search_export_with_all_fields:response.data", response.data)
+        self._check_export_task(response)
+        file_size = os.path.getsize(self._get_export_path(response))
+        self.assertTrue(file_size > 1)
+
+
+    def test_search_export_writes_existing_file_again(self):
+        payload = {"indices": [TEST_INDEX], "query": TEST_QUERY, "fields": [TEST_FIELD]}
+        response = self.client.post(self.export_url, data=payload, format="json")
+        self._check_export_task(response)
+        path = self._get_export_path(response)
+        content = path.read_text(encoding="utf8")
+        path.write_text("outdated", encoding="utf8")
+
+        response = self.client.post(self.export_url, data=payload, format="json")
+        print_output("test_search_export_writes_existing_file_again:response.data", response.data)
+        self._check_export_task(response)
+        self.assertTrue(self._get_export_path(response) == path)
+        self.assertTrue(path.read_text(encoding="utf8") == content)
+        # Only the finished file is left in the folder.
+        self.assertFalse([file.name for file in path.parent.iterdir() if file.name.endswith(".part")])
+
+
+    def test_export_tasks_of_other_projects_are_not_accessible(self):
+        payload = {"indices": [TEST_INDEX], "query": TEST_QUERY, "fields": [TEST_FIELD]}
+        response = self.client.post(self.export_url, data=payload, format="json")
+        self._check_export_task(response)
+        task_pk = int(response.data["task_url"].rstrip("/").split("/")[-1])
+
+        other_project = project_creation("ExportSearchViewTestsOther", TEST_INDEX, self.user)
+        other_task_url = reverse(f"{VERSION_NAMESPACE}:project-export-search-task", kwargs={"project_pk": other_project.pk, "task_pk": task_pk})
+        response = self.client.get(other_task_url)
+        print_output("test_export_tasks_of_other_projects_are_not_accessible:response.data", response.data)
+        self.assertTrue(response.status_code == status.HTTP_404_NOT_FOUND)
+
+
+    def test_search_export_into_compressed_csv_and_parquet(self):
+        for file_format, extension in (("csv", ".csv.gz"), ("parquet", ".parquet")):
+            payload = {"indices": [TEST_INDEX], "query": TEST_QUERY, "fields": [TEST_FIELD, TEXTA_TAGS_KEY], "file_format": file_format, "compress": True}
+            response = self.client.post(self.export_url, data=payload, format="json")
+            print_output("test_search_export_into_compressed_csv_and_parquet:response.data", response.data)
+            self._check_export_task(response)
+            path = self._get_export_path(response)
+            self.assertTrue(path.name.endswith(extension))
+            self.assertTrue(os.path.getsize(path) > 1)
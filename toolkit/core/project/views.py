@@ -3,7 +3,6 @@ import pathlib
 from wsgiref.util import FileWrapper
 
 import elasticsearch
-import elasticsearch_dsl
 import rest_framework.filters as drf_filters
 from django.contrib.auth.models import User
 from django.db.models import Q
@@ -28,12 +27,16 @@ from texta_elastic.spam_detector import SpamDetector
 from toolkit.core.project.models import Project
 from toolkit.core.project.serializers import (CountIndicesSerializer, ExportSearcherResultsSerializer, HandleIndicesSerializer, HandleProjectAdministratorsSerializer, HandleUsersSerializer, ProjectDocumentSerializer, ProjectFactAggregatorSerializer, ProjectGetFactsSerializer,
                                               ProjectGetSpamSerializer, ProjectSearchByQuerySerializer, ProjectSerializer, ProjectSimplifiedSearchSerializer, ProjectSuggestFactNamesSerializer, ProjectSuggestFactValuesSerializer)
+from toolkit.core.task.models import Task
+from toolkit.core.task.serializers import TaskSerializer
 from toolkit.elastic.decorators import elastic_view
+from toolkit.elastic.index.field_cache import get_fields
 from toolkit.elastic.index.models import Index
 from toolkit.elastic.index.serializers import IndexSerializer
+from toolkit.elastic.tools.search_export import get_export_body, get_export_file_name
 from toolkit.elastic.tools.serializers import ElasticScrollSerializer
+from toolkit.elastic.tools.tasks import export_search_results
 from toolkit.exceptions import InvalidInputDocument, ProjectValidationFailed, SerializerNotValid
-from toolkit.helper_functions import hash_string
 from toolkit.permissions.project_permissions import (
     AuthorProjAdminSuperadminAllowed,
     ExtraActionAccessInApplications,
@@ -41,7 +44,7 @@ from toolkit.permissions.project_permissions import (
     ProjectAccessInApplicationsAllowed,
     ProjectEditAccessAllowed
 )
-from toolkit.settings import RELATIVE_PROJECT_DATA_PATH, SEARCHER_FOLDER_KEY
+from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, RELATIVE_PROJECT_DATA_PATH, SEARCHER_FOLDER_KEY
 from toolkit.tools.autocomplete import Autocomplete
 from toolkit.view_constants import FeedbackIndexView
 
@@ -82,8 +85,25 @@ class ExportSearchView(APIView):
     permission_classes = [IsAuthenticated, ProjectAccessInApplicationsAllowed]
 
 
+    @staticmethod
+    def get_response_data(request, project_pk: int, task_object: Task, file_name: str):
+        file_url = reverse("protected_serve", kwargs={"project_id": int(project_pk), "application": SEARCHER_FOLDER_KEY, "file_name": file_name})
+        task_url = reverse(f"{request.version}:project-export-search-task", kwargs={"project_pk": int(project_pk), "task_pk": task_object.pk})
+        return {
+            "url": request.build_absolute_uri(file_url),
+            "task_url": request.build_absolute_uri(task_url),
+            "task": TaskSerializer(task_object).data,
+            "detail": "The file is ready once the task at task_url has completed, until then the url may serve a previous export of the same search."
+        }
+
+
     @elastic_view
     def post(self, request, project_pk: int):
+        """
+        Exports the search results into a file in the background. Exports of the same search share the file,
+        which is replaced once the export is complete, so clients must wait for the task at task_url
+        to complete before downloading the file from url.
+        """
         try:
             serializer = ExportSearcherResultsSerializer(data=request.data)
             model = get_object_or_404(Project, pk=project_pk)
@@ -91,37 +111,42 @@ class ExportSearchView(APIView):
 
             serializer.is_valid(raise_exception=True)
 
-            # Use the query as a hash to avoid creating duplicate files.
             query = serializer.validated_data["query"]
-            query_str = json.dumps(query, sort_keys=True, ensure_ascii=False)
-
             indices = model.get_available_or_all_project_indices(serializer.validated_data["indices"])
-            indices = ",".join(indices)
-
             fields = serializer.validated_data["fields"]
+            file_format = serializer.validated_data["file_format"]
+            compress = serializer.validated_data["compress"]
 
-            original_query = elasticsearch_dsl.Search().from_dict(query).source(fields)
-            with_es = original_query.using(ElasticCore().es)
-            index_limitation = with_es.index(indices)
-            limit_by_n_docs = index_limitation.extra(size=10000)
+            # Validates the query and counts the documents before handing the export over to the workers.
+            count = ElasticSearcher(indices=indices, query=get_export_body(query)).count()
 
             path = pathlib.Path(RELATIVE_PROJECT_DATA_PATH) / str(project_pk) / SEARCHER_FOLDER_KEY
             path.mkdir(parents=True, exist_ok=True)
-            file_name = f"{hash_string(query_str)}.jl"
+            # Name is a hash of the indices, query, fields and format, so exports of the same search share the file.
+            file_name = get_export_file_name(indices, query, fields, file_format=file_format, compress=compress)
 
-            with open(path / file_name, "w+", encoding="utf8") as fp:
-                for item in limit_by_n_docs.scan():
-                    item = item.to_dict()
-                    json_string = json.dumps(item, ensure_ascii=False)
-                    fp.write(f"{json_string}\n")
+            task_object = Task.objects.create(task_type=Task.TYPE_EXPORT, status=Task.STATUS_CREATED, total=count)
+            model.export_tasks.add(task_object)
+            # The file is always written again as the documents of the indices may have changed since the last export.
+            export_search_results.apply_async(args=(task_object.pk, indices, query, fields, str(path / file_name), file_format, compress), queue=CELERY_LONG_TERM_TASK_QUEUE)
 
-            url = reverse("protected_serve", kwargs={"project_id": int(project_pk), "application": SEARCHER_FOLDER_KEY, "file_name": file_name})
-            return Response(request.build_absolute_uri(url))
+            return Response(self.get_response_data(request, project_pk, task_object, file_name), status=status.HTTP_202_ACCEPTED)
 
         except elasticsearch.exceptions.RequestError:
             return Response({"detail": "Could not parse the query you sent!"}, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ExportSearchTaskView(APIView):
+    permission_classes = [IsAuthenticated, ProjectAccessInApplicationsAllowed]
+
+
+    def get(self, request, project_pk: int, task_pk: int):
+        model = get_object_or_404(Project, pk=project_pk)
+        self.check_object_permissions(request, model)
+        task_object = get_object_or_404(model.export_tasks.all(), pk=task_pk)
+        return Response(TaskSerializer(task_object).data)
+
+
 class ScrollView(APIView):
     permission_classes = [IsAuthenticated, ProjectAccessInApplicationsAllowed]
 
@@ -170,7 +195,7 @@ class GetSpamView(APIView):
 
         detector = SpamDetector(indices)
 
-        all_fields = ElasticCore().get_fields(indices)
+        all_fields = get_fields(indices)
         fields = detector.filter_fields(serializer.validated_data["common_feature_fields"], all_fields)
         serializer.validated_data["common_feature_fields"] = fields  # Since we're unpacking all the data in the serializer, gonna overwrite what's inside it for comfort.
 
@@ -6,16 +6,15 @@ from typing import List
 
 from celery.decorators import task
 from texta_crf_extractor.crf_extractor import CRFExtractor
-from texta_elastic.core import ElasticCore
-from texta_elastic.document import ElasticDocument
 from texta_elastic.searcher import ElasticSearcher
 
 from toolkit.base_tasks import BaseTask, TransactionAwareTask
+from toolkit.elastic.tools.apply_to_index import index_applier
+from toolkit.elastic.tools.tasks import apply_to_index
 from toolkit.helper_functions import get_indices_from_object
 from toolkit.settings import (
     CELERY_LONG_TERM_TASK_QUEUE,
     CELERY_SHORT_TERM_TASK_QUEUE,
-    ERROR_LOGGER,
     INFO_LOGGER,
     MEDIA_URL
 )
@@ -157,38 +156,27 @@ def apply_crf_extractor(crf_id: int, mlp_document: dict):
     return prediction
 
 
-def update_generator(
-        generator: ElasticSearcher,
-        ec: ElasticCore,
-        mlp_fields: List[str],
-        label_suffix: str,
-        object_id: int,
-        extractor: CRFExtractor = None
-):
-    """
-    Tags & updates documents in ES.
-    """
-    for i, scroll_batch in enumerate(generator):
-        logging.getLogger(INFO_LOGGER).info(f"Appyling CRFExtractor with ID {object_id} to batch {i + 1}...")
-        for raw_doc in scroll_batch:
-            hit = raw_doc["_source"]
-            existing_facts = hit.get("texta_facts", [])
+@index_applier("crf_extractor")
+def get_crf_extractor_batch_function(object_id: int, mlp_fields: List[str], label_suffix: str):
+    crf_object = CRFExtractorObject.objects.get(pk=object_id)
+    extractor = crf_object.load_extractor()
+
+
+    def process_batch(sources: List[dict]) -> List[List[dict]]:
+        """
+        Tags the MLP processed documents.
+        """
+        logging.getLogger(INFO_LOGGER).info(f"Appyling CRFExtractor with ID {object_id} to a batch of {len(sources)} documents...")
+        batch_facts = []
+        for source in sources:
+            new_facts = []
             for mlp_field in mlp_fields:
-                new_facts = extractor.tag(hit, field_name=mlp_field, label_suffix=label_suffix)["texta_facts"]
-                if new_facts:
-                    existing_facts.extend(new_facts)
+                new_facts.extend(extractor.tag(source, field_name=mlp_field, label_suffix=label_suffix)["texta_facts"] or [])
+            batch_facts.append(new_facts)
+        return batch_facts
 
-            if existing_facts:
-                # Remove duplicates to avoid adding the same facts with repetitive use.
-                existing_facts = ElasticDocument.remove_duplicate_facts(existing_facts)
 
-            yield {
-                "_index": raw_doc["_index"],
-                "_id": raw_doc["_id"],
-                "_type": raw_doc.get("_type", "_doc"),
-                "_op_type": "update",
-                "doc": {"texta_facts": existing_facts}
-            }
+    return process_batch
 
 
 @task(name="apply_crf_extractor_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
@@ -206,43 +194,20 @@ def apply_crf_extractor_to_index(
     Applies Extractor to ES index.
     """
     try:
-        # load model
         crf_object = CRFExtractorObject.objects.get(pk=object_id)
-        extractor = crf_object.load_extractor()
-        # progress
         task_object = crf_object.tasks.last()
-
-        progress = ShowProgress(task_object)
-        # add fact field if missing
-        ec = ElasticCore()
-        [ec.add_texta_facts_mapping(index) for index in indices]
-        # search
-        searcher = ElasticSearcher(
+        applier_kwargs = {"object_id": object_id, "mlp_fields": mlp_fields, "label_suffix": label_suffix}
+        apply_to_index(
+            "crf_extractor",
+            applier_kwargs,
+            task_object,
             indices=indices,
-            field_data=mlp_fields + ["texta_facts"],  # Get facts to add upon existing ones.
+            fields=mlp_fields,
             query=query,
-            output=ElasticSearcher.OUT_RAW,
-            timeout=f"{es_timeout}m",
-            callback_progress=progress,
-            scroll_size=bulk_size
+            bulk_size=bulk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            es_timeout=es_timeout
         )
-        # create update actions
-        actions = update_generator(
-            generator=searcher,
-            ec=ec,
-            mlp_fields=mlp_fields,
-            label_suffix=label_suffix,
-            object_id=object_id,
-            extractor=extractor
-        )
-        # perform updates
-        try:
-            # as we have defined indices in actions there is no need to do it again (None)
-            ElasticDocument(None).bulk_update(actions)
-        except Exception as e:
-            logging.getLogger(ERROR_LOGGER).exception(e)
-        # all done
-        task_object.complete()
         return True
 
     except Exception as e:
@@ -4,6 +4,7 @@ from django.db import models
 from texta_elastic.searcher import EMPTY_QUERY
 
 from toolkit.core.task.models import Task
+from toolkit.elastic.choices import STEMMER_BACKEND_CHOICES, STEMMER_BACKEND_ELASTIC
 from toolkit.elastic.index.models import Index
 from toolkit.model_constants import CommonModelMixin
 from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE
@@ -21,6 +22,7 @@ class ApplyESAnalyzerWorker(CommonModelMixin):
     strip_html = models.BooleanField(default=True)
     tokenizer = models.CharField(max_length=100, default="standard")
     stemmer_lang = models.CharField(max_length=100, null=True)
+    stemmer_backend = models.CharField(choices=STEMMER_BACKEND_CHOICES, default=STEMMER_BACKEND_ELASTIC, max_length=100)
     detect_lang = models.BooleanField(default=False)
     es_timeout = models.IntegerField(default=15, help_text="How many minutes should there be between scroll requests before triggering a timeout.")
     bulk_size = models.IntegerField(default=100, help_text="How many documents should be returned by Elasticsearch with each request.")
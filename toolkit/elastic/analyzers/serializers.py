@@ -5,7 +5,7 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from .models import ApplyESAnalyzerWorker
-from ..choices import DEFAULT_ELASTIC_TOKENIZER, DEFAULT_SNOWBALL_LANGUAGE, ELASTIC_TOKENIZERS, get_snowball_choices
+from ..choices import DEFAULT_ELASTIC_TOKENIZER, DEFAULT_SNOWBALL_LANGUAGE, DEFAULT_STEMMER_BACKEND, ELASTIC_TOKENIZERS, STEMMER_BACKEND_CHOICES, get_snowball_choices
 from ...serializer_constants import TasksMixinSerializer, ToolkitTaskSerializer
 
 
@@ -17,6 +17,7 @@ class ApplyESAnalyzerWorkerSerializer(serializers.ModelSerializer, ToolkitTaskSe
 
     tokenizer = serializers.ChoiceField(choices=ELASTIC_TOKENIZERS, default=DEFAULT_ELASTIC_TOKENIZER, help_text="Which Elasticsearch tokenizer to use for tokenizer and stemmer analyzers.")
     stemmer_lang = serializers.ChoiceField(choices=get_snowball_choices(), default=DEFAULT_SNOWBALL_LANGUAGE, help_text="Which language stemmer to use.")
+    stemmer_backend = serializers.ChoiceField(choices=STEMMER_BACKEND_CHOICES, default=DEFAULT_STEMMER_BACKEND, help_text="Whether to stem and tokenize the texts with Elasticsearch or locally with NLTK.")
     detect_lang = serializers.BooleanField(default=False, help_text="Whether to automatically detect the language from the fields for stemming purposes.")
     bulk_size = serializers.IntegerField(min_value=0, max_value=500, default=100, help_text="How many items should be processed at once for Elasticsearch")
     es_timeout = serializers.IntegerField(min_value=1, max_value=100, default=30, help_text="How long should the timeout for scroll be in minutes.")
@@ -56,7 +57,7 @@ class ApplyESAnalyzerWorkerSerializer(serializers.ModelSerializer, ToolkitTaskSe
 
     class Meta:
         model = ApplyESAnalyzerWorker
-        fields = ("id", "url", "author", "strip_html", "indices", "analyzers", "stemmer_lang", "fields", "tokenizer", "es_timeout", "bulk_size", "detect_lang", "description", "tasks", "query",)
+        fields = ("id", "url", "author", "strip_html", "indices", "analyzers", "stemmer_lang", "stemmer_backend", "fields", "tokenizer", "es_timeout", "bulk_size", "detect_lang", "description", "tasks", "query",)
 
 
 class SnowballSerializer(serializers.Serializer):
@@ -11,7 +11,7 @@ from toolkit.elastic.analyzers.serializers import ApplyESAnalyzerWorkerSerialize
 from toolkit.elastic.choices import get_snowball_choices
 from toolkit.elastic.index.models import Index
 from toolkit.permissions.project_permissions import ProjectAccessInApplicationsAllowed
-from toolkit.tools.lemmatizer import ElasticAnalyzer
+from toolkit.tools.lemmatizer import get_analyzer
 from toolkit.view_constants import BulkDelete
 
 
@@ -27,7 +27,7 @@ class SnowballProcessor(views.APIView):
         text = serializer.validated_data["text"]
         language = serializer.validated_data["language"]
 
-        lemmatizer = ElasticAnalyzer(language=language)
+        lemmatizer = get_analyzer(language=language)
         lemmatized = lemmatizer.stem_text(text, language=language)
 
         return Response({"text": lemmatized, "language": language})
@@ -1,7 +1,7 @@
 import logging
 from typing import Optional
 
-from toolkit.settings import ELASTIC_CLUSTER_VERSION, INFO_LOGGER
+from toolkit.settings import ELASTIC_CLUSTER_VERSION, INFO_LOGGER, STEMMER_BACKEND
 
 
 # https://www.elastic.co/guide/en/elasticsearch/reference/current/analysis-tokenizers.html
@@ -18,6 +18,13 @@ ELASTIC_TOKENIZERS = (
 
 DEFAULT_ELASTIC_TOKENIZER = "standard"
 
+# Snowball stemming either with Elasticsearch or locally with the NLTK stemmers.
+STEMMER_BACKEND_ELASTIC = "elasticsearch"
+STEMMER_BACKEND_LOCAL = "local"
+STEMMER_BACKENDS = (STEMMER_BACKEND_ELASTIC, STEMMER_BACKEND_LOCAL)
+STEMMER_BACKEND_CHOICES = [(backend, backend) for backend in STEMMER_BACKENDS]
+DEFAULT_STEMMER_BACKEND = STEMMER_BACKEND
+
 LABEL_DISTRIBUTION = (
     ("random", "random"),
     ("original", "original"),
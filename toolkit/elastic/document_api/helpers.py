@@ -1,3 +1,130 @@
+import logging
+import time
+
+from texta_elastic.core import ElasticCore
+
+from toolkit.settings import INFO_LOGGER, TEXTA_TAGS_KEY
+
+
+# How often the progress of an update by query is polled from Elasticsearch in seconds.
+UPDATE_BY_QUERY_POLL_INTERVAL = 5
+
+# Painless counterpart of check_if_dict_is_subdict.
+_PAINLESS_IS_SUBDICT = """
+boolean isSubdict(Map mainDict, Map potentialSubdict) {
+    for (def entry : potentialSubdict.entrySet()) {
+        if (!mainDict.containsKey(entry.getKey()) || mainDict.get(entry.getKey()) != entry.getValue()) {
+            return false;
+        }
+    }
+    return true;
+}
+
+boolean matchesAny(Map fact, List targetFacts) {
+    for (def targetFact : targetFacts) {
+        if (isSubdict(fact, targetFact)) {
+            return true;
+        }
+    }
+    return false;
+}
+"""
+
+# Removes the facts that contain any of the target facts, documents without such facts are left untouched.
+DELETE_FACTS_SCRIPT = _PAINLESS_IS_SUBDICT + """
+List facts = ctx._source[params.facts_key];
+if (facts == null) {
+    ctx.op = 'noop';
+    return;
+}
+List newFacts = new ArrayList();
+for (def fact : facts) {
+    if (!matchesAny(fact, params.target_facts)) {
+        newFacts.add(fact);
+    }
+}
+if (newFacts.size() == facts.size()) {
+    ctx.op = 'noop';
+} else {
+    ctx._source[params.facts_key] = newFacts;
+}
+"""
+
+# Replaces the facts that contain any of the target facts with the resulting fact.
+EDIT_FACTS_SCRIPT = _PAINLESS_IS_SUBDICT + """
+List facts = ctx._source[params.facts_key];
+if (facts == null) {
+    ctx.op = 'noop';
+    return;
+}
+boolean changed = false;
+for (int i = 0; i < facts.size(); i++) {
+    if (matchesAny(facts.get(i), params.target_facts)) {
+        facts.set(i, params.fact);
+        changed = true;
+    }
+}
+if (!changed) {
+    ctx.op = 'noop';
+}
+"""
+
+
 def check_if_dict_is_subdict(main_dict: dict, potential_subdict: dict):
     is_subset = potential_subdict.items() <= main_dict.items()
     return is_subset
+
+
+def run_update_by_query(task_object, indices: list, query: dict, script: str, params: dict, scroll_size: int, es_timeout: int, requests_per_second: float = -1,
+                        poll_interval: float = UPDATE_BY_QUERY_POLL_INTERVAL) -> dict:
+    """
+    Runs a painless script on the documents matching the query as an Elasticsearch update by query in automatic slices
+    and polls its progress into the task_object, which should have its total set, until it's completed.
+    :param requests_per_second: Throttling of the sub-requests, -1 disables throttling.
+    :return: Status of the finished Elasticsearch task.
+    """
+    ec = ElasticCore()
+    body = {
+        "query": query.get("query", {"match_all": {}}),
+        "script": {"source": script, "lang": "painless", "params": {"facts_key": TEXTA_TAGS_KEY, **params}}
+    }
+    response = ec.es.update_by_query(
+        index=indices,
+        body=body,
+        conflicts="proceed",
+        refresh=True,
+        slices="auto",
+        scroll=f"{es_timeout}m",
+        scroll_size=scroll_size,
+        requests_per_second=requests_per_second,
+        wait_for_completion=False
+    )
+    es_task_id = response["task"]
+    logging.getLogger(INFO_LOGGER).info(f"Started update by query with Elasticsearch task ID: {es_task_id} for Task ID: {task_object.pk}!")
+
+    num_processed = 0
+    while True:
+        es_task = ec.es.tasks.get(task_id=es_task_id)
+        status = es_task["task"]["status"]
+        processed = status["updated"] + status["noops"] + status["version_conflicts"]
+        if processed > num_processed:
+            task_object.update_progress_iter(processed - num_processed)
+            num_processed = processed
+
+        if es_task["completed"]:
+            break
+        time.sleep(poll_interval)
+
+    # Tasks that fail as a whole (script exceptions, missing indices) have an error instead of a response.
+    error = es_task.get("error")
+    if error:
+        raise RuntimeError(f"Update by query failed: {error}")
+    result = es_task.get("response", status)
+    failures = result.get("failures", [])
+    if failures:
+        raise RuntimeError(f"Update by query failed: {failures[:5]}")
+    if result.get("version_conflicts"):
+        # Progress updates leave an expression in the in-memory field, reload it before saving the whole Task.
+        task_object.refresh_from_db()
+        task_object.add_error(f"Skipped {result['version_conflicts']} documents that were changed during the update.")
+    return result
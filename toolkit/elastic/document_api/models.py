@@ -17,6 +17,8 @@ class DeleteFactsByQueryTask(CommonModelMixin):
     query = models.TextField(default=json.dumps(EMPTY_QUERY))
     indices = models.ManyToManyField(Index)
     facts = models.TextField()
+    use_update_by_query = models.BooleanField(default=False, help_text="Whether to change the facts inside Elasticsearch with an update by query instead of passing the documents through the workers.")
+    requests_per_second = models.FloatField(default=-1, help_text="Throttling of the update by query in sub-requests per second, -1 disables throttling.")
 
 
     def get_available_or_all_indices(self, indices: List[str] = None) -> List[str]:
@@ -61,6 +63,8 @@ class EditFactsByQueryTask(CommonModelMixin):
     indices = models.ManyToManyField(Index)
     target_facts = models.TextField(help_text="Which facts to select for editing.")
     fact = models.TextField(help_text="End result of the selected facts.")
+    use_update_by_query = models.BooleanField(default=False, help_text="Whether to change the facts inside Elasticsearch with an update by query instead of passing the documents through the workers.")
+    requests_per_second = models.FloatField(default=-1, help_text="Throttling of the update by query in sub-requests per second, -1 disables throttling.")
 
 
     def get_available_or_all_indices(self, indices: List[str] = None) -> List[str]:
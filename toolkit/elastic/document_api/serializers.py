@@ -7,6 +7,13 @@ from toolkit.elastic.document_api.models import DeleteFactsByQueryTask, EditFact
 from toolkit.serializer_constants import CommonModelSerializerMixin, IndicesSerializerMixin, ProjectResourceUrlSerializer, QUERY_HELPTEXT
 
 
+def validate_requests_per_second(value: float):
+    # Elasticsearch accepts only -1 for disabling the throttling or a positive number of sub-requests per second.
+    if value != -1 and value <= 0:
+        raise serializers.ValidationError("Value must be -1 to disable throttling or greater than 0!")
+    return value
+
+
 class ElasticDocumentSerializer(serializers.Serializer):
     _id = serializers.CharField(required=False, help_text="Under which id should Elasticsearch insert the document, without this Elasticsearch will generate one itself.")
     _index = serializers.CharField(default=None, help_text="Under which index should Elasticsearch insert the document, lacking one Toolkit will generate one automatically.")
@@ -46,6 +53,7 @@ class DeleteFactsByQuerySerializer(serializers.ModelSerializer, IndicesSerialize
     query = serializers.JSONField(help_text=QUERY_HELPTEXT, required=False, default=json.dumps(EMPTY_QUERY))
     url = serializers.SerializerMethodField()
     facts = serializers.ListField(child=serializers.DictField(), help_text=f'List of facts to remove from documents')
+    requests_per_second = serializers.FloatField(default=-1, validators=[validate_requests_per_second], help_text="Throttling of the update by query in sub-requests per second, -1 disables throttling.")
 
 
     def to_representation(self, instance):
@@ -67,7 +75,7 @@ class DeleteFactsByQuerySerializer(serializers.ModelSerializer, IndicesSerialize
 
     class Meta:
         model = DeleteFactsByQueryTask
-        fields = ('id', 'url', 'author', 'description', 'query', 'facts', 'indices', 'tasks')
+        fields = ('id', 'url', 'author', 'description', 'query', 'facts', 'indices', 'tasks', 'use_update_by_query', 'requests_per_second')
 
 
 class EditFactsByQuerySerializer(serializers.ModelSerializer, IndicesSerializerMixin, CommonModelSerializerMixin, ProjectResourceUrlSerializer):
@@ -75,6 +83,7 @@ class EditFactsByQuerySerializer(serializers.ModelSerializer, IndicesSerializerM
     url = serializers.SerializerMethodField()
     target_facts = serializers.ListField(child=serializers.DictField(), help_text=f'List of facts to edit from documents')
     fact = serializers.JSONField(help_text="How the targeted facts should be changed into.")
+    requests_per_second = serializers.FloatField(default=-1, validators=[validate_requests_per_second], help_text="Throttling of the update by query in sub-requests per second, -1 disables throttling.")
 
 
     def to_representation(self, instance):
@@ -102,4 +111,4 @@ class EditFactsByQuerySerializer(serializers.ModelSerializer, IndicesSerializerM
 
     class Meta:
         model = EditFactsByQueryTask
-        fields = ('id', 'url', 'author', 'description', 'query', 'target_facts', 'fact', 'indices', 'tasks')
+        fields = ('id', 'url', 'author', 'description', 'query', 'target_facts', 'fact', 'indices', 'tasks', 'use_update_by_query', 'requests_per_second')
@@ -7,7 +7,7 @@ from texta_elastic.document import ElasticDocument
 from texta_elastic.searcher import ElasticSearcher
 
 from toolkit.base_tasks import QuietTransactionAwareTask
-from toolkit.elastic.document_api.helpers import check_if_dict_is_subdict
+from toolkit.elastic.document_api.helpers import DELETE_FACTS_SCRIPT, EDIT_FACTS_SCRIPT, check_if_dict_is_subdict, run_update_by_query
 from toolkit.elastic.document_api.models import DeleteFactsByQueryTask, EditFactsByQueryTask
 from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, INFO_LOGGER, TEXTA_TAGS_KEY
 from toolkit.tools.show_progress import ShowProgress
@@ -57,11 +57,10 @@ def query_delete_actions_generator(searcher, target_facts: List[dict]):
         for document in documents:
             source = document.get("_source")
             existing_facts = source.get(TEXTA_TAGS_KEY, [])
-            new_facts = []
-            for index_count, existing_fact in enumerate(existing_facts):
-                for fact in target_facts:
-                    if not check_if_dict_is_subdict(main_dict=existing_fact, potential_subdict=fact):
-                        new_facts.append(existing_fact)
+            new_facts = [
+                existing_fact for existing_fact in existing_facts
+                if not any(check_if_dict_is_subdict(main_dict=existing_fact, potential_subdict=fact) for fact in target_facts)
+            ]
 
             document["_source"][TEXTA_TAGS_KEY] = new_facts
             yield {
@@ -87,6 +86,21 @@ def fact_delete_query_task(self, worker_id: int):
         target_facts = json.loads(worker_object.facts)
         scroll_size = worker_object.scroll_size
 
+        if worker_object.use_update_by_query:
+            show_progress.update_step('Deleting the facts with an update by query.')
+            run_update_by_query(
+                task_object,
+                indices=indices,
+                query=json.loads(worker_object.query),
+                script=DELETE_FACTS_SCRIPT,
+                params={"target_facts": target_facts},
+                scroll_size=scroll_size,
+                es_timeout=worker_object.es_timeout,
+                requests_per_second=worker_object.requests_per_second
+            )
+            task_object.complete()
+            return worker_id
+
         searcher = ElasticSearcher(
             query=json.loads(worker_object.query),
             indices=indices,
@@ -190,6 +204,21 @@ def fact_edit_query_task(self, worker_id: int):
         fact = json.loads(worker_object.fact)
         scroll_size = worker_object.scroll_size
 
+        if worker_object.use_update_by_query:
+            show_progress.update_step('Editing the facts with an update by query.')
+            run_update_by_query(
+                task_object,
+                indices=indices,
+                query=json.loads(worker_object.query),
+                script=EDIT_FACTS_SCRIPT,
+                params={"target_facts": target_facts, "fact": fact},
+                scroll_size=scroll_size,
+                es_timeout=worker_object.es_timeout,
+                requests_per_second=worker_object.requests_per_second
+            )
+            task_object.complete()
+            return worker_id
+
         searcher = ElasticSearcher(
             query=json.loads(worker_object.query),
             indices=indices,
@@ -12,6 +12,8 @@ from rest_framework import status
 from rest_framework.test import APITestCase, APITransactionTestCase
 from texta_elastic.core import ElasticCore
 
+from toolkit.core.task.models import Task
+from toolkit.elastic.document_api.helpers import run_update_by_query
 from toolkit.helper_functions import reindex_test_dataset
 from toolkit.settings import TEXTA_TAGS_KEY
 from toolkit.test_settings import TEST_FIELD, TEST_QUERY, VERSION_NAMESPACE
@@ -399,6 +401,86 @@ class FactManagementApplicationTests(APITransactionTestCase):
             self.assertTrue(fact["spans"] == json.dumps([[0, 0]]))
 
 
+    def test_delete_facts_by_query_with_update_by_query(self):
+        url = reverse("v2:delete_facts_by_query-list", kwargs=self.kwargs)
+        payload = {
+            "description": "testing whether this deletes facts inside Elasticsearch",
+            "query": {"query": {"ids": {"values": [self.uuid]}}},
+            "facts": [
+                {"str_val": "politsei", "fact": "ORG", "spans": json.dumps([[0, 0]]), "doc_path": "hello"},
+            ],
+            "indices": [{"name": self.test_index_name}],
+            "use_update_by_query": True,
+            "requests_per_second": 100
+        }
+        response = self.client.post(url, data=payload, format="json")
+        print_output("test_delete_facts_by_query_with_update_by_query:response.data", response.data)
+        self.assertTrue(response.status_code == status.HTTP_201_CREATED)
+        self.assertTrue(response.data["use_update_by_query"] is True)
+        document = self.__wait_for_document_update()
+        self.assertTrue(document[TEST_FIELD] == self.content)
+        self.assertTrue(document.get(TEXTA_TAGS_KEY) == [])
+
+
+    def test_invalid_requests_per_second_is_rejected(self):
+        url = reverse("v2:delete_facts_by_query-list", kwargs=self.kwargs)
+        payload = {
+            "description": "testing whether invalid throttling is rejected",
+            "query": {"query": {"ids": {"values": [self.uuid]}}},
+            "facts": [{"str_val": "politsei", "fact": "ORG", "spans": json.dumps([[0, 0]]), "doc_path": "hello"}],
+            "indices": [{"name": self.test_index_name}],
+            "use_update_by_query": True
+        }
+        for requests_per_second in [0, -2, -0.5]:
+            response = self.client.post(url, data={**payload, "requests_per_second": requests_per_second}, format="json")
+            print_output("test_invalid_requests_per_second_is_rejected:response.data", response.data)
+            self.assertTrue(response.status_code == status.HTTP_400_BAD_REQUEST)
+            self.assertTrue("requests_per_second" in response.data)
+
+
+    def test_failing_update_by_query_script_raises_an_error(self):
+        task_object = Task.objects.create(task_type=Task.TYPE_APPLY, status=Task.STATUS_RUNNING, total=1)
+        with self.assertRaises(RuntimeError):
+            run_update_by_query(
+                task_object,
+                indices=[self.test_index_name],
+                query={"query": {"ids": {"values": [self.uuid]}}},
+                script="throw new IllegalArgumentException('failing script');",
+                params={},
+                scroll_size=100,
+                es_timeout=10,
+                poll_interval=0.1
+            )
+        document = self.ec.es.get(index=self.test_index_name, id=self.uuid)["_source"]
+        self.assertTrue(document[TEXTA_TAGS_KEY] == self.source[TEXTA_TAGS_KEY])
+
+
+    def test_update_facts_by_query_with_update_by_query(self):
+        url = reverse("v2:edit_facts_by_query-list", kwargs=self.kwargs)
+        payload = {
+            "description": "testing whether this updates facts inside Elasticsearch",
+            "query": {"query": {"ids": {"values": [self.uuid]}}},
+            "target_facts": [{"str_val": "politsei", "fact": "ORG", "spans": json.dumps([[0, 0]]), "doc_path": "hello"}],
+            "fact": {"str_val": "Eesti Politsei", "fact": "ORG", "spans": json.dumps([[0, 0]]), "doc_path": "hello"},
+            "indices": [{"name": self.test_index_name}],
+            "use_update_by_query": True
+        }
+        response = self.client.post(url, data=payload, format="json")
+        print_output("test_update_facts_by_query_with_update_by_query:response.data", response.data)
+        self.assertTrue(response.status_code == status.HTTP_201_CREATED)
+
+        document = self.ec.es.get(index=self.test_index_name, doc_type="_doc", id=self.uuid)["_source"]
+        self.assertTrue(document[TEST_FIELD] == self.content)
+        facts = document.get(TEXTA_TAGS_KEY, [])
+        self.assertTrue(all(fact["str_val"] != "politsei" for fact in facts))
+        edited_facts = [fact for fact in facts if fact["str_val"] == "Eesti Politsei"]
+        self.assertTrue(len(edited_facts) > 0)
+        for fact in edited_facts:
+            self.assertTrue(fact["fact"] == "ORG")
+            self.assertTrue(fact["doc_path"] == "hello")
+            self.assertTrue(fact["spans"] == json.dumps([[0, 0]]))
+
+
     def test_unauthorized_access(self):
         self.client.logout()
         names = ["v2:delete_facts_by_query-list", "v2:edit_facts_by_query-list"]
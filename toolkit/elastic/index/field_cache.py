@@ -0,0 +1,104 @@
+"""
+Cache of the Elasticsearch fields of the indices, stored on the Index objects so that it's shared
+by the web and worker processes. Every cached entry is stamped with the UUID and the mapping version of the index,
+which Elasticsearch increments on every mapping change, so a single cheap cluster state request
+is enough to tell which indices need their mapping fetched again. The UUID tells apart indices
+that were deleted and created again under the same name, whose mapping versions start over.
+"""
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import elasticsearch
+from texta_elastic.core import ElasticCore
+
+from toolkit.elastic.index.models import Index
+from toolkit.settings import ERROR_LOGGER
+
+
+def get_mapping_versions(ec: ElasticCore, indices: List[str]) -> Dict[str, Optional[Tuple[Optional[str], Optional[int]]]]:
+    """
+    Returns the current UUID-s and mapping versions of the indices. Indices are mapped to None
+    when the versions can't be fetched, in which case the cached fields are used as is.
+    """
+    try:
+        filter_path = ["metadata.indices.*.mapping_version", "metadata.indices.*.settings.index.uuid"]
+        response = ec.es.cluster.state(metric="metadata", index=",".join(indices), filter_path=filter_path)
+        metadata = response.get("metadata", {}).get("indices", {})
+        versions = {}
+        for index in indices:
+            index_metadata = metadata.get(index, {})
+            index_uuid = index_metadata.get("settings", {}).get("index", {}).get("uuid", None)
+            versions[index] = (index_uuid, index_metadata.get("mapping_version", None))
+        return versions
+    except elasticsearch.exceptions.ElasticsearchException as e:
+        logging.getLogger(ERROR_LOGGER).warning(f"Could not fetch the mapping versions of the indices {indices}: {e}")
+        return {index: None for index in indices}
+
+
+def _is_cached(index: Index, version: Optional[Tuple[Optional[str], Optional[int]]]) -> bool:
+    """Whether the cached fields of the index are of the given UUID and mapping version, which is None when unknown."""
+    if index.field_cache is None:
+        return False
+    return version is None or version == (index.index_uuid, index.mapping_version)
+
+
+def _update_index_fields(ec: ElasticCore, index: Index, version: Optional[Tuple[Optional[str], Optional[int]]]) -> List[dict]:
+    fields = [{"path": field["path"], "type": field["type"]} for field in ec.get_fields([index.name])]
+    index.field_cache = json.dumps(fields, ensure_ascii=False)
+    index.index_uuid, index.mapping_version = version if version is not None else (None, None)
+    index.save(update_fields=["field_cache", "index_uuid", "mapping_version"])
+    return fields
+
+
+def get_fields(indices: List[str]) -> List[dict]:
+    """
+    Drop-in replacement of ElasticCore.get_fields that only fetches the mappings of the indices
+    that have changed since they were cached. Indices without an Index object aren't cached.
+    """
+    if not indices:
+        return []
+
+    ec = ElasticCore()
+    index_objects = {index.name: index for index in Index.objects.filter(name__in=indices)}
+    versions = get_mapping_versions(ec, list(index_objects.keys())) if index_objects else {}
+
+    out = []
+    for name in indices:
+        index = index_objects.get(name, None)
+        if index is None:
+            out.extend(ec.get_fields([name]))
+            continue
+
+        version = versions.get(name, None)
+        if _is_cached(index, version):
+            fields = json.loads(index.field_cache)
+        else:
+            fields = _update_index_fields(ec, index, version)
+        out.extend({"index": name, "path": field["path"], "type": field["type"]} for field in fields)
+    return out
+
+
+def refresh_field_cache(indices: List[str] = None):
+    """Fetches the fields of the open indices that are missing from the cache or have changed since they were cached."""
+    queryset = Index.objects.filter(is_open=True)
+    if indices is not None:
+        queryset = queryset.filter(name__in=indices)
+    index_objects = list(queryset)
+    if not index_objects:
+        return
+
+    ec = ElasticCore()
+    versions = get_mapping_versions(ec, [index.name for index in index_objects])
+    for index in index_objects:
+        version = versions.get(index.name, None)
+        if version is None or not _is_cached(index, version):
+            try:
+                _update_index_fields(ec, index, version)
+            except Exception as e:
+                logging.getLogger(ERROR_LOGGER).warning(f"Could not refresh the cached fields of the index {index.name}: {e}")
+
+
+def invalidate_field_cache(indices: List[str]):
+    """Drops the cached fields of the indices, used after our own mapping changes."""
+    Index.objects.filter(name__in=indices).update(field_cache=None, index_uuid=None, mapping_version=None)
@@ -18,6 +18,15 @@ class Index(models.Model):
     client = models.CharField(max_length=255, default="")
     domain = models.CharField(max_length=255, default="")
     created_at = models.DateTimeField(null=True)
+    # Cached fields of the index mapping, see toolkit.elastic.index.field_cache.
+    field_cache = models.TextField(null=True, default=None)
+    mapping_version = models.BigIntegerField(null=True, default=None)
+    index_uuid = models.CharField(max_length=100, null=True, default=None)
+    # Statistics of the index, see toolkit.elastic.index.stats.
+    size = models.BigIntegerField(default=0)
+    doc_count = models.BigIntegerField(default=0)
+    has_validated_facts = models.BooleanField(default=False)
+    stats_updated_at = models.DateTimeField(null=True, default=None)
 
 
     def __str__(self):
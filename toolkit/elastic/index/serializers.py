@@ -53,8 +53,8 @@ class IndexSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Index
-        fields = ('id', 'is_open', 'url', 'name', 'description', 'added_by', 'test', 'source', 'client', 'domain', 'created_at')
-        read_only_fields = ('id', 'url', 'created_at')
+        fields = ('id', 'is_open', 'url', 'name', 'description', 'added_by', 'test', 'source', 'client', 'domain', 'created_at', 'size', 'doc_count', 'has_validated_facts', 'stats_updated_at')
+        read_only_fields = ('id', 'url', 'created_at', 'size', 'doc_count', 'has_validated_facts', 'stats_updated_at')
 
 
 class IndexBulkDeleteSerializer(serializers.Serializer):
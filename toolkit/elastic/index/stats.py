@@ -0,0 +1,95 @@
+"""
+Statistics of the indices shown in the index listing, stored on the Index objects
+so that listing the indices doesn't touch Elasticsearch. The statistics are refreshed
+by the sync_indices_in_elasticsearch beat task and on demand by the index views.
+"""
+import logging
+from datetime import timedelta
+from typing import Dict, Iterable, List
+
+import elasticsearch_dsl
+from django.db.models import Q
+from django.utils.timezone import now
+from texta_elastic.core import ElasticCore
+
+from toolkit.elastic.index.models import Index
+from toolkit.helper_functions import chunks
+from toolkit.settings import ERROR_LOGGER, INDEX_STATS_REFRESH_INTERVAL_IN_MINUTES, TEXTA_TAGS_KEY
+
+
+# Number of indices whose statistics are fetched with a single request, keeps the URLs short.
+INDEX_STATS_CHUNK_SIZE = 50
+
+STATS_FIELDS = ["size", "doc_count", "has_validated_facts", "stats_updated_at"]
+
+
+def get_facts_validation(ec: ElasticCore, indices: List[str]) -> Dict[str, bool]:
+    """Checks which indices have the facts field mapped as nested, only the type of the facts field is fetched from the mappings."""
+    response = ec.es.indices.get_mapping(
+        index=indices,
+        ignore_unavailable=True,
+        # Supports both the typeless ES7 and the typed ES6 mapping structure.
+        filter_path=[f"*.mappings.properties.{TEXTA_TAGS_KEY}.type", f"*.mappings.*.properties.{TEXTA_TAGS_KEY}.type"]
+    )
+    validated = {}
+    for index, mapping in response.items():
+        mappings = mapping.get("mappings", {})
+        properties = mappings.get("properties", None)
+        if properties is None:
+            properties = next((value["properties"] for value in mappings.values() if "properties" in value), {})
+        validated[index] = properties.get(TEXTA_TAGS_KEY, {}).get("type", None) == "nested"
+    return validated
+
+
+def get_index_stats(ec: ElasticCore, indices: List[str]) -> Dict[str, dict]:
+    """Returns the size and number of documents of the indices, missing indices are skipped."""
+    stats = {}
+    response = ec.es.indices.stats(index=indices, metric="store", ignore_unavailable=True)
+    for index, index_stats in response["indices"].items():
+        stats[index] = {"size": index_stats["total"]["store"]["size_in_bytes"], "doc_count": 0}
+
+    # Counts the top-level documents, the document counts of the index stats include the nested documents.
+    search = elasticsearch_dsl.Search(using=ec.es, index=indices).params(ignore_unavailable=True).extra(size=0)
+    search.aggs.bucket("by_index", "terms", field="_index", size=len(indices))
+    for bucket in search.execute().aggregations.by_index:
+        if bucket.key in stats:
+            stats[bucket.key]["doc_count"] = bucket.doc_count
+    return stats
+
+
+def refresh_index_stats(index_objects: Iterable[Index]):
+    """
+    Fetches the statistics of the indices chunk by chunk and saves them into the Index objects.
+    Closed indices are zeroed for the sake of the front-end.
+    A failing chunk is logged and left for the next refresh.
+    """
+    index_objects = list(index_objects)
+    closed_indices = [index for index in index_objects if not index.is_open]
+    for index in closed_indices:
+        index.size, index.doc_count, index.has_validated_facts, index.stats_updated_at = 0, 0, False, now()
+    Index.objects.bulk_update(closed_indices, STATS_FIELDS)
+
+    ec = ElasticCore()
+    open_indices = [index for index in index_objects if index.is_open]
+    for chunk in chunks(open_indices, INDEX_STATS_CHUNK_SIZE):
+        names = [index.name for index in chunk]
+        try:
+            stats = get_index_stats(ec, names)
+            validated = get_facts_validation(ec, names)
+        except Exception as e:
+            logging.getLogger(ERROR_LOGGER).warning(f"Could not refresh the statistics of the indices {names}: {e}")
+            continue
+
+        for index in chunk:
+            index_stats = stats.get(index.name, {})
+            index.size = index_stats.get("size", 0)
+            index.doc_count = index_stats.get("doc_count", 0)
+            index.has_validated_facts = validated.get(index.name, False)
+            index.stats_updated_at = now()
+        Index.objects.bulk_update(chunk, STATS_FIELDS)
+
+
+def refresh_stale_index_stats(max_age_minutes: int = INDEX_STATS_REFRESH_INTERVAL_IN_MINUTES):
+    """Refreshes the statistics of the indices that have none or are older than max_age_minutes, spreading the refreshes over the sync runs."""
+    stale_after = now() - timedelta(minutes=max_age_minutes)
+    refresh_index_stats(Index.objects.filter(Q(stats_updated_at__isnull=True) | Q(stats_updated_at__lt=stale_after)))
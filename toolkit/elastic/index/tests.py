@@ -2,8 +2,11 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from toolkit.elastic.index.field_cache import get_fields, invalidate_field_cache, refresh_field_cache
 from toolkit.elastic.index.models import Index
+from toolkit.elastic.index.stats import refresh_index_stats
 from texta_elastic.core import ElasticCore
+from toolkit.settings import TEXTA_TAGS_KEY
 from toolkit.tools.utils_for_tests import create_test_user, print_output
 
 
@@ -43,3 +46,104 @@ class IndexViewsTest(APITestCase):
             indices.delete()
             for index in names:
                 self.ec.delete_index(index=index, ignore=[400, 404])
+
+
+class IndexFieldCacheTest(APITestCase):
+
+    def setUp(self) -> None:
+        self.ec = ElasticCore()
+        self.index_name = "test_for_index_field_cache"
+        self.ec.es.indices.create(index=self.index_name, body={"mappings": {"properties": {"comment": {"type": "text"}}}}, ignore=[400, 404])
+        self.index, is_created = Index.objects.get_or_create(name=self.index_name)
+
+
+    def test_fields_are_cached_until_the_mapping_changes(self):
+        fields = get_fields([self.index_name])
+        print_output("test_fields_are_cached_until_the_mapping_changes:fields", fields)
+        self.assertEqual(fields, self.ec.get_fields([self.index_name]))
+        self.index.refresh_from_db()
+        self.assertTrue(self.index.field_cache is not None)
+
+        # Mapping changes outside of our code are detected by the mapping version.
+        self.ec.es.indices.put_mapping(index=self.index_name, body={"properties": {"title": {"type": "keyword"}}})
+        paths = [field["path"] for field in get_fields([self.index_name])]
+        self.assertTrue("title" in paths)
+
+        # Our own mapping changes drop the cached fields.
+        self.ec.add_texta_facts_mapping(self.index_name)
+        invalidate_field_cache([self.index_name])
+        self.index.refresh_from_db()
+        self.assertTrue(self.index.field_cache is None)
+        paths = [field["path"] for field in get_fields([self.index_name])]
+        self.assertTrue(TEXTA_TAGS_KEY in paths)
+
+
+    def test_refreshing_the_cache(self):
+        refresh_field_cache([self.index_name])
+        self.index.refresh_from_db()
+        self.assertTrue(self.index.field_cache is not None)
+        self.assertTrue(self.index.mapping_version is not None)
+        self.assertTrue(self.index.index_uuid is not None)
+
+
+    def test_recreated_index_is_not_served_from_the_cache(self):
+        get_fields([self.index_name])
+        # Mapping version of the new index starts over and can be equal to the cached one.
+        self.ec.es.indices.delete(index=self.index_name)
+        self.ec.es.indices.create(index=self.index_name, body={"mappings": {"properties": {"title": {"type": "keyword"}}}})
+        paths = [field["path"] for field in get_fields([self.index_name])]
+        print_output("test_recreated_index_is_not_served_from_the_cache:paths", paths)
+        self.assertTrue("title" in paths)
+        self.assertTrue("comment" not in paths)
+
+
+    def tearDown(self) -> None:
+        self.ec.es.indices.delete(index=self.index_name, ignore=[400, 404])
+
+
+class IndexStatsTest(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_test_user('user', 'my@email.com', 'pw', superuser=True)
+
+
+    def setUp(self) -> None:
+        self.client.login(username="user", password="pw")
+        self.ec = ElasticCore()
+        self.index_name = "test_for_index_stats"
+        self.ec.es.indices.create(index=self.index_name, ignore=[400, 404])
+        self.ec.add_texta_facts_mapping(self.index_name)
+        self.ec.es.index(index=self.index_name, body={"comment": "hello"}, refresh="wait_for")
+        self.index, is_created = Index.objects.get_or_create(name=self.index_name)
+
+
+    def test_listing_uses_the_stored_stats(self):
+        url = reverse("v2:index-list")
+        response = self.client.get(url, {"name": self.index_name})
+        print_output("test_listing_uses_the_stored_stats:response.data", response.data)
+        self.assertTrue(response.status_code == status.HTTP_200_OK)
+        index = response.data[0]
+        self.assertTrue(index["doc_count"] == 1)
+        self.assertTrue(index["size"] > 0)
+        self.assertTrue(index["has_validated_facts"] is True)
+
+        # Stats are not fetched again until they're refreshed.
+        self.ec.es.index(index=self.index_name, body={"comment": "world"}, refresh="wait_for")
+        response = self.client.get(url, {"name": self.index_name})
+        self.assertTrue(response.data[0]["doc_count"] == 1)
+        response = self.client.get(url, {"name": self.index_name, "refresh_stats": "true"})
+        self.assertTrue(response.data[0]["doc_count"] == 2)
+
+
+    def test_closed_index_stats_are_zeroed(self):
+        refresh_index_stats([self.index])
+        self.index.is_open = False
+        refresh_index_stats([self.index])
+        self.index.refresh_from_db()
+        self.assertTrue(self.index.doc_count == 0)
+        self.assertTrue(self.index.has_validated_facts is False)
+
+
+    def tearDown(self) -> None:
+        self.ec.es.indices.delete(index=self.index_name, ignore=[400, 404])
@@ -1,5 +1,5 @@
 import logging
-from typing import List, Optional
+from typing import List
 
 import rest_framework.filters as drf_filters
 from django.db import transaction
@@ -11,14 +11,16 @@ from rest_framework.response import Response
 from texta_elastic.core import ElasticCore
 
 from toolkit.elastic.exceptions import ElasticIndexAlreadyExists
+from toolkit.elastic.index.field_cache import invalidate_field_cache
 from toolkit.elastic.index.models import Index
 from toolkit.elastic.index.serializers import (
     IndexBulkDeleteSerializer, IndexSerializer, IndexUpdateSerializer
 )
+from toolkit.elastic.index.stats import refresh_index_stats
 from toolkit.helper_functions import chunks
 from toolkit.permissions.project_permissions import IsSuperUser
 from toolkit.serializer_constants import EmptySerializer
-from toolkit.settings import ERROR_LOGGER, TEXTA_TAGS_KEY
+from toolkit.settings import ERROR_LOGGER
 
 
 class IndicesFilter(filters.FilterSet):
@@ -65,83 +67,23 @@ class IndexViewSet(mixins.CreateModelMixin,
     )
 
 
-    def _resolve_cluster_differences(self, mapping_dict: dict) -> Optional[dict]:
-        # Trying to support ES6 and ES7 mapping structure.
-        has_properties = True if "properties" in mapping_dict else False
-        if has_properties:
-            return mapping_dict
-        # In this case, the mapping is a a plain dictionary because no fields exist.
-        else:
-            for key in mapping_dict.keys():
-                if "properties" in mapping_dict[key]:
-                    return mapping_dict[key]
-
-
-    def _check_for_facts(self, index_mappings: dict, index_name: str):
-        mapping_dict = index_mappings.get(index_name, {}).get("mappings", None)
-        # In case we have a faulty sync.
-        if mapping_dict is None:
-            return False
-
-        mapping_dict = self._resolve_cluster_differences(mapping_dict)
-
-        # In case there are no fields inside the mapping because it's a freshly
-        # created index.
-        if mapping_dict:
-            properties = mapping_dict["properties"]
-            facts = properties.get(TEXTA_TAGS_KEY, {})
-            typing = facts.get("type", None)
-            if typing == "nested":
-                return True
-            else:
-                return False
-        else:
-            return False
-
-
     def list(self, request, *args, **kwargs):
-        ec = ElasticCore()
-
-        response = super(IndexViewSet, self).list(request, *args, **kwargs)
-
-        data = response.data  # Get the paginated and sorted queryset results.
-        open_indices = [index for index in data if index["is_open"]]
-        mappings = ec.es.indices.get_mapping()
-
-        # Doing a stats request with no indices causes trouble.
-        if open_indices:
-            stats = ec.get_index_stats()
-
-            # Update the paginated and sorted queryset results.
-            for index in response.data:
-                name = index["name"]
-                is_open = index["is_open"]
-                if is_open:
-                    has_texta_facts_mapping = self._check_for_facts(index_mappings=mappings, index_name=name)
-                    if name in stats:
-                        index.update(**stats[name], has_validated_facts=has_texta_facts_mapping)
-                    else:
-                        index.update(has_validated_facts=False)
-                else:
-                    # For the sake of courtesy on the front-end, make closed indices values zero.
-                    index.update(size=0, doc_count=0, has_validated_facts=False)
-
-        return response
+        """
+        Lists the indices with their statistics from the database, the statistics are refreshed
+        by the periodic index sync. Indices without statistics are refreshed on the spot,
+        use ?refresh_stats=true to refresh the statistics of all the listed indices.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.query_params.get("refresh_stats", "false").lower() == "true":
+            refresh_index_stats(queryset)
+        else:
+            refresh_index_stats(queryset.filter(stats_updated_at__isnull=True))
+        return super(IndexViewSet, self).list(request, *args, **kwargs)
 
 
     def retrieve(self, request, *args, **kwargs):
-        ec = ElasticCore()
-        response = super(IndexViewSet, self).retrieve(*args, *kwargs)
-        if response.data["is_open"]:
-            index_name = response.data["name"]
-            mapping = ec.es.indices.get_mapping(index_name)
-            has_validated_facts = self._check_for_facts(mapping, index_name)
-            stats = ec.get_index_stats()
-            response.data.update(**stats[index_name], has_validated_facts=has_validated_facts)
-        else:
-            response.data.update(size=0, doc_count=0, has_validated_facts=False)
-
-        return response
+        refresh_index_stats([self.get_object()])
+        return super(IndexViewSet, self).retrieve(request, *args, **kwargs)
 
 
     def create(self, request, **kwargs):
@@ -267,6 +209,7 @@ class IndexViewSet(mixins.CreateModelMixin,
     @action(detail=False, methods=['post'], serializer_class=EmptySerializer)
     def sync_indices(self, request, pk=None, project_pk=None):
         ElasticCore().syncher()
+        refresh_index_stats(Index.objects.all())
         return Response({"message": "Synched everything successfully!"}, status=status.HTTP_204_NO_CONTENT)
 
 
@@ -277,6 +220,7 @@ class IndexViewSet(mixins.CreateModelMixin,
         es_core.close_index(index.name)
         index.is_open = False
         index.save()
+        refresh_index_stats([index])
         return Response({"message": f"Closed the index {index.name}"})
 
 
@@ -288,6 +232,7 @@ class IndexViewSet(mixins.CreateModelMixin,
         if not index.is_open:
             index.is_open = True
             index.save()
+        refresh_index_stats([index])
 
         return Response({"message": f"Opened the index {index.name}"})
 
@@ -298,6 +243,8 @@ class IndexViewSet(mixins.CreateModelMixin,
         index = Index.objects.get(pk=pk)
         if index.is_open:
             es_core.add_texta_facts_mapping(index.name)
+            invalidate_field_cache([index.name])
+            refresh_index_stats([index])
             return Response({"message": f"Added the Texta Facts mapping for: {index.name}"})
         else:
             return Response({"message": f"Index {index.name} is closed, could not add the mapping!"}, status=status.HTTP_400_BAD_REQUEST)
@@ -123,5 +123,5 @@ class IndexSplitterSerializer(FieldParseSerializer, serializers.HyperlinkedModel
 
     def _get_project_fields(self):
         project_obj = Project.objects.get(id=self.context['view'].kwargs['project_pk'])
-        project_fields = ElasticCore().get_fields(indices=project_obj.get_indices())
+        project_fields = project_obj.get_elastic_fields()
         return project_fields
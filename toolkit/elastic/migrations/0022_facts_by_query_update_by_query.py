@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elastic', '0021_analyzers_tasks_reformat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deletefactsbyquerytask',
+            name='requests_per_second',
+            field=models.FloatField(default=-1, help_text='Throttling of the update by query in sub-requests per second, -1 disables throttling.'),
+        ),
+        migrations.AddField(
+            model_name='deletefactsbyquerytask',
+            name='use_update_by_query',
+            field=models.BooleanField(default=False, help_text='Whether to change the facts inside Elasticsearch with an update by query instead of passing the documents through the workers.'),
+        ),
+        migrations.AddField(
+            model_name='editfactsbyquerytask',
+            name='requests_per_second',
+            field=models.FloatField(default=-1, help_text='Throttling of the update by query in sub-requests per second, -1 disables throttling.'),
+        ),
+        migrations.AddField(
+            model_name='editfactsbyquerytask',
+            name='use_update_by_query',
+            field=models.BooleanField(default=False, help_text='Whether to change the facts inside Elasticsearch with an update by query instead of passing the documents through the workers.'),
+        ),
+    ]
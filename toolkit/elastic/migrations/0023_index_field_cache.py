@@ -0,0 +1,23 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elastic', '0022_facts_by_query_update_by_query'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='index',
+            name='field_cache',
+            field=models.TextField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='index',
+            name='mapping_version',
+            field=models.BigIntegerField(default=None, null=True),
+        ),
+    ]
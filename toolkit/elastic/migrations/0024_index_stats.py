@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elastic', '0023_index_field_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='index',
+            name='doc_count',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='index',
+            name='has_validated_facts',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='index',
+            name='size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='index',
+            name='stats_updated_at',
+            field=models.DateTimeField(default=None, null=True),
+        ),
+    ]
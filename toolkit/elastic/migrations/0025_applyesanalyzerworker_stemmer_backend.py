@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elastic', '0024_index_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applyesanalyzerworker',
+            name='stemmer_backend',
+            field=models.CharField(choices=[('elasticsearch', 'elasticsearch'), ('local', 'local')], default='elasticsearch', max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('elastic', '0025_applyesanalyzerworker_stemmer_backend'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='index',
+            name='index_uuid',
+            field=models.CharField(default=None, max_length=100, null=True),
+        ),
+    ]
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from texta_elastic.core import ElasticCore
 
 from toolkit.core.project.models import Project
+from toolkit.elastic.index.field_cache import get_fields
 from toolkit.elastic.reindexer.models import Reindexer
 from toolkit.elastic.validators import (
     check_for_banned_beginning_chars,
@@ -70,7 +71,7 @@ class ReindexerCreateSerializer(FieldParseSerializer, serializers.HyperlinkedMod
         project_obj: Project = Project.objects.get(id=self.context['view'].kwargs['project_pk'])
         indices = self.context["request"].data.get("indices", [])
         indices = project_obj.get_available_or_all_project_indices(indices)
-        project_fields = ElasticCore().get_fields(indices=indices)
+        project_fields = get_fields(indices)
         field_data = [field["path"] for field in project_fields]
         for field in value:
             if field not in field_data:
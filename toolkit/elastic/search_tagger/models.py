@@ -28,13 +28,14 @@ class SearchQueryTagger(CommonModelMixin):
 
 
     def process(self):
-        from toolkit.elastic.search_tagger.tasks import start_search_query_tagger_worker, apply_search_query_tagger_on_index, end_search_query_tagger_task
+        from toolkit.elastic.search_tagger.tasks import start_search_query_tagger_worker, apply_search_query_tagger_on_index
 
         new_task = Task.objects.create(searchquerytagger=self, status=Task.STATUS_CREATED, task_type=Task.TYPE_APPLY)
         self.save()
         self.tasks.add(new_task)
 
-        chain = start_search_query_tagger_worker.s() | apply_search_query_tagger_on_index.s() | end_search_query_tagger_task.s()
+        # The task is completed once all the slices of the index are tagged.
+        chain = start_search_query_tagger_worker.s() | apply_search_query_tagger_on_index.s()
         transaction.on_commit(lambda: chain.apply_async(args=(self.pk,), queue=CELERY_LONG_TERM_TASK_QUEUE))
 
 
@@ -59,11 +60,12 @@ class SearchFieldsTagger(CommonModelMixin):
 
 
     def process(self):
-        from toolkit.elastic.search_tagger.tasks import start_search_fields_tagger_worker, apply_search_fields_tagger_on_index, end_search_fields_tagger_task
+        from toolkit.elastic.search_tagger.tasks import start_search_fields_tagger_worker, apply_search_fields_tagger_on_index
 
         new_task = Task.objects.create(searchfieldstagger=self, status=Task.STATUS_CREATED, task_type=Task.TYPE_APPLY)
         self.save()
         self.tasks.add(new_task)
 
-        chain = start_search_fields_tagger_worker.s() | apply_search_fields_tagger_on_index.s() | end_search_fields_tagger_task.s()
+        # The task is completed once all the slices of the index are tagged.
+        chain = start_search_fields_tagger_worker.s() | apply_search_fields_tagger_on_index.s()
         chain.apply_async(args=(self.pk,), queue=CELERY_LONG_TERM_TASK_QUEUE)
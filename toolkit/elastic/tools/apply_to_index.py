@@ -0,0 +1,139 @@
+import math
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from billiard.pool import Pool
+from django.db import connections
+from texta_elastic.core import ElasticCore
+from texta_elastic.document import ElasticDocument
+
+from toolkit.settings import APPLY_TO_INDEX_MAX_PENDING_BATCHES, TEXTA_TAGS_KEY
+
+
+# What the batch functions return for every document of the batch:
+# a list of new facts that is merged with the existing ones or a partial document for the update.
+OUTPUT_FACTS = "facts"
+OUTPUT_DOC = "doc"
+
+BatchFunction = Callable[[List[dict]], List]
+
+# Factories of the batch functions keyed by the name of the applier with their output and number of processes.
+INDEX_APPLIERS: Dict[str, Tuple[Callable[..., BatchFunction], str, int]] = {}
+
+# Batch function of the pool processes, set before the processes are forked so that it doesn't have to be pickled.
+_pool_batch_function: Optional[BatchFunction] = None
+
+
+def index_applier(name: str, output: str = OUTPUT_FACTS, processes: int = 0):
+    """
+    Registers a factory of a batch function for apply_to_index under the given name.
+    The factory is called with the applier kwargs once in every slice task and returns a function
+    that takes the sources of a scroll page and returns the output of every document.
+    :param processes: Number of processes the batch function is applied in for CPU bound appliers, 0 applies it in the slice task.
+    """
+
+
+    def decorator(factory: Callable[..., BatchFunction]):
+        INDEX_APPLIERS[name] = (factory, output, processes)
+        return factory
+
+
+    return decorator
+
+
+def get_slice_query(query: dict, slice_id: int, max_slices: int) -> dict:
+    """Adds the sliced scroll parameters to the query, a single slice scrolls through all the documents."""
+    if max_slices < 2:
+        return query
+    return {**query, "slice": {"id": slice_id, "max": max_slices}}
+
+
+def get_slice_count(count: int, scroll_size: int, max_slices: int) -> int:
+    """Number of slices the documents are split into, every slice holds at least a page of documents."""
+    return max(1, min(max_slices, math.ceil(count / scroll_size)))
+
+
+def get_field_texts(ec: ElasticCore, sources: List[dict], fields: List[str]) -> List[Tuple[int, str, str]]:
+    """Returns the non-empty texts of the fields in the sources as (document index, field, text) triples."""
+    field_texts = []
+    for doc_index, source in enumerate(sources):
+        flat_source = ec.flatten(source)
+        for field in fields:
+            text = flat_source.get(field, None)
+            if text and isinstance(text, str):
+                field_texts.append((doc_index, field, text))
+    return field_texts
+
+
+def _process_pool_batch(sources: List[dict]) -> List:
+    return _pool_batch_function(sources)
+
+
+def process_pages(pages: Iterator[List[dict]], process_batch: BatchFunction, processes: int = 0, max_pending: int = APPLY_TO_INDEX_MAX_PENDING_BATCHES) -> Iterator[Tuple[List[dict], List]]:
+    """
+    Applies the batch function on the sources of every scroll page and yields the pages with their results in the scroll order.
+    With processes the pages are processed in a pool of forked processes while the next ones are scrolled,
+    at most max_pending pages are waiting for the pool at once.
+    """
+    if processes < 1:
+        for page in pages:
+            yield page, process_batch([hit["_source"] for hit in page])
+        return
+
+    global _pool_batch_function
+    _pool_batch_function = process_batch
+    # Forked processes must not share the database connections, the parent reconnects on its next query.
+    connections.close_all()
+    pool = Pool(processes=processes)
+    try:
+        pending = deque()
+        for page in pages:
+            pending.append((page, pool.apply_async(_process_pool_batch, ([hit["_source"] for hit in page],))))
+            if len(pending) >= max(max_pending, processes):
+                page, result = pending.popleft()
+                yield page, result.get()
+        while pending:
+            page, result = pending.popleft()
+            yield page, result.get()
+    finally:
+        pool.terminate()
+        _pool_batch_function = None
+
+
+def get_update_actions(pages: Iterator[List[dict]], process_batch: BatchFunction, output: str = OUTPUT_FACTS, task_object=None, processes: int = 0) -> Iterator[dict]:
+    """
+    Applies the batch function on every scroll page of raw hits and yields the update actions.
+    New facts are added to the existing ones without duplicates, the progress is added to the task_object per page.
+    :param processes: Number of processes the batch function is applied in, see process_pages.
+    """
+    # Existing facts are copied before the batch function gets the sources.
+    existing_facts_of_pages = deque()
+
+
+    def read_pages():
+        for page in pages:
+            existing_facts_of_pages.append([list(hit["_source"].get(TEXTA_TAGS_KEY, [])) for hit in page])
+            yield page
+
+
+    for page, results in process_pages(read_pages(), process_batch, processes=processes):
+        existing_facts = existing_facts_of_pages.popleft()
+
+        for hit, facts, result in zip(page, existing_facts, results):
+            if output == OUTPUT_FACTS:
+                facts = ElasticDocument.remove_duplicate_facts(facts + result) if facts or result else []
+                doc = {TEXTA_TAGS_KEY: facts}
+            else:
+                doc = result
+
+            yield {
+                "_index": hit["_index"],
+                "_id": hit["_id"],
+                "_type": hit.get("_type", "_doc"),
+                "_op_type": "update",
+                "retry_on_conflict": 3,
+                "doc": doc
+            }
+
+        if task_object:
+            task_object.update_progress_iter(len(page))
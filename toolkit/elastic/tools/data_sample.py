@@ -1,5 +1,7 @@
+import copy
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from random import shuffle
 from typing import List, Optional
 
@@ -11,14 +13,20 @@ from texta_elastic.aggregator import ElasticAggregator
 from toolkit.elastic.tools.feedback import Feedback
 from texta_elastic.query import Query
 from texta_elastic.searcher import ElasticSearcher
-from toolkit.settings import INFO_LOGGER
-from toolkit.tools.lemmatizer import ElasticAnalyzer
+from toolkit.settings import DATA_SAMPLE_WORKERS, INFO_LOGGER, STEMMER_BACKEND
+from toolkit.tools.lemmatizer import get_analyzer
 from texta_elastic.core import ElasticCore
 from ..choices import ES6_SNOWBALL_MAPPING, ES7_SNOWBALL_MAPPING
 from ..exceptions import InvalidDataSampleError
 from ...tools.show_progress import ShowProgress
 
 
+# Maximum number of class queries combined into a single boolean query of the negative sample query.
+NEGATIVE_QUERY_CLAUSE_LIMIT = 500
+# Maximum scroll page size of the negative sample, smaller samples are fetched with a single page.
+NEGATIVE_SAMPLE_SCROLL_SIZE = 1000
+
+
 class DataSample:
     """Re-usable object for handling positive and negative data samples for Taggers and TorchTaggers."""
 
@@ -35,7 +43,9 @@ class DataSample:
                  detect_lang: bool = False,
                  balance: bool = False,
                  use_sentence_shuffle: bool = False,
-                 balance_to_max_limit: bool = False):
+                 balance_to_max_limit: bool = False,
+                 stemmer_backend: str = STEMMER_BACKEND,
+                 sample_workers: int = DATA_SAMPLE_WORKERS):
         """
         :param model_object:
         :param indices: List of Elasticsearch index names where the documents will be pulled from.
@@ -46,6 +56,8 @@ class DataSample:
         :param add_negative_sample:
         :param snowball_language: Which language stemmer to use on the document. Based on internal Elasticsearch values.
         :param detect_lang: Whether to apply the stemmer based on the pre-detected values in the document itself.
+        :param stemmer_backend: Whether to stem the texts with Elasticsearch or locally with NLTK.
+        :param sample_workers: Number of classes scrolled concurrently, 1 scrolls them one by one.
         """
         self.tagger_object = model_object
         self.show_progress = show_progress
@@ -58,7 +70,8 @@ class DataSample:
         self.balance = balance
         self.use_sentence_shuffle = use_sentence_shuffle
         self.balance_to_max_limit = balance_to_max_limit
-        self.class_display_name = None  # used for logging messages related to taggers in tagger groups
+        self.stemmer_backend = stemmer_backend
+        self.sample_workers = sample_workers
         self.max_class_size = self._get_max_class_size()
         self.class_names, self.queries = self._prepare_class_names_with_queries()
         self.ignore_ids = set()
@@ -167,12 +180,14 @@ class DataSample:
         Stems the texts in data sample using Snowball.
         """
         if snowball_language:
-            lemmatizer = ElasticAnalyzer()
+            lemmatizer = get_analyzer(backend=self.stemmer_backend)
             for cl, examples in self.data.items():
-                processed_examples = []
-                for example_doc in examples:
-                    new_example_doc = {k: lemmatizer.stem_text(v, language=snowball_language) for k, v in example_doc.items()}
-                    processed_examples.append(new_example_doc)
+                # Stem all the texts of the class in batches.
+                keys = [(example_index, k) for example_index, example_doc in enumerate(examples) for k in example_doc]
+                stemmed_texts = lemmatizer.stem_texts([examples[example_index][k] for example_index, k in keys], language=snowball_language)
+                processed_examples = [{} for _ in examples]
+                for (example_index, k), stemmed_text in zip(keys, stemmed_texts):
+                    processed_examples[example_index][k] = stemmed_text
                 self.data[cl] = processed_examples
 
 
@@ -180,9 +195,10 @@ class DataSample:
         """
         Stems the texts in data sample using Snowball.
         """
-        lemmatizer = ElasticAnalyzer()
+        lemmatizer = get_analyzer(backend=self.stemmer_backend)
         for cl, examples in self.data.items():
-            processed_examples = []
+            # Group the texts by language to stem them in batches.
+            keys_by_language = {}
             for example_doc in examples:
                 for key, value in example_doc.items():
                     # Use this string to differentiate between original and MLP added fields.
@@ -191,10 +207,14 @@ class DataSample:
                         if lang is not None:
                             snowball_language = self.humanize_lang_code(lang)
                             if snowball_language:
-                                example_doc[key] = lemmatizer.stem_text(example_doc[key], snowball_language)
-                processed_examples.append(example_doc)
+                                keys_by_language.setdefault(snowball_language, []).append((example_doc, key))
 
-            self.data[cl] = processed_examples
+            for snowball_language, keys in keys_by_language.items():
+                stemmed_texts = lemmatizer.stem_texts([example_doc[key] for example_doc, key in keys], snowball_language)
+                for (example_doc, key), stemmed_text in zip(keys, stemmed_texts):
+                    example_doc[key] = stemmed_text
+
+            self.data[cl] = examples
 
 
     @staticmethod
@@ -260,8 +280,8 @@ class DataSample:
         return tag_values
 
 
-    def _set_class_display_name(self, class_name: str):
-        """ Sets a class display name for logger messages as a plain class name ("true")
+    def _get_class_display_name(self, class_name: str) -> str:
+        """ Returns a class display name for logger messages as a plain class name ("true")
         is uniformative for taggers related to a Tagger Group.
         """
         try:
@@ -271,9 +291,9 @@ class DataSample:
             tagger_groups = []
 
         if tagger_groups:
-            self.class_display_name = self.tagger_object.description
+            return self.tagger_object.description
         else:
-            self.class_display_name = class_name
+            return class_name
 
 
     def _get_samples_for_classes(self):
@@ -284,13 +304,15 @@ class DataSample:
         if not self.class_names:
             return samples
 
-        for i, class_name in enumerate(self.class_names):
-            self.show_progress.update_step(f"scrolling sample for {class_name}")
-            self.show_progress.update_view(0)
-
-            self._set_class_display_name(class_name)
+        if self.sample_workers > 1 and len(self.class_names) > 1:
+            samples = self._get_samples_for_classes_concurrently()
+        else:
+            for i, class_name in enumerate(self.class_names):
+                self.show_progress.update_step(f"scrolling sample for {class_name}")
+                self.show_progress.update_view(0)
 
-            samples[class_name] = self._get_class_sample(self.queries[i], class_name)
+                samples[class_name], positive_ids = self._get_class_sample(self.queries[i], class_name, callback_progress=self.show_progress)
+                self.ignore_ids.update(positive_ids)
         # if only one class, add negatives automatically
         # add negatives as additional class if asked
         if len(self.class_names) < 2 or self.add_negative_sample:
@@ -302,6 +324,41 @@ class DataSample:
         return samples
 
 
+    def _copy_text_processor(self) -> Optional[TextProcessor]:
+        """
+        Returns a copy of the text processor for a scrolling thread as TextProcessor is not thread-safe.
+        The lemmatizer and phraser are shared as they only read their models and hold connections that can't be copied.
+        """
+        if self.text_processor is None:
+            return None
+        shared_resources = [self.text_processor.lemmatizer, self.text_processor.phraser]
+        memo = {id(resource): resource for resource in shared_resources if resource is not None}
+        return copy.deepcopy(self.text_processor, memo)
+
+
+    def _get_samples_for_classes_concurrently(self) -> dict:
+        """
+        Scrolls the samples of the classes with self.sample_workers threads, every class gets a text processor of its own.
+        Scrolls run in parallel, so progress is updated per finished class instead of per scroll page.
+        """
+        self.show_progress.update_step(f"scrolling samples for {len(self.class_names)} classes")
+        self.show_progress.update_view(0)
+
+        samples = {}
+        with ThreadPoolExecutor(max_workers=self.sample_workers) as executor:
+            futures = {
+                executor.submit(self._get_class_sample, query, class_name, text_processor=self._copy_text_processor()): class_name
+                for class_name, query in zip(self.class_names, self.queries)
+            }
+            for finished_count, future in enumerate(as_completed(futures), start=1):
+                samples[futures[future]], positive_ids = future.result()
+                self.ignore_ids.update(positive_ids)
+                self.show_progress.update_view(100.0 * finished_count / len(futures))
+
+        # Keep the order of the classes as the size of the negative sample depends on the first one.
+        return {class_name: samples[class_name] for class_name in self.class_names}
+
+
     @staticmethod
     def _extract_content(doc: dict, field: str) -> str:
         """Extracts content from a potentially nested field."""
@@ -358,7 +415,7 @@ class DataSample:
         return doc
 
 
-    def _duplicate_examples(self, positive_sample: List[dict], class_name: str, limit: int):
+    def _duplicate_examples(self, positive_sample: List[dict], class_name: str, limit: int, class_display_name: str):
         """ Generate addtional examples by duplicating them for underrepresented classes."""
         # If balancing to max limit is enabled, set the number of samples to max sample size
         if self.balance_to_max_limit:
@@ -370,57 +427,63 @@ class DataSample:
 
         if len(positive_sample) < n_samples:
             n = n_samples - len(positive_sample)
-            logging.getLogger(INFO_LOGGER).info(f"Adding {n} examples for class {self.class_display_name}")
+            logging.getLogger(INFO_LOGGER).info(f"Adding {n} examples for class {class_display_name}")
 
             # Generate the required amount of additional documents by sampling with replacements
             additions = list(np.random.choice(positive_sample, size=n, replace=True))
 
             # If sentence shuffling is enabled, shuffle the sentences in the additional documents
             if self.use_sentence_shuffle:
-                logging.getLogger(INFO_LOGGER).info(f"Shuffling sentences in additional examples of class {self.class_display_name}")
+                logging.getLogger(INFO_LOGGER).info(f"Shuffling sentences in additional examples of class {class_display_name}")
                 additions = [self._shuffle_content(doc, self.field_data) for doc in additions]
             positive_sample.extend(additions)
             shuffle(positive_sample)
         return positive_sample
 
 
-    def _get_class_sample(self, query, class_name):
-        """Returns sample for given class"""
+    def _get_class_sample(self, query, class_name, callback_progress: ShowProgress = None, text_processor: TextProcessor = None):
+        """
+        Returns sample for given class and the ids of the sampled documents, which are collected
+        only for the queries that match all the documents as those can't be excluded from the negative sample.
+        :param text_processor: Text processor used instead of self.text_processor when scrolling in a separate thread.
+        """
+        class_display_name = self._get_class_display_name(class_name)
         # limit the docs according to max sample size & feedback size
         limit = int(self.tagger_object.maximum_sample_size)
 
         if class_name in self.feedback:
             limit = limit - len(self.feedback[class_name])
 
-        logging.getLogger(INFO_LOGGER).info(f"Collecting examples for class {self.class_display_name} (max limit = {limit})...")
+        logging.getLogger(INFO_LOGGER).info(f"Collecting examples for class {class_display_name} (max limit = {limit})...")
         # iterator for retrieving positive sample by query
         positive_sample_iterator = ElasticSearcher(
             query=query,
             indices=self.indices,
             field_data=self.field_data,
             output=ElasticSearcher.OUT_DOC_WITH_ID,
-            callback_progress=self.show_progress,
+            callback_progress=callback_progress,
             scroll_limit=limit,
-            text_processor=self.text_processor
+            text_processor=text_processor if text_processor is not None else self.text_processor
         )
         positive_sample = []
-        # set positive ids to ignore while scrolling for negatives
+        positive_ids = set()
+        collect_ids = self._matches_all_documents(query)
         for doc in positive_sample_iterator:
-            self.ignore_ids.add(doc["_id"])
-            # remove id from doc
-            del doc["_id"]
+            doc_id = doc.pop("_id")
+            if collect_ids:
+                positive_ids.add(doc_id)
             positive_sample.append(doc)
 
-        logging.getLogger(INFO_LOGGER).info(f"Found {len(positive_sample)} examples for {self.class_display_name}...")
+        logging.getLogger(INFO_LOGGER).info(f"Found {len(positive_sample)} examples for {class_display_name}...")
 
         # If class balancing is enabled, modify number of required samples
         if self.balance:
-            positive_sample = self._duplicate_examples(positive_sample, class_name, limit)
+            positive_sample = self._duplicate_examples(positive_sample, class_name, limit, class_display_name)
 
         # document doct to value string if asked
         if self.join_fields:
             positive_sample = self._join_fields(positive_sample)
-        return positive_sample
+        return positive_sample, positive_ids
 
 
     def _get_feedback(self):
@@ -441,7 +504,7 @@ class DataSample:
         # iterator to list
         feedback_sample = list(feedback_sample)
         feedback_sample_content = []
-        # set positive ids to ignore while scrolling for negatives
+        # set feedback ids to ignore while scrolling for negatives
         for doc in feedback_sample:
             self.ignore_ids.add(doc["_id"])
             content = json.loads(doc['content'])
@@ -451,18 +514,68 @@ class DataSample:
         return feedback_sample_content
 
 
+    @staticmethod
+    def _remove_inner_hits(query):
+        """Removes inner hits from the query as their names would collide when the queries are combined."""
+        if isinstance(query, dict):
+            return {key: DataSample._remove_inner_hits(value) for key, value in query.items() if key != "inner_hits"}
+        elif isinstance(query, list):
+            return [DataSample._remove_inner_hits(item) for item in query]
+        return query
+
+
+    @staticmethod
+    def _matches_all_documents(query: dict) -> bool:
+        """Whether the query matches every document, like the default query of binary taggers."""
+        query_body = query.get("query", None) if isinstance(query, dict) else None
+        if not query_body or "match_all" in query_body:
+            return True
+        if list(query_body.keys()) == ["bool"]:
+            clauses = [query_body["bool"].get(occur, None) for occur in ("must", "filter", "should", "must_not")]
+            return not any(clauses)
+        return False
+
+
+    def _create_negative_query(self) -> dict:
+        """
+        Creates a query for documents which match none of the class queries nor the ignored documents,
+        scored randomly so that the first documents of the scroll form a random sample.
+        Class queries that match all the documents are not excluded, only their sampled documents are.
+        """
+        positive_queries = [self._remove_inner_hits(query["query"]) for query in self.queries if not self._matches_all_documents(query)]
+        # Group the class queries to stay below the clause limit of a single boolean query.
+        must_not = [
+            {"bool": {"should": positive_queries[i:i + NEGATIVE_QUERY_CLAUSE_LIMIT]}}
+            for i in range(0, len(positive_queries), NEGATIVE_QUERY_CLAUSE_LIMIT)
+        ]
+        if self.ignore_ids:
+            must_not.append({"ids": {"values": list(self.ignore_ids)}})
+        return {
+            "query": {
+                "function_score": {
+                    "query": {"bool": {"must_not": must_not}},
+                    "functions": [{"random_score": {}}],
+                    "boost_mode": "replace"
+                }
+            }
+        }
+
+
     def _get_negatives(self, size):
         self.show_progress.update_step("scrolling negative sample")
         self.show_progress.update_view(0)
-        # iterator for retrieving negative examples
+        scroll_limit = int(size * float(self.tagger_object.negative_multiplier))
+        # iterator for retrieving negative examples,
+        # positives are filtered out by Elasticsearch so only the needed documents are transferred
         negative_sample_iterator = ElasticSearcher(
+            query=self._create_negative_query(),
             indices=self.indices,
             field_data=self.field_data,
             output=ElasticSearcher.OUT_DOC,
             callback_progress=self.show_progress,
             text_processor=self.text_processor,
-            scroll_limit=int(size * float(self.tagger_object.negative_multiplier)),
-            ignore_ids=self.ignore_ids,
+            scroll_limit=scroll_limit,
+            scroll_size=max(1, min(scroll_limit, NEGATIVE_SAMPLE_SCROLL_SIZE))
         )
         # iterator to list
         negative_sample = list(negative_sample_iterator)
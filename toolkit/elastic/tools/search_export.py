@@ -0,0 +1,131 @@
+import csv
+import gzip
+import json
+import os
+import pathlib
+from typing import Iterator, List
+
+from texta_elastic.core import ElasticCore
+
+from toolkit.elastic.index.field_cache import get_fields
+from toolkit.helper_functions import hash_string
+
+
+EXPORT_FORMAT_JSONL = "jl"
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_PARQUET = "parquet"
+EXPORT_FORMATS = (EXPORT_FORMAT_JSONL, EXPORT_FORMAT_CSV, EXPORT_FORMAT_PARQUET)
+
+# Size of the write buffer of the export files in bytes.
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# Keys of the search body that don't apply to the export of the whole result set.
+NON_EXPORT_KEYS = ("sort", "size", "from", "aggs", "aggregations", "highlight")
+
+
+def get_export_file_name(indices: List[str], query: dict, fields: List[str], file_format: str = EXPORT_FORMAT_JSONL, compress: bool = False) -> str:
+    """
+    Name of the export file is a hash of everything that affects its content,
+    so identical exports replace the same file instead of creating duplicates.
+    """
+    content = json.dumps({"indices": sorted(indices), "query": query, "fields": fields, "format": file_format, "compress": compress}, sort_keys=True, ensure_ascii=False)
+    extension = file_format
+    # Parquet files are compressed internally by the column chunks.
+    if compress and file_format != EXPORT_FORMAT_PARQUET:
+        extension = f"{extension}.gz"
+    return f"{hash_string(content)}.{extension}"
+
+
+def get_export_body(query: dict) -> dict:
+    """Returns the search body without ordering, pagination and aggregations, which is used for counting and scrolling the results."""
+    return {key: value for key, value in query.items() if key not in NON_EXPORT_KEYS}
+
+
+def get_export_columns(indices: List[str], fields: List[str]) -> List[str]:
+    """Columns of the tabular exports, either the selected fields or every field in the mapping of the indices."""
+    if fields:
+        return list(fields)
+    paths = {field["path"] for field in get_fields(indices)}
+    return sorted(paths)
+
+
+def _open_text_file(path: pathlib.Path, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf8", newline="")
+    return open(path, "w", encoding="utf8", newline="", buffering=EXPORT_BUFFER_SIZE)
+
+
+def _get_cell(source: dict, flat_source: dict, column: str):
+    """Returns the value of the column as a string, objects and lists are stored as JSON."""
+    value = flat_source.get(column, None)
+    if value is None:
+        # Columns of whole objects are missing from the flattened source.
+        value = source
+        for key in column.split("."):
+            value = value.get(key, None) if isinstance(value, dict) else None
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _get_rows(pages: Iterator[List[dict]], columns: List[str], task_object=None) -> Iterator[List[list]]:
+    ec = ElasticCore()
+    for page in pages:
+        rows = []
+        for hit in page:
+            source = hit["_source"]
+            flat_source = ec.flatten(source)
+            rows.append([_get_cell(source, flat_source, column) for column in columns])
+        yield rows
+        if task_object:
+            task_object.update_progress_iter(len(page))
+
+
+def _write_jsonl(pages: Iterator[List[dict]], path: pathlib.Path, compress: bool, task_object=None):
+    with _open_text_file(path, compress) as fp:
+        for page in pages:
+            fp.write("".join(json.dumps(hit["_source"], ensure_ascii=False) + "\n" for hit in page))
+            if task_object:
+                task_object.update_progress_iter(len(page))
+
+
+def _write_csv(pages: Iterator[List[dict]], path: pathlib.Path, columns: List[str], compress: bool, task_object=None):
+    with _open_text_file(path, compress) as fp:
+        writer = csv.writer(fp)
+        writer.writerow(columns)
+        for rows in _get_rows(pages, columns, task_object=task_object):
+            writer.writerows(rows)
+
+
+def _write_parquet(pages: Iterator[List[dict]], path: pathlib.Path, columns: List[str], compress: bool, task_object=None):
+    # Only required for Parquet exports.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Every column is stored as a string as the types of the fields may differ between the pages and indices.
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    with pq.ParquetWriter(str(path), schema, compression="gzip" if compress else "snappy") as writer:
+        for rows in _get_rows(pages, columns, task_object=task_object):
+            if rows:
+                table = pa.Table.from_arrays([pa.array(column, type=pa.string()) for column in zip(*rows)], schema=schema)
+                writer.write_table(table)
+
+
+def write_export_file(pages: Iterator[List[dict]], path: pathlib.Path, columns: List[str], file_format: str = EXPORT_FORMAT_JSONL, compress: bool = False, task_object=None):
+    """
+    Writes the scroll pages of raw hits into the export file page by page, the progress is added to the task_object per page.
+    The file is written under a temporary name and moved into place once it's complete, so an existing file is always a finished export.
+    :param columns: Columns of the CSV and Parquet exports, ignored for JSON lines.
+    """
+    path = pathlib.Path(path)
+    part_path = path.with_name(f".{path.name}.{os.getpid()}.part")
+    try:
+        if file_format == EXPORT_FORMAT_CSV:
+            _write_csv(pages, part_path, columns, compress, task_object=task_object)
+        elif file_format == EXPORT_FORMAT_PARQUET:
+            _write_parquet(pages, part_path, columns, compress, task_object=task_object)
+        else:
+            _write_jsonl(pages, part_path, compress, task_object=task_object)
+        os.replace(part_path, path)
+    finally:
+        if part_path.exists():
+            part_path.unlink()
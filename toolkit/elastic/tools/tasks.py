@@ -0,0 +1,110 @@
+import json
+import logging
+import pathlib
+from itertools import islice
+from typing import List
+
+from celery import group
+from celery.decorators import task
+from elasticsearch.helpers import scan, streaming_bulk
+from texta_elastic.core import ElasticCore
+from texta_elastic.searcher import ElasticSearcher
+
+from toolkit.base_tasks import TransactionAwareTask
+from toolkit.core.task.models import Task
+from toolkit.elastic.index.field_cache import invalidate_field_cache
+from toolkit.elastic.tools.apply_to_index import INDEX_APPLIERS, OUTPUT_FACTS, get_slice_count, get_slice_query, get_update_actions
+from toolkit.elastic.tools.search_export import get_export_body, get_export_columns, write_export_file
+from toolkit.settings import APPLY_TO_INDEX_MAX_SLICES, CELERY_LONG_TERM_TASK_QUEUE, ERROR_LOGGER, INFO_LOGGER, SEARCH_EXPORT_SCROLL_SIZE, TEXTA_TAGS_KEY
+
+
+def apply_to_index(applier: str, applier_kwargs: dict, task_object: Task, indices: List[str], fields: List[str], query: dict, bulk_size: int = 100,
+                   max_chunk_bytes: int = 104857600, es_timeout: int = 10, queue: str = CELERY_LONG_TERM_TASK_QUEUE, max_slices: int = APPLY_TO_INDEX_MAX_SLICES):
+    """
+    Applies a registered applier on the documents matching the query. The documents are split into
+    sliced scrolls which are processed in parallel by separate Celery tasks, the task_object is
+    completed once all the slices are done.
+    :param applier: Name the batch function factory was registered with using index_applier.
+    :param applier_kwargs: JSON serializable arguments of the factory.
+    """
+    ec = ElasticCore()
+    for index in indices:
+        ec.add_texta_facts_mapping(index)
+    invalidate_field_cache(indices)
+
+    factory, output, processes = INDEX_APPLIERS[applier]
+    field_data = fields + [TEXTA_TAGS_KEY] if output == OUTPUT_FACTS else fields
+
+    count = ElasticSearcher(indices=indices, query=query).count()
+    task_object.set_total(count)
+    task_object.update_status(Task.STATUS_RUNNING)
+
+    slice_count = get_slice_count(count, bulk_size, max_slices)
+    logging.getLogger(INFO_LOGGER).info(f"Applying {applier} on {count} documents in {slice_count} slices for Task ID: {task_object.pk}!")
+    slices = group(
+        apply_slice_to_index.s(applier, applier_kwargs, task_object.pk, indices, field_data, query, slice_id, slice_count, bulk_size, max_chunk_bytes, es_timeout).set(queue=queue)
+        for slice_id in range(slice_count)
+    )
+    chain = slices | end_apply_to_index.si(applier, task_object.pk).set(queue=queue)
+    chain.delay()
+
+
+@task(name="apply_slice_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
+def apply_slice_to_index(applier: str, applier_kwargs: dict, task_id: int, indices: List[str], field_data: List[str], query: dict, slice_id: int, max_slices: int,
+                         bulk_size: int, max_chunk_bytes: int, es_timeout: int):
+    task_object = Task.objects.get(pk=task_id)
+    try:
+        factory, output, processes = INDEX_APPLIERS[applier]
+        process_batch = factory(**applier_kwargs)
+
+        searcher = ElasticSearcher(
+            indices=indices,
+            field_data=field_data,
+            query=get_slice_query(query, slice_id, max_slices),
+            output=ElasticSearcher.OUT_RAW,
+            timeout=f"{es_timeout}m",
+            scroll_size=bulk_size
+        )
+
+        actions = get_update_actions(searcher, process_batch, output=output, task_object=task_object, processes=processes)
+        for success, info in streaming_bulk(client=searcher.core.es, actions=actions, refresh="wait_for", chunk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, max_retries=3):
+            if not success:
+                logging.getLogger(ERROR_LOGGER).exception(json.dumps(info))
+        return True
+
+    except Exception as e:
+        task_object.handle_failed_task(e)
+        raise e
+
+
+@task(name="end_apply_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
+def end_apply_to_index(applier: str, task_id: int):
+    logging.getLogger(INFO_LOGGER).info(f"Finished applying {applier} for Task ID: {task_id}!")
+    Task.objects.get(pk=task_id).complete()
+    return True
+
+
+@task(name="export_search_results", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
+def export_search_results(task_id: int, indices: List[str], query: dict, fields: List[str], file_path: str, file_format: str, compress: bool,
+                          scroll_size: int = SEARCH_EXPORT_SCROLL_SIZE, es_timeout: int = 10):
+    task_object = Task.objects.get(pk=task_id)
+    try:
+        logging.getLogger(INFO_LOGGER).info(f"Starting to export search results into {file_path} for Task ID: {task_id}!")
+        task_object.update_status(Task.STATUS_RUNNING)
+
+        body = get_export_body(query)
+        if fields:
+            body["_source"] = fields
+
+        columns = get_export_columns(indices, fields)
+        hits = scan(client=ElasticCore().es, query=body, index=indices, scroll=f"{es_timeout}m", size=scroll_size)
+        pages = iter(lambda: list(islice(hits, scroll_size)), [])
+        write_export_file(pages, pathlib.Path(file_path), columns, file_format=file_format, compress=compress, task_object=task_object)
+
+        task_object.complete()
+        logging.getLogger(INFO_LOGGER).info(f"Finished exporting search results into {file_path} for Task ID: {task_id}!")
+        return True
+
+    except Exception as e:
+        task_object.handle_failed_task(e)
+        raise e
@@ -0,0 +1,73 @@
+import os
+
+from django.test import TestCase
+
+from toolkit.elastic.tools.apply_to_index import OUTPUT_DOC, OUTPUT_FACTS, get_slice_count, get_slice_query, get_update_actions, process_pages
+
+
+class ApplyToIndexTests(TestCase):
+
+    def setUp(self):
+        self.existing_fact = {"fact": "TAG", "str_val": "existing", "doc_path": "text", "spans": "[[0, 0]]"}
+        self.new_fact = {"fact": "TAG", "str_val": "new", "doc_path": "text", "spans": "[[0, 0]]"}
+        self.pages = [
+            [
+                {"_index": "test_index", "_id": "1", "_source": {"text": "first", "texta_facts": [self.existing_fact]}},
+                {"_index": "test_index", "_id": "2", "_source": {"text": "second"}}
+            ],
+            [
+                {"_index": "test_index", "_id": "3", "_source": {"text": "third"}}
+            ]
+        ]
+
+
+    def test_slice_query(self):
+        query = {"query": {"match_all": {}}}
+        self.assertEqual(get_slice_query(query, 0, 1), query)
+        self.assertEqual(get_slice_query(query, 1, 3), {"query": {"match_all": {}}, "slice": {"id": 1, "max": 3}})
+
+
+    def test_slice_count(self):
+        self.assertEqual(get_slice_count(0, 100, 4), 1)
+        self.assertEqual(get_slice_count(150, 100, 4), 2)
+        self.assertEqual(get_slice_count(100000, 100, 4), 4)
+
+
+    def test_new_facts_are_merged_with_existing_ones(self):
+        actions = list(get_update_actions(self.pages, lambda sources: [[self.new_fact, self.existing_fact] for _ in sources], output=OUTPUT_FACTS))
+        self.assertEqual([action["_id"] for action in actions], ["1", "2", "3"])
+        first_facts = sorted(actions[0]["doc"]["texta_facts"], key=lambda fact: fact["str_val"])
+        self.assertEqual(first_facts, [self.existing_fact, self.new_fact])
+        for action in actions:
+            self.assertEqual(action["_op_type"], "update")
+
+
+    def test_partial_documents_are_used_as_they_are(self):
+        actions = list(get_update_actions(self.pages, lambda sources: [{"text_es": {"stems": source["text"]}} for source in sources], output=OUTPUT_DOC))
+        self.assertEqual([action["doc"] for action in actions], [{"text_es": {"stems": "first"}}, {"text_es": {"stems": "second"}}, {"text_es": {"stems": "third"}}])
+
+
+    def test_progress_is_updated_per_page(self):
+        progress = []
+
+
+        class TaskObject:
+            def update_progress_iter(self, amount):
+                progress.append(amount)
+
+
+        list(get_update_actions(self.pages, lambda sources: [[] for _ in sources], task_object=TaskObject()))
+        self.assertEqual(progress, [2, 1])
+
+
+    def test_pages_are_processed_in_a_process_pool_in_order(self):
+        pages = [[{"_index": "test_index", "_id": str(i), "_source": {"text": f"text {i}"}}] for i in range(20)]
+        process_batch = lambda sources: [{"text_length": len(source["text"]), "pid": os.getpid()} for source in sources]
+        results = list(process_pages(iter(pages), process_batch, processes=2, max_pending=3))
+        self.assertEqual([page for page, _ in results], pages)
+        self.assertEqual([result[0]["text_length"] for _, result in results], [len(f"text {i}") for i in range(20)])
+        self.assertTrue(all(result[0]["pid"] != os.getpid() for _, result in results))
+
+        actions = list(get_update_actions(self.pages, lambda sources: [[self.new_fact, self.existing_fact] for _ in sources], processes=2))
+        self.assertEqual([action["_id"] for action in actions], ["1", "2", "3"])
+        self.assertEqual(sorted(actions[0]["doc"]["texta_facts"], key=lambda fact: fact["str_val"]), [self.existing_fact, self.new_fact])
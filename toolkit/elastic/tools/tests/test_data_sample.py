@@ -0,0 +1,61 @@
+import json
+
+from django.test import TestCase
+
+from texta_elastic.core import ElasticCore
+from texta_tools.text_processor import TextProcessor
+from toolkit.core.task.models import Task
+from toolkit.elastic.tools.data_sample import DataSample
+from toolkit.helper_functions import reindex_test_dataset
+from toolkit.tagger.models import Tagger
+from toolkit.tools.lemmatizer import CeleryLemmatizer
+from toolkit.test_settings import TEST_FIELD, TEST_QUERY
+from toolkit.tools.show_progress import ShowProgress
+from toolkit.tools.utils_for_tests import create_test_user, project_creation
+
+
+class DataSampleTests(TestCase):
+
+    def setUp(self):
+        self.test_index_name = reindex_test_dataset()
+        self.user = create_test_user("dataSampleOwner", "my@email.com", "pw")
+        self.project = project_creation("dataSampleTestProject", self.test_index_name, self.user)
+
+
+    def tearDown(self) -> None:
+        Tagger.objects.all().delete()
+        ElasticCore().delete_index(index=self.test_index_name, ignore=[400, 404])
+
+
+    def _get_data_sample(self, **tagger_kwargs) -> DataSample:
+        tagger = Tagger.objects.create(description="DataSampleTagger", project=self.project, author=self.user, maximum_sample_size=50, negative_multiplier=1.0, **tagger_kwargs)
+        task = Task.objects.create(tagger=tagger, task_type=Task.TYPE_TRAIN, status=Task.STATUS_RUNNING)
+        return DataSample(tagger, indices=[self.test_index_name], field_data=[TEST_FIELD], show_progress=ShowProgress(task))
+
+
+    def test_negatives_of_a_binary_tagger_with_the_default_query(self):
+        data_sample = self._get_data_sample()
+        self.assertTrue(data_sample.is_binary)
+        self.assertEqual(len(data_sample.data["true"]), 50)
+        self.assertEqual(len(data_sample.data["false"]), 50)
+        # Only the sampled documents are excluded from the negatives.
+        self.assertEqual(data_sample._create_negative_query()["query"]["function_score"]["query"]["bool"]["must_not"], [{"ids": {"values": list(data_sample.ignore_ids)}}])
+        self.assertEqual(len(data_sample.ignore_ids), 50)
+
+
+    def test_negatives_of_a_binary_tagger_with_a_query(self):
+        data_sample = self._get_data_sample(query=json.dumps(TEST_QUERY))
+        self.assertTrue(data_sample.data["false"])
+        must_not = data_sample._create_negative_query()["query"]["function_score"]["query"]["bool"]["must_not"]
+        self.assertEqual(must_not, [{"bool": {"should": [TEST_QUERY["query"]]}}])
+        self.assertFalse(data_sample.ignore_ids)
+
+
+    def test_every_scrolling_thread_gets_its_own_text_processor(self):
+        data_sample = self._get_data_sample()
+        data_sample.text_processor = TextProcessor(lemmatizer=CeleryLemmatizer(), remove_stop_words=True)
+        text_processor_copy = data_sample._copy_text_processor()
+        self.assertIsNot(text_processor_copy, data_sample.text_processor)
+        self.assertIsNot(text_processor_copy.stop_words, data_sample.text_processor.stop_words)
+        # The thread-safe lemmatizer is shared.
+        self.assertIs(text_processor_copy.lemmatizer, data_sample.text_processor.lemmatizer)
@@ -0,0 +1,52 @@
+import csv
+import gzip
+import json
+import pathlib
+import tempfile
+
+from django.test import TestCase
+
+from toolkit.elastic.tools.search_export import EXPORT_FORMAT_CSV, EXPORT_FORMAT_JSONL, get_export_file_name, write_export_file
+
+
+class SearchExportTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.pages = [
+            [{"_source": {"text": "first", "meta": {"lang": "et"}}}, {"_source": {"text": "second", "tags": ["a", "b"]}}],
+            [{"_source": {"text": "third"}}]
+        ]
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_file_name_depends_on_the_export_parameters(self):
+        name = get_export_file_name(["index_1", "index_2"], {"query": {"match_all": {}}}, ["text"])
+        self.assertEqual(name, get_export_file_name(["index_2", "index_1"], {"query": {"match_all": {}}}, ["text"]))
+        self.assertNotEqual(name, get_export_file_name(["index_1"], {"query": {"match_all": {}}}, ["text"]))
+        self.assertNotEqual(name, get_export_file_name(["index_1", "index_2"], {"query": {"match_all": {}}}, []))
+        self.assertTrue(get_export_file_name(["index_1"], {}, [], file_format=EXPORT_FORMAT_CSV, compress=True).endswith(".csv.gz"))
+
+
+    def test_writing_compressed_json_lines(self):
+        path = pathlib.Path(self.directory.name) / "export.jl.gz"
+        write_export_file(iter(self.pages), path, [], file_format=EXPORT_FORMAT_JSONL, compress=True)
+        with gzip.open(path, "rt", encoding="utf8") as fp:
+            documents = [json.loads(line) for line in fp]
+        self.assertEqual(documents, [hit["_source"] for page in self.pages for hit in page])
+        # Only the finished file is left in the directory.
+        self.assertEqual(list(pathlib.Path(self.directory.name).iterdir()), [path])
+
+
+    def test_writing_csv(self):
+        path = pathlib.Path(self.directory.name) / "export.csv"
+        write_export_file(iter(self.pages), path, ["text", "meta.lang", "tags"], file_format=EXPORT_FORMAT_CSV)
+        with open(path, encoding="utf8", newline="") as fp:
+            rows = list(csv.reader(fp))
+        self.assertEqual(rows[0], ["text", "meta.lang", "tags"])
+        self.assertEqual(rows[1], ["first", "et", ""])
+        self.assertEqual(rows[2], ["second", "", json.dumps(["a", "b"])])
+        self.assertEqual(len(rows), 4)
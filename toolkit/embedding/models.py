@@ -17,7 +17,7 @@ from texta_tools.text_processor import TextProcessor
 from toolkit.constants import MAX_DESC_LEN
 from toolkit.core.project.models import Project
 from toolkit.core.task.models import Task
-from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE
+from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, STEMMER_BACKEND_CHOICES, STEMMER_BACKEND_ELASTIC
 from toolkit.elastic.index.models import Index
 from toolkit.embedding.choices import FASTTEXT_EMBEDDING, W2V_EMBEDDING
 from toolkit.model_constants import CommonModelMixin, FavoriteModelMixin
@@ -39,6 +39,7 @@ class Embedding(FavoriteModelMixin, CommonModelMixin):
     vocab_size = models.IntegerField(default=0)
     use_phraser = models.BooleanField(default=True)
     snowball_language = models.CharField(default=DEFAULT_SNOWBALL_LANGUAGE, null=True, max_length=MAX_DESC_LEN)
+    stemmer_backend = models.CharField(choices=STEMMER_BACKEND_CHOICES, default=STEMMER_BACKEND_ELASTIC, max_length=MAX_DESC_LEN)
     embedding_type = models.TextField(default=W2V_EMBEDDING)
     embedding_model = models.FileField(null=True, verbose_name='', default=None)
 
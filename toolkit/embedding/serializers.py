@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, get_snowball_choices
+from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, DEFAULT_STEMMER_BACKEND, STEMMER_BACKEND_CHOICES, get_snowball_choices
 from toolkit.embedding import choices
 from toolkit.embedding.models import Embedding
 from toolkit.serializer_constants import CommonModelSerializerMixin, FavoriteModelSerializerMixin, FieldParseSerializer, IndicesSerializerMixin, ProjectResourceUrlSerializer
@@ -9,6 +9,7 @@ from toolkit.serializer_constants import CommonModelSerializerMixin, FavoriteMod
 class EmbeddingSerializer(FieldParseSerializer, serializers.HyperlinkedModelSerializer, CommonModelSerializerMixin, ProjectResourceUrlSerializer, FavoriteModelSerializerMixin, IndicesSerializerMixin):
     fields = serializers.ListField(child=serializers.CharField(), help_text=f'Fields used to build the model.')
     snowball_language = serializers.ChoiceField(choices=get_snowball_choices(), default=DEFAULT_SNOWBALL_LANGUAGE, help_text=f'Uses Snowball stemmer with specified language to normalize the texts. Default: {DEFAULT_SNOWBALL_LANGUAGE}')
+    stemmer_backend = serializers.ChoiceField(choices=STEMMER_BACKEND_CHOICES, default=DEFAULT_STEMMER_BACKEND, help_text=f'Whether to stem the texts with Elasticsearch or locally with NLTK. Default: {DEFAULT_STEMMER_BACKEND}')
     max_documents = serializers.IntegerField(default=choices.DEFAULT_MAX_DOCUMENTS)
     stop_words = serializers.ListField(child=serializers.CharField(), allow_empty=False, default=[])
     num_dimensions = serializers.IntegerField(
@@ -32,7 +33,7 @@ class EmbeddingSerializer(FieldParseSerializer, serializers.HyperlinkedModelSeri
 
     class Meta:
         model = Embedding
-        fields = ('id', 'url', 'author', 'description', 'indices', 'fields', 'use_phraser', 'embedding_type', 'is_favorited', 'snowball_language', 'query', 'stop_words', 'num_dimensions', 'max_documents', 'min_freq', 'window_size', 'num_epochs', 'vocab_size', 'tasks')
+        fields = ('id', 'url', 'author', 'description', 'indices', 'fields', 'use_phraser', 'embedding_type', 'is_favorited', 'snowball_language', 'stemmer_backend', 'query', 'stop_words', 'num_dimensions', 'max_documents', 'min_freq', 'window_size', 'num_epochs', 'vocab_size', 'tasks')
         read_only_fields = ('vocab_size',)
         fields_to_parse = ('fields', 'stop_words')
 
@@ -11,7 +11,7 @@ from toolkit.base_tasks import BaseTask
 from toolkit.embedding.models import Embedding
 from toolkit.helper_functions import get_indices_from_object
 from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, FACEBOOK_MODEL_SUFFIX
-from toolkit.tools.lemmatizer import ElasticAnalyzer
+from toolkit.tools.lemmatizer import get_analyzer
 from toolkit.tools.show_progress import ShowProgress
 
 
@@ -34,7 +34,7 @@ def train_embedding(embedding_id):
 
         # add stemmer if asked
         if snowball_language:
-            snowball_lemmatizer = ElasticAnalyzer(language=snowball_language)
+            snowball_lemmatizer = get_analyzer(language=snowball_language, backend=embedding_object.stemmer_backend)
         else:
             snowball_lemmatizer = None
         # iterator for texts
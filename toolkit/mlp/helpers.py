@@ -74,41 +74,50 @@ def process_mlp_actions(generator: ElasticSearcher, analyzers: List[str], field_
                 info_logger.info(f"Finished applying MLP for worker with id: {mlp_id} at {counter}/{progress.n_total} documents!")
 
 
-def process_lang_actions(generator: ElasticSearcher, field: str, worker_id: int, mlp_class: MLP):
+def detect_languages(texts: List[str], mlp_class: MLP) -> List[str]:
+    """
+    Detects the languages of a batch of texts, identical texts are classified only once.
+    Texts with no detectable language get the NAN_LANGUAGE_TOKEN_KEY.
+    """
+    languages = {}
+    for text in texts:
+        if text not in languages:
+            lang = mlp_class.detect_language(text)
+            languages[text] = lang if lang else NAN_LANGUAGE_TOKEN_KEY
+    return [languages[text] for text in texts]
+
+
+def process_lang_actions(generator: ElasticSearcher, field: str, worker_id: int, mlp_class: MLP, task_object=None):
+    """
+    Detects the languages of the documents one scroll page at a time and yields partial updates
+    that only hold the detected language. The progress is added to the task_object per page.
+    """
     counter = 0
     info_logger = logging.getLogger(INFO_LOGGER)
+    mlp_path = f"{field}_mlp.language.detected"
 
     info_logger.info(f"Applying language detection to the worker with an ID of {worker_id}!")
     for document_batch in generator:
+        # The detected language of a document is the language of its last text.
+        texts = []
         for item in document_batch:
-            # This will be a list of texts.
-            source = item["_source"]
-            texts = parse_doc_texts(field, source)
-            texts = texts if texts else [""]
-            for text in texts:
-                # This can be either a str or None
-                lang = mlp_class.detect_language(text)
-                lang = lang if lang else NAN_LANGUAGE_TOKEN_KEY
-                mlp_path = f"{field}_mlp.language.detected"
-                source = Document.edit_doc(source, mlp_path, lang)
-
-                elastic_update_body = {
-                    "_id": item["_id"],
-                    "_index": item["_index"],
-                    "_type": item.get("_type", "_doc"),
-                    "_op_type": "update",
-                    "retry_on_conflict": 3,
-                    "doc": {**source}
-                }
-
-                yield elastic_update_body
+            doc_texts = parse_doc_texts(field, item["_source"])
+            texts.append(doc_texts[-1] if doc_texts else "")
+
+        for item, lang in zip(document_batch, detect_languages(texts, mlp_class)):
+            yield {
+                "_id": item["_id"],
+                "_index": item["_index"],
+                "_type": item.get("_type", "_doc"),
+                "_op_type": "update",
+                "retry_on_conflict": 3,
+                "doc": Document.edit_doc({}, mlp_path, lang)
+            }
 
-            counter += 1
-            progress = generator.callback_progress
-            if counter % generator.scroll_size == 0:
-                info_logger.info(f"Progress on applying language detection for worker with id: {worker_id} at {counter} out of {progress.n_total} documents!")
-            elif counter == progress.n_total:
-                info_logger.info(f"Finished applying language detection for worker with id: {worker_id} at {counter}/{progress.n_total} documents!")
+        counter += len(document_batch)
+        if task_object:
+            task_object.update_progress_iter(len(document_batch))
+        info_logger.info(f"Progress on applying language detection for worker with id: {worker_id} at {counter} documents!")
 
 
 def check_celery_tasks(QUEUE_NAME):
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mlp', '0007_reformat_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applylangworker',
+            name='bulk_size',
+            field=models.IntegerField(default=500, help_text='How many documents should be sent into Elasticsearch in a single batch for update.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(500)]),
+        ),
+        migrations.AddField(
+            model_name='applylangworker',
+            name='es_scroll_size',
+            field=models.IntegerField(default=500, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(10000)]),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import json
 
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models, transaction
 from texta_elastic.searcher import EMPTY_QUERY
 
@@ -8,7 +9,8 @@ from toolkit.core.project.models import Project
 from toolkit.core.task.models import Task
 from toolkit.elastic.index.models import Index
 from toolkit.model_constants import CommonModelMixin
-from toolkit.settings import CELERY_MLP_TASK_QUEUE
+from toolkit.serializer_constants import BULK_SIZE_HELPTEXT
+from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, CELERY_MLP_TASK_QUEUE, ES_BULK_SIZE_MAX
 
 
 class MLPWorker(CommonModelMixin):
@@ -28,20 +30,25 @@ class MLPWorker(CommonModelMixin):
         return '{0} - {1}'.format(self.pk, self.description)
 
 
-    def process(self):
+    def process(self, resume: bool = False):
+        """
+        :param resume: Whether to skip the documents that already hold the MLP output of the fields.
+        """
         from toolkit.mlp.tasks import start_mlp_worker
 
         new_task = Task.objects.create(mlpworker=self, task_type=Task.TYPE_APPLY, status=Task.STATUS_CREATED)
         self.save()
         self.tasks.add(new_task)
 
-        transaction.on_commit(lambda: start_mlp_worker.s(self.pk).apply_async(queue=CELERY_MLP_TASK_QUEUE))
+        transaction.on_commit(lambda: start_mlp_worker.s(self.pk, resume=resume).apply_async(queue=CELERY_LONG_TERM_TASK_QUEUE))
 
 
 class ApplyLangWorker(CommonModelMixin):
     query = models.TextField(default=json.dumps(EMPTY_QUERY))
     field = models.TextField()
     indices = models.ManyToManyField(Index)
+    es_scroll_size = models.IntegerField(default=500, validators=[MinValueValidator(1), MaxValueValidator(10000)])
+    bulk_size = models.IntegerField(default=500, help_text=BULK_SIZE_HELPTEXT, validators=[MinValueValidator(1), MaxValueValidator(ES_BULK_SIZE_MAX)])
 
 
     def process(self):
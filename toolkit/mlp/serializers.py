@@ -8,8 +8,8 @@ from texta_mlp.mlp import SUPPORTED_ANALYZERS
 
 from toolkit.core.project.models import Project
 from toolkit.mlp.models import ApplyLangWorker, MLPWorker
-from toolkit.serializer_constants import CommonModelSerializerMixin, FieldsValidationSerializerMixin, IndicesSerializerMixin
-from toolkit.settings import REST_FRAMEWORK
+from toolkit.serializer_constants import BULK_SIZE_HELPTEXT, CommonModelSerializerMixin, FieldsValidationSerializerMixin, IndicesSerializerMixin
+from toolkit.settings import ES_BULK_SIZE_MAX, REST_FRAMEWORK
 
 
 class MLPListSerializer(serializers.Serializer):
@@ -73,6 +73,8 @@ class ApplyLangOnIndicesSerializer(serializers.ModelSerializer, CommonModelSeria
     url = serializers.SerializerMethodField()
     query = serializers.JSONField(help_text='Query in JSON format', required=False, default=json.dumps(EMPTY_QUERY))
     field = serializers.CharField(required=True, allow_blank=False)
+    es_scroll_size = serializers.IntegerField(help_text="Scroll size for Elasticsearch (Default: 500)", default=500, min_value=1, max_value=10000, required=False)
+    bulk_size = serializers.IntegerField(help_text=BULK_SIZE_HELPTEXT, default=500, min_value=1, max_value=ES_BULK_SIZE_MAX, required=False)
 
 
     def validate_field(self, value: str):
@@ -110,7 +112,7 @@ class ApplyLangOnIndicesSerializer(serializers.ModelSerializer, CommonModelSeria
 
     class Meta:
         model = ApplyLangWorker
-        fields = ("id", "url", "author", "indices", "description", "tasks", "query", "field")
+        fields = ("id", "url", "author", "indices", "description", "tasks", "query", "field", "es_scroll_size", "bulk_size")
 
 
     def get_url(self, obj):
@@ -1,5 +1,6 @@
 import json
 import logging
+import time
 from typing import List, Optional
 
 from celery import group
@@ -10,13 +11,20 @@ from texta_mlp.mlp import MLP
 
 from toolkit.base_tasks import BaseTask, QuietTransactionAwareTask, TransactionAwareTask
 from toolkit.core.task.models import Task
+from toolkit.elastic.index.field_cache import invalidate_field_cache
+from toolkit.elastic.tools.apply_to_index import get_slice_count, get_slice_query
 from toolkit.helper_functions import chunks_iter
 from toolkit.mlp.helpers import process_lang_actions
 from toolkit.mlp.models import ApplyLangWorker, MLPWorker
-from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, CELERY_MLP_TASK_QUEUE, DEFAULT_MLP_LANGUAGE_CODES, ERROR_LOGGER, INFO_LOGGER, MLP_BATCH_SIZE, MLP_GPU_DEVICE_ID, MLP_MODEL_DIRECTORY, MLP_USE_GPU, TEXTA_TAGS_KEY
+from toolkit.settings import APPLY_LANG_MAX_SLICES, APPLY_MLP_MAX_SLICES, CELERY_LONG_TERM_TASK_QUEUE, CELERY_MLP_TASK_QUEUE, DEFAULT_MLP_LANGUAGE_CODES, INFO_LOGGER, MLP_BATCH_SIZE, MLP_GPU_DEVICE_ID, MLP_MODEL_DIRECTORY, MLP_SCROLL_SOURCES, MLP_USE_GPU, TEXTA_TAGS_KEY
 from toolkit.tools.show_progress import ShowProgress
 
 
+# Field name the texts are stored under when processed as documents and the keys of the MLP.process output.
+MLP_TEXT_PATH = "text"
+MLP_TEXT_OUTPUT_KEY = "text_mlp"
+MLP_META_KEY = "_mlp_meta"
+
 # TODO Temporally as for now no other choice is found for sharing the models through the worker across the tasks.
 mlp: Optional[MLP] = None
 
@@ -34,16 +42,41 @@ def load_mlp():
         )
 
 
-@task(name="apply_mlp_on_list", base=BaseTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
-def apply_mlp_on_list(self, texts: List[str], analyzers: List[str]):
+def process_texts(texts: List[str], analyzers: List[str]) -> List[dict]:
+    """
+    Processes the texts with a single batched MLP.process_docs call
+    and returns the results in the same format as MLP.process does for a single text.
+    """
     load_mlp()
+    docs = [{MLP_TEXT_PATH: text} for text in texts]
+    docs = mlp.process_docs(docs, doc_paths=[MLP_TEXT_PATH], analyzers=analyzers)
+
     response = []
-    for text in texts:
-        analyzed_text = mlp.process(text, analyzers)
-        response.append(analyzed_text)
+    for text, doc in zip(texts, docs):
+        if MLP_TEXT_OUTPUT_KEY not in doc:
+            # Fall back to processing the text on its own if the batch left it unprocessed.
+            response.append(mlp.process(text, analyzers))
+            continue
+        # The language detected by process_docs is kept as it is, which is the default language when the detected one is not supported.
+        text_mlp = doc[MLP_TEXT_OUTPUT_KEY]
+        # MLP.process points every fact to the text field of the output.
+        texta_facts = [{**fact, "doc_path": f"{MLP_TEXT_OUTPUT_KEY}.text"} for fact in doc.get(TEXTA_TAGS_KEY, [])]
+        meta = {MLP_TEXT_OUTPUT_KEY: doc[MLP_META_KEY][MLP_TEXT_PATH]} if MLP_META_KEY in doc else {}
+        response.append({MLP_TEXT_OUTPUT_KEY: text_mlp, TEXTA_TAGS_KEY: texta_facts, MLP_META_KEY: meta})
     return response
 
 
+@task(name="apply_mlp_on_list", base=BaseTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
+def apply_mlp_on_list(self, texts: List[str], analyzers: List[str]):
+    return process_texts(texts, analyzers)
+
+
+@task(name="apply_lemmatization_on_list", base=BaseTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
+def apply_lemmatization_on_list(self, texts: List[str]) -> List[str]:
+    """Lemmatizes the texts in a single batch and returns only the lemmas to keep the responses small."""
+    return [result[MLP_TEXT_OUTPUT_KEY]["lemmas"] for result in process_texts(texts, ["lemmas"])]
+
+
 @task(name="apply_mlp_on_docs", base=BaseTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
 def apply_mlp_on_docs(self, docs: List[dict], analyzers: List[str], fields_to_parse: List[str]):
     load_mlp()
@@ -97,18 +130,14 @@ def unite_source_with_meta(meta_docs, source_docs):
     return container
 
 
-@task(name="apply_mlp_on_es_doc", base=QuietTransactionAwareTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
-def apply_mlp_on_es_docs(self, source_and_meta_docs: List[str], mlp_id: int):
+def apply_mlp_on_hits(hits: List[dict], mlp_object: MLPWorker, task_object: Task):
     """
-    Applies MLP on documents received by previous tasks and updates them in Elasticsearch.
-    :param self: Reference to the Celery Task object of this task, courtesy of the bind parameter in the decorator.
-    :param source_and_meta_docs: List of Elasticsearch document ID's to pull from Elasticsearch.
-    :param mlp_id: ID of the MLPObject which contains progress.
+    Applies MLP on a batch of scrolled documents and updates them in Elasticsearch.
+    :param hits: Scrolled Elasticsearch documents with the source of the processed fields, or only with their meta
+                 when the documents are fetched by their ID-s.
+    :param mlp_object: MLPWorker which holds the fields and analyzers.
+    :param task_object: Task of the MLPWorker which contains progress.
     """
-    mlp_object = get_mlp_object(mlp_id)
-
-    task_object = mlp_object.tasks.last()
-
     # Get the necessary fields.
     field_data: List[str] = json.loads(mlp_object.fields)
     if TEXTA_TAGS_KEY not in field_data:
@@ -117,63 +146,64 @@ def apply_mlp_on_es_docs(self, source_and_meta_docs: List[str], mlp_id: int):
 
     analyzers: List[str] = json.loads(mlp_object.analyzers)
 
-    # retrieve document from ES
-    document_wrapper = ElasticDocument(index=None)
-    source_and_meta_docs = document_wrapper.get_bulk(doc_ids=source_and_meta_docs, fields=field_data)
-
+    if MLP_SCROLL_SOURCES:
+        source_and_meta_docs = [{"_index": hit["_index"], "_type": hit.get("_type", "_doc"), "_id": hit["_id"], "_source": hit.get("_source", {})} for hit in hits]
+    else:
+        # retrieve document from ES
+        document_wrapper = ElasticDocument(index=None)
+        source_and_meta_docs = document_wrapper.get_bulk(doc_ids=[hit["_id"] for hit in hits], fields=field_data)
     source_documents = [doc["_source"] for doc in source_and_meta_docs]
-    mlp_docs = apply_mlp_on_documents(source_documents, analyzers, field_data, mlp_id)
+    mlp_docs = apply_mlp_on_documents(source_documents, analyzers, field_data, mlp_object.pk)
     es_documents = unite_source_with_meta(source_and_meta_docs, mlp_docs)
     update_documents_in_es(es_documents)
 
     # Update progress
     task_object.update_progress_iter(len(source_and_meta_docs))
-    return True
+
+
+def get_mlp_worker_query(mlp_object: MLPWorker, resume: bool = False) -> dict:
+    """
+    Returns the query of the MLP worker. When resuming, documents that already hold the MLP output
+    of every field are left out, so the documents processed by the previous run act as its checkpoint.
+    """
+    query = json.loads(mlp_object.query)
+    if not resume:
+        return query
+    fields = json.loads(mlp_object.fields)
+    processed_query = {"bool": {"must": [{"exists": {"field": f"{field}_mlp.language.analysis"}} for field in fields]}}
+    return {**query, "query": {"bool": {"must": [query.get("query", {"match_all": {}})], "must_not": [processed_query]}}}
 
 
 @task(name="start_mlp_worker", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE, bind=True)
-def start_mlp_worker(self, mlp_id: int):
+def start_mlp_worker(self, mlp_id: int, resume: bool = False):
     """
-    Scrolls the document ID-s and passes them to MLP worker.
+    Splits the documents into sliced scrolls which the MLP workers process in parallel and hands the completion
+    over to end_mlp_task, so nothing waits for the MLP workers. Every slice streams its documents
+    in MLP_BATCH_SIZE batches, so at most a batch per slice is held in memory.
     """
     mlp_object = MLPWorker.objects.get(pk=mlp_id)
 
     task_object = mlp_object.tasks.last()
     try:
-        logging.getLogger(INFO_LOGGER).info(f"Applying mlp on the index for MLP Task ID: {mlp_id}")
+        logging.getLogger(INFO_LOGGER).info(f"Applying mlp on the index for MLP Task ID: {mlp_id} (resume: {resume})")
         # init progress
         show_progress = ShowProgress(task_object, multiplier=1)
-        show_progress.update_step('Scrolling document IDs')
+        show_progress.update_step('Applying MLP')
         show_progress.update_view(0)
-        # Get the necessary fields.
         indices: List[str] = mlp_object.get_indices()
-        es_scroll_size = mlp_object.es_scroll_size
-        es_timeout = mlp_object.es_timeout
-
-        # create searcher object for scrolling ids
-        searcher = ElasticSearcher(
-            query=json.loads(mlp_object.query),
-            indices=indices,
-            output=ElasticSearcher.OUT_META,
-            callback_progress=show_progress,
-            scroll_size=es_scroll_size,
-            scroll_timeout=f"{es_timeout}m"
-        )
+        searcher = ElasticSearcher(query=get_mlp_worker_query(mlp_object, resume=resume), indices=indices)
         # add texta facts mappings to the indices if needed
         for index in indices:
             searcher.core.add_texta_facts_mapping(index=index)
+        invalidate_field_cache(indices)
 
-        doc_chunks = list(chunks_iter(searcher, MLP_BATCH_SIZE))
-
-        # update progress
-        show_progress.update_step(f'Applying MLP to {len(doc_chunks)} documents')
-        show_progress.update_view(0)
-
-        task_object.set_total(searcher.count())
+        count = searcher.count()
+        task_object.set_total(count)
         task_object.update_status(Task.STATUS_RUNNING)
 
-        # pass document id-s to the next task
-        chain = group(apply_mlp_on_es_docs.s([doc["_id"] for doc in meta_chunk], mlp_id) for meta_chunk in doc_chunks) | end_mlp_task.si(mlp_id)
+        max_slices = get_slice_count(count, mlp_object.es_scroll_size, APPLY_MLP_MAX_SLICES)
+        logging.getLogger(INFO_LOGGER).info(f"Applying MLP on {count} documents in {max_slices} slices for MLP Task ID: {mlp_id}")
+        chain = group(apply_mlp_on_slice.s(mlp_id, slice_id, max_slices, resume) for slice_id in range(max_slices)) | end_mlp_task.si(mlp_id)
         chain.delay()
         return True
 
@@ -182,51 +212,116 @@ def start_mlp_worker(self, mlp_id: int):
         raise
 
 
+@task(name="apply_mlp_on_slice", base=QuietTransactionAwareTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
+def apply_mlp_on_slice(self, mlp_id: int, slice_id: int, max_slices: int, resume: bool = False):
+    """
+    Scrolls the documents of a slice and applies MLP on them in batches. The sources of the processed fields
+    are scrolled along with the documents, so that they are not fetched again by their ID-s, unless disabled by MLP_SCROLL_SOURCES.
+    """
+    mlp_object = get_mlp_object(mlp_id)
+    task_object = mlp_object.tasks.last()
+    try:
+        fields: List[str] = json.loads(mlp_object.fields)
+        searcher = ElasticSearcher(
+            query=get_slice_query(get_mlp_worker_query(mlp_object, resume=resume), slice_id, max_slices),
+            indices=mlp_object.get_indices(),
+            field_data=fields + [TEXTA_TAGS_KEY],
+            output=ElasticSearcher.OUT_RAW if MLP_SCROLL_SOURCES else ElasticSearcher.OUT_META,
+            scroll_size=mlp_object.es_scroll_size,
+            scroll_timeout=f"{mlp_object.es_timeout}m"
+        )
+        # Raw output is scrolled in pages, meta one document at a time.
+        hits = (hit for page in searcher for hit in page) if MLP_SCROLL_SOURCES else searcher
+
+        start_time = time.time()
+        document_count = 0
+        for batch in chunks_iter(hits, MLP_BATCH_SIZE):
+            apply_mlp_on_hits(batch, mlp_object, task_object)
+            document_count += len(batch)
+
+        duration = max(time.time() - start_time, 1e-9)
+        logging.getLogger(INFO_LOGGER).info(
+            f"Applied MLP on {document_count} documents of slice {slice_id + 1}/{max_slices} in {duration:.1f}s ({document_count / duration:.1f} documents/s) for MLP Task ID: {mlp_id}"
+        )
+        return True
+
+    except Exception as e:
+        task_object.handle_failed_task(e)
+        raise
+
+
 @task(name="end_mlp_task", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE, bind=True)
 def end_mlp_task(self, mlp_id):
     logging.getLogger(INFO_LOGGER).info(f"Finished applying mlp on the index for model ID: {mlp_id}")
     mlp_object = MLPWorker.objects.get(pk=mlp_id)
+    # The new MLP fields were added into the mappings dynamically.
+    invalidate_field_cache(mlp_object.get_indices())
     mlp_object.tasks.last().complete()
     return True
 
 
 @task(name="apply_lang_on_indices", base=TransactionAwareTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
 def apply_lang_on_indices(self, apply_worker_id: int):
+    """
+    Splits the documents into sliced scrolls which the MLP workers process in parallel,
+    small indices are processed in a single slice.
+    """
     worker_object = ApplyLangWorker.objects.get(pk=apply_worker_id)
     task_object = worker_object.tasks.last()
     try:
-        load_mlp()
-        show_progress = ShowProgress(task_object, multiplier=1)
-        show_progress.update_step('scrolling through the indices to apply lang')
-
-        # Get the necessary fields.
         indices: List[str] = worker_object.get_indices()
-        field = worker_object.field
+        searcher = ElasticSearcher(query=json.loads(worker_object.query), indices=indices)
+        for index in indices:
+            searcher.core.add_texta_facts_mapping(index=index)
+        invalidate_field_cache(indices)
+
+        count = searcher.count()
+        task_object.set_total(count)
+        task_object.update_status(Task.STATUS_RUNNING)
+
+        max_slices = get_slice_count(count, worker_object.es_scroll_size, APPLY_LANG_MAX_SLICES)
+        logging.getLogger(INFO_LOGGER).info(f"Applying language detection on {count} documents in {max_slices} slices for worker with id: {apply_worker_id}!")
+        chain = group(apply_lang_on_slice.s(apply_worker_id, slice_id, max_slices) for slice_id in range(max_slices)) | end_apply_lang_task.si(apply_worker_id)
+        chain.delay()
+        return apply_worker_id
+
+    except Exception as e:
+        task_object.handle_failed_task(e)
+        raise e
+
 
-        scroll_size = 100
+@task(name="apply_lang_on_slice", base=TransactionAwareTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
+def apply_lang_on_slice(self, apply_worker_id: int, slice_id: int, max_slices: int):
+    worker_object = ApplyLangWorker.objects.get(pk=apply_worker_id)
+    task_object = worker_object.tasks.last()
+    try:
+        load_mlp()
+        field = worker_object.field
         searcher = ElasticSearcher(
-            query=json.loads(worker_object.query),
-            indices=indices,
+            query=get_slice_query(json.loads(worker_object.query), slice_id, max_slices),
+            indices=worker_object.get_indices(),
             field_data=[field],
             output=ElasticSearcher.OUT_RAW,
-            callback_progress=show_progress,
-            scroll_size=scroll_size,
+            scroll_size=worker_object.es_scroll_size,
             scroll_timeout="15m"
         )
 
-        for index in indices:
-            searcher.core.add_texta_facts_mapping(index=index)
-
-        actions = process_lang_actions(generator=searcher, field=field, worker_id=apply_worker_id, mlp_class=mlp)
+        actions = process_lang_actions(generator=searcher, field=field, worker_id=apply_worker_id, mlp_class=mlp, task_object=task_object)
 
         # Send the data towards Elasticsearch
         ed = ElasticDocument("_all")
-        elastic_response = ed.bulk_update(actions=actions)
-
-        worker_object.tasks.last().complete()
-
-        return apply_worker_id
+        ed.bulk_update(actions=actions, chunk_size=worker_object.bulk_size)
+        return True
 
     except Exception as e:
         task_object.handle_failed_task(e)
         raise e
+
+
+@task(name="end_apply_lang_task", base=TransactionAwareTask, queue=CELERY_MLP_TASK_QUEUE, bind=True)
+def end_apply_lang_task(self, apply_worker_id: int):
+    logging.getLogger(INFO_LOGGER).info(f"Finished applying language detection for worker with id: {apply_worker_id}!")
+    worker_object = ApplyLangWorker.objects.get(pk=apply_worker_id)
+    invalidate_field_cache(worker_object.get_indices())
+    worker_object.tasks.last().complete()
+    return True
@@ -7,7 +7,9 @@ from rest_framework.test import APITransactionTestCase
 
 from texta_elastic.core import ElasticCore
 from texta_elastic.searcher import ElasticSearcher
+from toolkit.core.task.models import Task
 from toolkit.helper_functions import reindex_test_dataset
+from toolkit.mlp.models import ApplyLangWorker
 from toolkit.settings import NAN_LANGUAGE_TOKEN_KEY
 from toolkit.test_settings import (TEST_FIELD, VERSION_NAMESPACE)
 from toolkit.tools.utils_for_tests import create_test_user, print_output, project_creation
@@ -65,6 +67,29 @@ class ApplyLangViewsTests(APITransactionTestCase):
                 self.assertTrue(lang_value == "et")
 
 
+    def test_applying_lang_detect_in_slices(self):
+        mlp_field = f"{TEST_FIELD}_mlp"
+        payload = {
+            "description": "TestingIndexProcessing",
+            "field": TEST_FIELD,
+            "query": json.dumps({'query': {'match': {'comment_content_lemmas': "inimene"}}}, ensure_ascii=False),
+            "es_scroll_size": 5,
+            "bulk_size": 5
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+        print_output("test_applying_lang_detect_in_slices:response.data", response.data)
+        self.assertTrue(response.status_code == status.HTTP_201_CREATED)
+        self.assertEqual(response.data["es_scroll_size"], 5)
+
+        task_object = ApplyLangWorker.objects.get(pk=response.data["id"]).tasks.last()
+        self.assertEqual(task_object.status, Task.STATUS_COMPLETED)
+
+        s = ElasticSearcher(indices=[self.test_index_name], output=ElasticSearcher.OUT_DOC, query=json.loads(payload["query"]))
+        for hit in s:
+            if TEST_FIELD in hit:
+                self.assertEqual(hit[f"{mlp_field}.language.detected"], "et")
+
+
     def test_applying_lang_detect_with_raw_query(self):
         mlp_field = f"{TEST_FIELD}_mlp"
         query_string = "inimene"
@@ -7,11 +7,16 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APITransactionTestCase
 
+from toolkit.core.task.models import Task
 from toolkit.elastic.index.models import Index
 from texta_elastic.core import ElasticCore
 from texta_elastic.searcher import ElasticSearcher
 from toolkit.helper_functions import reindex_test_dataset
+from toolkit.mlp import tasks as mlp_tasks
+from toolkit.mlp.models import MLPWorker
+from toolkit.mlp.tasks import load_mlp
 from toolkit.test_settings import (TEST_FIELD, TEST_INDEX, VERSION_NAMESPACE)
+from toolkit.tools.lemmatizer import CeleryLemmatizer
 from toolkit.tools.utils_for_tests import create_test_user, print_output, project_creation
 
 
@@ -68,6 +73,28 @@ class MLPListsTests(APITestCase):
                 self.assertTrue(key in demanded_keys)
 
 
+    def test_batched_lemmatization_equal_to_single_text_processing(self):
+        texts = self.payload["texts"]
+        lemmatizer = CeleryLemmatizer(batch_size=2)
+        lemmas = lemmatizer.lemmatize_texts(texts)
+        load_mlp()
+        expected_lemmas = [mlp_tasks.mlp.process(text, ["lemmas"])["text_mlp"]["lemmas"] for text in texts]
+        self.assertEqual(lemmas, expected_lemmas)
+        # Lemmas of the batch are reused when texts are lemmatized one by one.
+        self.assertEqual([lemmatizer.lemmatize(text) for text in texts], expected_lemmas)
+
+
+    def test_lemmatizer_cache_is_shared_by_text(self):
+        texts = self.payload["texts"]
+        lemmatizer = CeleryLemmatizer(batch_size=2, cache_size=len(texts))
+        lemmas = lemmatizer.lemmatize_texts(texts)
+        # Lemmatizing other texts in between doesn't change the lemmas of the first texts.
+        other_lemmas = lemmatizer.lemmatize_texts(["Tere maailm!"])
+        self.assertEqual([lemmatizer.lemmatize(text) for text in texts], lemmas)
+        self.assertEqual(lemmatizer.lemmatize("Tere maailm!"), other_lemmas[0])
+        self.assertTrue(len(lemmatizer._cache) <= len(texts))
+
+
 @override_settings(CELERY_ALWAYS_EAGER=True)
 class MLPDocsTests(APITestCase):
 
@@ -180,6 +207,48 @@ class MLPIndexProcessing(APITransactionTestCase):
             self._assert_mlp_contents(hit, TEST_FIELD)
 
 
+    def test_index_processing_in_slices(self):
+        payload = {
+            "description": "TestingIndexProcessing",
+            "fields": [TEST_FIELD],
+            "query": json.dumps({'query': {'match': {'comment_content_lemmas': "inimene"}}}, ensure_ascii=False),
+            "es_scroll_size": 5
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+        print_output("test_index_processing_in_slices:response.data", response.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        task_object = MLPWorker.objects.get(pk=response.data["id"]).tasks.last()
+        self.assertEqual(task_object.status, Task.STATUS_COMPLETED)
+
+        s = ElasticSearcher(indices=[self.test_index_name], output=ElasticSearcher.OUT_DOC, query=json.loads(payload["query"]))
+        for hit in s:
+            self._assert_mlp_contents(hit, TEST_FIELD)
+
+
+    def test_resuming_index_processing_skips_processed_documents(self):
+        payload = {
+            "description": "TestingIndexProcessing",
+            "fields": [TEST_FIELD],
+            "query": json.dumps({'query': {'match': {'comment_content_lemmas': "inimene"}}}, ensure_ascii=False)
+        }
+        response = self.client.post(self.url, data=payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        worker_id = response.data["id"]
+        self.ec.es.indices.refresh(index=self.test_index_name)
+
+        resume_url = reverse(f"{VERSION_NAMESPACE}:mlp_index-resume", kwargs={"project_pk": self.project.pk, "pk": worker_id})
+        response = self.client.post(resume_url, format="json")
+        print_output("test_resuming_index_processing_skips_processed_documents:response.data", response.data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        worker = MLPWorker.objects.get(pk=worker_id)
+        self.assertEqual(worker.tasks.count(), 2)
+        last_task = worker.tasks.last()
+        self.assertEqual(last_task.status, Task.STATUS_COMPLETED)
+        self.assertEqual(last_task.total, 0)
+
+
     def _check_for_if_query_correct(self, hit: dict, field_name: str, query_string: str):
         text = hit[field_name]
         self.assertTrue(query_string in text)
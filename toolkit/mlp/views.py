@@ -1,17 +1,20 @@
 # Create your views here.
 import json
+from typing import List
 
 import rest_framework.filters as drf_filters
 from celery.result import allow_join_result
 from django.db import transaction
 from django_filters import rest_framework as filters
 from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.renderers import BrowsableAPIRenderer, HTMLFormRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from texta_mlp.mlp import MLP
 
 from toolkit.core.project.models import Project
+from toolkit.core.task.models import Task
 from toolkit.elastic.choices import ES6_SNOWBALL_MAPPING, ES7_SNOWBALL_MAPPING
 from toolkit.elastic.index.models import Index
 from toolkit.mlp.exceptions import CouldNotDetectLanguageException, WorkerBusyException
@@ -19,11 +22,31 @@ from toolkit.mlp.models import ApplyLangWorker, MLPWorker
 from toolkit.mlp.serializers import ApplyLangOnIndicesSerializer, LangDetectSerializer, MLPDocsSerializer, MLPListSerializer, MLPWorkerSerializer
 from toolkit.mlp.tasks import apply_mlp_on_docs, apply_mlp_on_list
 from toolkit.permissions.project_permissions import ProjectAccessInApplicationsAllowed
-from toolkit.settings import CELERY_MLP_TASK_QUEUE
+from toolkit.settings import CELERY_MLP_TASK_QUEUE, MLP_MICRO_BATCH_MAX_ITEMS, MLP_MICRO_BATCH_WAIT_MS
+from toolkit.tools.micro_batcher import MicroBatcher
 from toolkit.view_constants import BulkDelete
 from toolkit.mlp.helpers import check_celery_tasks
 
 
+def _apply_mlp_on_texts_batch(key: tuple, texts: List[str]) -> List[dict]:
+    analyzers = list(key)
+    with allow_join_result():
+        return apply_mlp_on_list.apply_async(kwargs={"texts": texts, "analyzers": analyzers}, queue=CELERY_MLP_TASK_QUEUE).get()
+
+
+def _apply_mlp_on_docs_batch(key: tuple, docs: List[dict]) -> List[dict]:
+    analyzers, fields_to_parse = key
+    with allow_join_result():
+        return apply_mlp_on_docs.apply_async(kwargs={"docs": docs, "analyzers": list(analyzers), "fields_to_parse": list(fields_to_parse)}, queue=CELERY_MLP_TASK_QUEUE).get()
+
+
+# Concurrent requests of the web process are sent to the MLP workers as a single task,
+# which processes all their texts with one batched MLP call. Web processes that handle
+# one request at a time, like uWSGI workers without threads, send every request at once.
+MLP_TEXTS_BATCHER = MicroBatcher("MLP Texts", _apply_mlp_on_texts_batch, max_wait_ms=MLP_MICRO_BATCH_WAIT_MS, max_batch_items=MLP_MICRO_BATCH_MAX_ITEMS)
+MLP_DOCS_BATCHER = MicroBatcher("MLP Docs", _apply_mlp_on_docs_batch, max_wait_ms=MLP_MICRO_BATCH_WAIT_MS, max_batch_items=MLP_MICRO_BATCH_MAX_ITEMS)
+
+
 class LangDetectView(APIView):
     """
     Given any input text it returns the ISO 639-1 two letter language code and a more humanized
@@ -77,9 +100,8 @@ class MlpDocsProcessor(APIView):
         if not check_celery_tasks(CELERY_MLP_TASK_QUEUE):
             raise WorkerBusyException()
 
-        with allow_join_result():
-            mlp = apply_mlp_on_docs.apply_async(kwargs={"docs": docs, "analyzers": analyzers, "fields_to_parse": fields_to_parse}, queue=CELERY_MLP_TASK_QUEUE).get()
-        return Response(mlp)
+        mlp, metrics = MLP_DOCS_BATCHER.process((tuple(analyzers), tuple(fields_to_parse)), docs)
+        return Response(mlp, headers={"Server-Timing": MicroBatcher.to_server_timing(metrics)})
 
 
 class MLPListProcessor(APIView):
@@ -99,9 +121,8 @@ class MLPListProcessor(APIView):
         if not check_celery_tasks(CELERY_MLP_TASK_QUEUE):
             raise WorkerBusyException()
         
-        with allow_join_result():
-            mlp = apply_mlp_on_list.apply_async(kwargs={"texts": texts, "analyzers": analyzers}, queue=CELERY_MLP_TASK_QUEUE).get()
-        return Response(mlp)
+        mlp, metrics = MLP_TEXTS_BATCHER.process(tuple(analyzers), texts)
+        return Response(mlp, headers={"Server-Timing": MicroBatcher.to_server_timing(metrics)})
 
 
 
@@ -144,6 +165,16 @@ class MLPElasticWorkerViewset(viewsets.ModelViewSet, BulkDelete):
             worker.process()
 
 
+    @action(detail=True, methods=['post'])
+    def resume(self, request, pk=None, project_pk=None):
+        """Continues applying MLP on the documents that were left unprocessed by the previous run."""
+        instance: MLPWorker = self.get_object()
+        if instance.tasks.last().status == Task.STATUS_RUNNING:
+            return Response({"error": "MLP is still being applied by the worker!"}, status=status.HTTP_400_BAD_REQUEST)
+        instance.process(resume=True)
+        return Response({"success": "resuming task created"}, status=status.HTTP_200_OK)
+
+
 class ApplyLangOnIndices(viewsets.ModelViewSet, BulkDelete):
     serializer_class = ApplyLangOnIndicesSerializer
 
@@ -0,0 +1,85 @@
+"""
+Benchmark of the Regex Tagger matchers on synthetic lexicons, the matches of the matchers are compared as well.
+
+    python -m toolkit.regex_tagger.benchmark --sizes 1000 10000 100000 --match-type prefix
+"""
+import argparse
+import random
+import time
+from typing import List
+
+from toolkit.regex_tagger.lexicon_trie import TrieLexiconMatcher
+from toolkit.regex_tagger.matcher_bundle import CompiledLexiconMatcher
+
+
+SYLLABLES = ["ka", "la", "ma", "ne", "pi", "ro", "su", "ta", "va", "ju", "õi", "ül", "är", "se", "ko", "mi"]
+
+
+def generate_words(rng: random.Random, count: int) -> List[str]:
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 5))))
+    return sorted(words)
+
+
+def generate_texts(rng: random.Random, vocabulary: List[str], lexicon: List[str], n_texts: int, text_length: int) -> List[str]:
+    texts = []
+    for _ in range(n_texts):
+        words = [rng.choice(vocabulary) for _ in range(text_length)]
+        # Every text contains a few lexicon entries in different cases and with punctuation.
+        for _ in range(3):
+            entry = rng.choice(lexicon)
+            words.insert(rng.randrange(len(words)), rng.choice([entry, entry.upper(), entry.capitalize() + ","]))
+        texts.append(" ".join(words))
+    return texts
+
+
+def run_matcher(matcher_class, lexicon: List[str], texts: List[str], **kwargs):
+    start = time.perf_counter()
+    matcher = matcher_class(lexicon, **kwargs)
+    # Warm up the lazily compiled patterns of the first text into the build time.
+    matches = [matcher.get_matches(texts[0])]
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches.extend(matcher.get_matches(text) for text in texts[1:])
+    match_time = time.perf_counter() - start
+    return build_time, match_time / max(len(texts) - 1, 1), matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Sizes of the lexicons.")
+    parser.add_argument("--texts", type=int, default=200, help="Number of texts to match.")
+    parser.add_argument("--text-length", type=int, default=300, help="Number of words in a text.")
+    parser.add_argument("--match-type", default="prefix", choices=["prefix", "exact"])
+    parser.add_argument("--operator", default="or", choices=["or", "and"])
+    parser.add_argument("--phrase-slop", type=int, default=0)
+    parser.add_argument("--case-sensitive", action="store_true")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = generate_words(rng, 20000)
+    counter_lexicon = rng.sample(vocabulary, 50)
+    kwargs = dict(operator=args.operator, required_words=0.0, match_type=args.match_type, phrase_slop=args.phrase_slop, ignore_case=not args.case_sensitive, counter_lexicon=counter_lexicon)
+
+    print(f"{'lexicon':>8} {'matcher':>10} {'build (s)':>10} {'per text (ms)':>14}")
+    for size in args.sizes:
+        words = generate_words(rng, size)
+        # Every tenth entry is a phrase.
+        lexicon = [f"{word} {words[i - 1]}" if i % 10 == 0 else word for i, word in enumerate(words)]
+        texts = generate_texts(rng, vocabulary, lexicon, args.texts, args.text_length)
+
+        results = {}
+        for name, matcher_class in (("regex", CompiledLexiconMatcher), ("trie", TrieLexiconMatcher)):
+            build_time, text_time, matches = run_matcher(matcher_class, lexicon, texts, **kwargs)
+            results[name] = matches
+            print(f"{size:>8} {name:>10} {build_time:>10.3f} {text_time * 1000:>14.3f}")
+
+        if results["regex"] != results["trie"]:
+            raise AssertionError(f"Matches of the matchers differ for the lexicon of {size} entries.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+import regex as re
+from texta_lexicon_matcher.lexicon_matcher import LexiconMatcher
+
+
+# Match types whose lexicon entries start matching only at the beginning of the text or after a whitespace.
+TRIE_MATCH_TYPES = ("exact", "prefix")
+
+# Characters that can tie the entries of the joined alternation together, e.g. "(a" and "b)".
+NON_LOCAL_CHARS = set("\\|()[]")
+# Characters that end the literal prefix of an entry.
+SPECIAL_CHARS = set(".^$*+?{}") | NON_LOCAL_CHARS
+QUANTIFIER_CHARS = set("*+?{")
+
+# Characters that IGNORECASE matches with characters of a different case folding (e.g. "I" and "ı"),
+# lexicons containing them aren't supported and texts containing them are matched with the regex patterns.
+CASE_FOLDING_EXCEPTIONS = set("İıΐΐΰΰﬅﬆ")
+
+WHITESPACE_PATTERN = re.compile(r"\s")
+WORD_PATTERN = re.compile(r"\w*")
+EXACT_END_PATTERN = re.compile(r"\W*\s")
+
+# Keys of the trie nodes that hold the literal entries ending in the node and the other entries with the node as their prefix.
+_END = None
+_PREFIX_END = ""
+
+# A match as (start, end) with the preceding whitespace included like in the regex matches.
+Match = Tuple[int, int]
+# Start position of a lexicon entry as (position of the match start, whether the start of text was matched instead of a whitespace, position of the entry).
+Slot = Tuple[int, int, int]
+
+
+def fold_char(char: str) -> str:
+    folded = char.casefold()
+    if len(folded) == 1:
+        return folded
+    lowered = char.lower()
+    return lowered if len(lowered) == 1 else char
+
+
+def fold_text(text: str) -> str:
+    """Case folds the text character by character, so that the positions in the folded text are the ones of the original."""
+    folded = text.casefold()
+    # Case folding doesn't shorten the text, so an equal length means that every character was folded into one.
+    if len(folded) == len(text):
+        return folded
+    return "".join(fold_char(char) for char in text)
+
+
+def get_literal_prefix(pattern: str) -> str:
+    """Returns the prefix of the pattern that every match of it has to start with."""
+    for i, char in enumerate(pattern):
+        if char in SPECIAL_CHARS:
+            # Quantifiers make the preceding character optional.
+            return pattern[:i - 1] if char in QUANTIFIER_CHARS and i > 0 else pattern[:i]
+    return pattern
+
+
+def get_slots(text: str) -> List[Slot]:
+    """
+    Returns the positions where the lexicon patterns can start in the order the regex tries them:
+    after every whitespace and at the start of the text, which is tried after the whitespace at the same position.
+    """
+    slots = [(match.start(), 0, match.end()) for match in WHITESPACE_PATTERN.finditer(text)]
+    caret_slot = (0, 1, 0)
+    if slots and slots[0][0] == 0:
+        slots.insert(1, caret_slot)
+    elif text:
+        slots.insert(0, caret_slot)
+    return slots
+
+
+class LexiconTrie:
+    """
+    Character trie of a lexicon that finds the matches of the regex patterns of LexiconMatcher for the exact and prefix match types.
+    Literal entries are matched in the trie directly, other entries (regexes and phrases with a slop) are indexed by their literal prefix
+    and only the patterns of the entries whose prefix was found in the text are run.
+    """
+
+
+    def __init__(self, matcher: LexiconMatcher, lexicon: List[str], match_type: str):
+        self.size = len(lexicon)
+        self.match_type = match_type
+        self.return_fuzzy_match = matcher._return_fuzzy_match
+        self.ignore_case = matcher._ignore_case
+        self.flags = re.IGNORECASE if self.ignore_case else 0
+        self.root: dict = {}
+        # Per entry patterns of the non-literal entries, compiled on first use.
+        self.patterns: Dict[int, str] = {}
+        self.compiled_patterns: Dict[int, re.Pattern] = {}
+
+        prefix = matcher._get_prefix(match_type)
+        suffix = matcher._get_suffix(match_type)
+        for index, entry in enumerate(lexicon):
+            alternative = matcher._add_slops([entry])[0]
+            literal_prefix = get_literal_prefix(alternative)
+            if self.ignore_case:
+                literal_prefix = fold_text(literal_prefix)
+
+            node = self.root
+            for char in literal_prefix:
+                node = node.setdefault(char, {})
+            if len(literal_prefix) == len(alternative):
+                node.setdefault(_END, []).append(index)
+            else:
+                self.patterns[index] = prefix + alternative + suffix
+                node.setdefault(_PREFIX_END, []).append(index)
+
+
+    @staticmethod
+    def supports(matcher: LexiconMatcher, lexicon: List[str]) -> bool:
+        """Whether every entry of the lexicon has a literal prefix and doesn't affect the patterns of the other entries."""
+        for entry in lexicon:
+            if NON_LOCAL_CHARS.intersection(entry) or not get_literal_prefix(matcher._add_slops([entry])[0]):
+                return False
+            if matcher._ignore_case and CASE_FOLDING_EXCEPTIONS.intersection(entry):
+                return False
+        return True
+
+
+    def _get_pattern(self, index: int):
+        pattern = self.compiled_patterns.get(index, None)
+        if pattern is None:
+            pattern = re.compile(self.patterns[index], flags=self.flags)
+            self.compiled_patterns[index] = pattern
+        return pattern
+
+
+    def _get_end(self, text: str, end: int) -> Optional[int]:
+        """Returns the end of the match of a literal entry that ends at the given position or None if the suffix doesn't match."""
+        if self.match_type == "exact":
+            if end == len(text) or EXACT_END_PATTERN.match(text, end):
+                return end
+            return None
+        if self.return_fuzzy_match:
+            return WORD_PATTERN.match(text, end).end()
+        return end
+
+
+    def _walk(self, text: str, folded_text: str, slots: List[Slot], first_only: bool):
+        """
+        Walks the trie from every slot. Returns the literal matches per slot as lists of (entry index, end),
+        which hold only the first entry in the lexicon when first_only is set, and the indices of the other entries with a matching prefix.
+        """
+        literal_matches = []
+        regex_candidates = set()
+        text_length = len(folded_text)
+        for slot in slots:
+            node = self.root
+            slot_matches = []
+            i = slot[2]
+            while i < text_length:
+                node = node.get(folded_text[i], None)
+                if node is None:
+                    break
+                i += 1
+                indices = node.get(_END, None)
+                if indices:
+                    end = self._get_end(text, i)
+                    if end is not None:
+                        slot_matches.extend((index, end) for index in indices)
+                regex_indices = node.get(_PREFIX_END, None)
+                if regex_indices:
+                    regex_candidates.update(regex_indices)
+            if slot_matches:
+                if first_only:
+                    slot_matches = [min(slot_matches)]
+                literal_matches.append((slot, slot_matches))
+        return literal_matches, regex_candidates
+
+
+    def get_matches(self, text: str, folded_text: str, slots: List[Slot]) -> List[Match]:
+        """Returns the matches of the alternation of all the entries, which is the pattern of the "or" operator."""
+        literal_matches, regex_candidates = self._walk(text, folded_text, slots, first_only=True)
+        literal_matches = [(slot[0], slot[1], index, end) for slot, ((index, end),) in literal_matches]
+
+        # Next matches of the regex entries as (start, whether the start of text was matched, entry index, end).
+        regex_matches = {}
+        matches = []
+        position = 0
+        literal_index = 0
+        while True:
+            while literal_index < len(literal_matches) and literal_matches[literal_index][0] < position:
+                literal_index += 1
+            candidates = literal_matches[literal_index:literal_index + 1]
+
+            for index in list(regex_candidates):
+                regex_match = regex_matches.get(index, None)
+                if regex_match is None or regex_match[0] < position:
+                    match = self._get_pattern(index).search(text, position)
+                    if match is None:
+                        regex_candidates.discard(index)
+                        continue
+                    regex_match = (match.start(), 0 if match.group(1) else 1, index, match.end())
+                    regex_matches[index] = regex_match
+                candidates.append(regex_match)
+
+            if not candidates:
+                break
+            start, _, _, end = min(candidates)
+            matches.append((start, end))
+            position = end
+        return matches
+
+
+    def get_entry_matches(self, text: str, folded_text: str, slots: List[Slot]) -> Dict[int, List[Match]]:
+        """Returns the matches of the patterns of every entry separately, which are the patterns of the "and" operator."""
+        literal_matches, regex_candidates = self._walk(text, folded_text, slots, first_only=False)
+        entry_matches: Dict[int, List[Match]] = {}
+        for slot, slot_matches in literal_matches:
+            start = slot[0]
+            for index, end in slot_matches:
+                matches = entry_matches.setdefault(index, [])
+                # Matches of an entry don't overlap.
+                if not matches or start >= matches[-1][1]:
+                    matches.append((start, end))
+        for index in regex_candidates:
+            matches = [match.span() for match in self._get_pattern(index).finditer(text)]
+            if matches:
+                entry_matches[index] = matches
+        return entry_matches
+
+
+class TrieLexiconMatcher(LexiconMatcher):
+    """
+    LexiconMatcher for large lexicons of the exact and prefix match types. Instead of running an alternation of all the entries
+    over the text, the entries are found by walking a trie of the lexicon from the positions where the patterns can start.
+    The matches are the ones of the regex patterns of LexiconMatcher.
+    """
+
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.supports(self):
+            raise ValueError("Lexicon trie doesn't support fuzzy and subword matching or lexicons with regex groups and case folding exceptions.")
+        self._trie = LexiconTrie(self, self._lexicon, self._match_type)
+        self._counter_trie = LexiconTrie(self, self._counter_lexicon, "exact") if LexiconTrie.supports(self, self._counter_lexicon) else None
+
+
+    @staticmethod
+    def supports(matcher: LexiconMatcher) -> bool:
+        if matcher._match_type not in TRIE_MATCH_TYPES or matcher._n_allowed_edits > 0 or not matcher._lexicon:
+            return False
+        return LexiconTrie.supports(matcher, matcher._lexicon)
+
+
+    def _unpack_span(self, text: str, match: Match) -> List[Dict[str, Union[str, List[int]]]]:
+        raw_start, raw_end = match
+        raw_str_val = text[raw_start:raw_end]
+        if re.search(r"^\s", raw_str_val):
+            raw_start += 1
+        if re.search(r"\s$", raw_str_val):
+            raw_end -= 1
+        return [{"str_val": raw_str_val.strip().lower(), "span": [raw_start, raw_end]}]
+
+
+    def _get_trie_counter_matches(self, text: str, folded_text: str, slots: List[Slot]) -> List[Dict[str, Union[str, List[int]]]]:
+        if self._counter_trie is None:
+            return self._get_counter_matches(text)
+        counter_matches = []
+        for match in self._counter_trie.get_matches(text, folded_text, slots):
+            counter_matches.extend(self._unpack_span(text, match))
+        return counter_matches
+
+
+    def get_matches(self, text: str) -> List[Dict[str, Union[str, List[int]]]]:
+        if self._ignore_case and CASE_FOLDING_EXCEPTIONS.intersection(text):
+            return super().get_matches(text)
+
+        folded_text = fold_text(text) if self._ignore_case else text
+        slots = get_slots(text)
+        if self._operator == "and":
+            entry_matches = self._trie.get_entry_matches(text, folded_text, slots)
+            # Entries are the patterns of the "and" operator.
+            nr_patterns = self._trie.size
+            if len(entry_matches) / float(nr_patterns) < self._required_words:
+                return []
+            pattern_matches_list = [entry_matches[index] for index in sorted(entry_matches)]
+        else:
+            nr_patterns = 1
+            pattern_matches_list = [self._trie.get_matches(text, folded_text, slots)]
+
+        counter_matches = self._get_trie_counter_matches(text, folded_text, slots) if self._counter_lexicon else []
+
+        matches_list = []
+        found_matches = 0
+        for pattern_match_spans in pattern_matches_list:
+            pattern_matches = 0
+            for match in pattern_match_spans:
+                unpacked_match = self._unpack_span(text, match)
+                if self._counter_lexicon:
+                    unpacked_match = self._dispend_counter_matches(counter_matches, unpacked_match, text)
+                if unpacked_match:
+                    pattern_matches += 1
+                matches_list.extend(unpacked_match)
+
+            if pattern_matches > 0:
+                found_matches += 1
+
+        if self._operator == "and" and (found_matches / float(nr_patterns)) < self._required_words:
+            matches_list = []
+
+        return matches_list
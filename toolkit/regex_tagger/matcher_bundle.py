@@ -0,0 +1,88 @@
+from typing import Dict, List, Tuple, Union
+
+import regex as re
+from texta_lexicon_matcher.lexicon_matcher import LexiconMatcher
+
+
+class CompiledLexiconMatcher(LexiconMatcher):
+    """
+    LexiconMatcher with its patterns compiled once on creation. The original matcher
+    passes the pattern strings to the regex module on every text, which has to look them up
+    from its bounded cache or compile them again for large lexicons and many taggers.
+    """
+
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        flags = re.IGNORECASE if self._ignore_case else 0
+        self._compiled_patterns = [re.compile(pattern, flags=flags) for pattern in self._patterns]
+        # Counter matches are only used with a counter lexicon.
+        self._compiled_counter_patterns = [re.compile(pattern, flags=flags) for pattern in self._counter_patterns] if self._counter_lexicon else []
+
+
+    def _get_counter_matches(self, text: str) -> List[Dict[str, Union[str, List[int]]]]:
+        counter_matches = []
+        for pattern in self._compiled_counter_patterns:
+            for match in pattern.finditer(text):
+                counter_matches.extend(self._unpack_match(match))
+        return counter_matches
+
+
+    def get_matches(self, text: str) -> List[Dict[str, Union[str, List[int]]]]:
+        matches_list = []
+        found_matches = 0
+        nr_patterns = len(self._compiled_patterns)
+
+        counter_matches = self._get_counter_matches(text)
+
+        for pattern in self._compiled_patterns:
+            pattern_matches = 0
+            for match in pattern.finditer(text):
+                unpacked_match = self._unpack_match(match)
+                if self._counter_lexicon:
+                    unpacked_match = self._dispend_counter_matches(counter_matches, unpacked_match, text)
+                if unpacked_match:
+                    pattern_matches += 1
+                matches_list.extend(unpacked_match)
+
+            if pattern_matches > 0:
+                found_matches += 1
+
+            if self._operator == "and" and pattern_matches == 0 and self._required_words == 1.0:
+                break
+
+        if self._operator == "and" and (found_matches / float(nr_patterns)) < self._required_words:
+            matches_list = []
+
+        return matches_list
+
+
+class RegexTaggerGroupMatcher:
+    """
+    Compiled matchers of all the Regex Taggers of a group, built once and reused for every text.
+    Every tagger keeps its own matcher: a single alternation over the lexicons would consume the text
+    and lose the overlapping matches of different taggers, which the group reports separately.
+    """
+
+
+    def __init__(self):
+        self.taggers: List[Tuple[int, str, LexiconMatcher]] = []
+
+
+    def __len__(self):
+        return len(self.taggers)
+
+
+    def add_tagger(self, tagger_id: int, description: str, matcher: LexiconMatcher):
+        self.taggers.append((tagger_id, description, matcher))
+
+
+    def get_matches(self, text: str) -> List[Tuple[int, str, List[dict]]]:
+        """Returns the matches of every tagger that matched the text as (tagger id, tagger description, matches) triples."""
+        results = []
+        if text and isinstance(text, str):
+            for tagger_id, description, matcher in self.taggers:
+                matches = matcher.get_matches(text)
+                if matches:
+                    results.append((tagger_id, description, matches))
+        return results
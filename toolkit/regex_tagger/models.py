@@ -6,24 +6,33 @@ from typing import List, Optional
 from django.contrib.auth.models import User
 from django.core import serializers
 from django.db import models, transaction
+from django.dispatch import receiver
 from texta_elastic.core import ElasticCore
 from texta_elastic.document import ElasticDocument
 from texta_lexicon_matcher.lexicon_matcher import LexiconMatcher
 
 from toolkit.core.project.models import Project
 from toolkit.core.task.models import Task
+from toolkit.helper_functions import hash_string
 from toolkit.model_constants import CommonModelMixin, FavoriteModelMixin
 from toolkit.regex_tagger import choices
-from toolkit.settings import TEXTA_TAGS_KEY
+from toolkit.regex_tagger.lexicon_trie import TrieLexiconMatcher
+from toolkit.regex_tagger.matcher_bundle import CompiledLexiconMatcher, RegexTaggerGroupMatcher
+from toolkit.settings import REGEX_TAGGER_GROUP_CACHE_MAX_ENTRIES, REGEX_TAGGER_TRIE_MIN_LEXICON_SIZE, TEXTA_TAGS_KEY
+from toolkit.tools.model_cache import ModelCache
+
+
+# Fields of the Regex Tagger that define its matcher.
+MATCHER_FIELDS = ("lexicon", "counter_lexicon", "operator", "match_type", "required_words", "phrase_slop", "counter_slop", "n_allowed_edits", "return_fuzzy_match", "ignore_case", "ignore_punctuation")
+
+REGEX_TAGGER_GROUP_CACHE = ModelCache("Regex Tagger Group Cache", max_entries=REGEX_TAGGER_GROUP_CACHE_MAX_ENTRIES)
 
 
 def load_matcher(regex_tagger_object):
     # parse lexicons
     lexicon = json.loads(regex_tagger_object.lexicon)
     counter_lexicon = json.loads(regex_tagger_object.counter_lexicon)
-    # create matcher
-    matcher = LexiconMatcher(
-        lexicon,
+    matcher_kwargs = dict(
         counter_lexicon=counter_lexicon,
         operator=regex_tagger_object.operator,
         match_type=regex_tagger_object.match_type,
@@ -35,7 +44,12 @@ def load_matcher(regex_tagger_object):
         ignore_case=regex_tagger_object.ignore_case,
         ignore_punctuation=regex_tagger_object.ignore_punctuation
     )
-    return matcher
+    # create matcher, large lexicons are matched with a trie instead of a single alternation
+    if len(lexicon) >= REGEX_TAGGER_TRIE_MIN_LEXICON_SIZE:
+        matcher = LexiconMatcher(lexicon, **matcher_kwargs)
+        if TrieLexiconMatcher.supports(matcher):
+            return TrieLexiconMatcher(lexicon, **matcher_kwargs)
+    return CompiledLexiconMatcher(lexicon, **matcher_kwargs)
 
 
 class RegexTagger(FavoriteModelMixin, CommonModelMixin):
@@ -68,9 +82,9 @@ class RegexTagger(FavoriteModelMixin, CommonModelMixin):
         return json_obj
 
 
-    def apply(self, texts: List[str], field_path: str, fact_name: str = "", fact_value: str = "", add_spans: bool = True):
+    def apply(self, texts: List[str], field_path: str, fact_name: str = "", fact_value: str = "", add_spans: bool = True, matcher: Optional[LexiconMatcher] = None):
         """Apply Regex Tagger on texts and return results as texta_facts."""
-        results = self.match_texts(texts, as_texta_facts=True, field=field_path, add_source=False, fact_name=fact_name, fact_value=fact_value, add_spans=add_spans)
+        results = self.match_texts(texts, as_texta_facts=True, field=field_path, matcher=matcher, add_source=False, fact_name=fact_name, fact_value=fact_value, add_spans=add_spans)
         return results
 
 
@@ -142,61 +156,73 @@ class RegexTaggerGroup(FavoriteModelMixin, CommonModelMixin):
     regex_taggers = models.ManyToManyField(RegexTagger, default=None)
 
 
-    def apply(self, texts: List[str] = [], field_path: Optional[str] = None, fact_name: str = "", fact_value: str = "", add_spans: bool = True):
+    def load_matcher_bundle(self) -> RegexTaggerGroupMatcher:
+        """Compiles the matchers of all the Regex Taggers of the group."""
+        bundle = RegexTaggerGroupMatcher()
+        for tagger in self.regex_taggers.order_by("pk"):
+            bundle.add_tagger(tagger.pk, tagger.description, load_matcher(tagger))
+        return bundle
+
+
+    def load_cached_matcher_bundle(self) -> RegexTaggerGroupMatcher:
+        """
+        Loads the compiled matchers from the process cache, falls back to compiling them.
+        Hash of the matcher fields of the taggers is used as the version so that changes
+        made through other processes are picked up as well.
+        """
+        values = list(self.regex_taggers.order_by("pk").values_list("pk", "description", *MATCHER_FIELDS))
+        version = hash_string(json.dumps(values, ensure_ascii=False))
+        return REGEX_TAGGER_GROUP_CACHE.get(self.pk, version, self.load_matcher_bundle)
+
+
+    def apply(self, texts: List[str] = [], field_path: Optional[str] = None, fact_name: str = "", fact_value: str = "", add_spans: bool = True, bundle: Optional[RegexTaggerGroupMatcher] = None):
         results = []
+        bundle = bundle if bundle is not None else self.load_cached_matcher_bundle()
         for text in texts:
-            if isinstance(text, str) and text:
-                for tagger in self.regex_taggers.all():
-                    matcher = load_matcher(tagger)
-                    matches = matcher.get_matches(text)
-                    if field_path:
-                        texta_facts = [{"str_val": tagger.description, "spans": json.dumps([match["span"]]), "fact": self.description, "doc_path": field_path, "sent_index": 0} for match in matches]
-                    else:
-                        texta_facts = [{"str_val": tagger.description, "spans": json.dumps([match["span"]]), "fact": self.description, "sent_index": 0} for match in matches]
-                    results.extend(texta_facts)
+            for tagger_id, description, matches in bundle.get_matches(text):
+                if field_path:
+                    texta_facts = [{"str_val": description, "spans": json.dumps([match["span"]]), "fact": self.description, "doc_path": field_path, "sent_index": 0} for match in matches]
+                else:
+                    texta_facts = [{"str_val": description, "spans": json.dumps([match["span"]]), "fact": self.description, "sent_index": 0} for match in matches]
+                results.extend(texta_facts)
         return results
 
 
-    def match_texts(self, texts: List[str], as_texta_facts: bool = False, field: str = ""):
+    def match_texts(self, texts: List[str], as_texta_facts: bool = False, field: str = "", bundle: Optional[RegexTaggerGroupMatcher] = None):
         results = []
-        for tagger in self.regex_taggers.all():
-            matcher = load_matcher(tagger)
+        bundle = bundle if bundle is not None else self.load_cached_matcher_bundle()
+        for tagger_id, description, matcher in bundle.taggers:
             for text in texts:
                 if text and isinstance(text, str):
                     matches = matcher.get_matches(text)
                     if as_texta_facts:
-                        new_facts = []
-
-                        for match in matches:
-                            source_string = json.dumps({"regextaggergroup_id": self.pk, "regextagger_id": tagger.pk})
-                            new_fact = {
-                                "fact": self.description,
-                                "str_val": tagger.description,
-                                "doc_path": field,
-                                "spans": json.dumps([match["span"]]),
-                                "source": source_string
-                            }
-                            new_facts.append(new_fact)
-
-                    if as_texta_facts:
-                        results.extend(new_facts)
+                        source_string = json.dumps({"regextaggergroup_id": self.pk, "regextagger_id": tagger_id})
+                        results.extend({"fact": self.description, "str_val": description, "doc_path": field, "spans": json.dumps([match["span"]]), "source": source_string} for match in matches)
                     else:
                         results.extend(matches)
         return results
 
 
     def tag_docs(self, fields: List[str], docs: List[dict]):
+        if not fields:
+            return docs
+
+        ec = ElasticCore(check_connection=False)
+        bundle = self.load_cached_matcher_bundle()
         # apply tagger
         for doc in docs:
+            flattened_doc = ec.flatten(doc)
+            new_facts = []
             for field in fields:
-                flattened_doc = ElasticCore(check_connection=False).flatten(doc)
                 text = flattened_doc.get(field, None)
-                matches_as_facts = self.match_texts([text], as_texta_facts=True, field=field)
-                for fact in matches_as_facts:
-                    fact.update(fact=self.description)
+                new_facts.extend(self.match_texts([text], as_texta_facts=True, field=field, bundle=bundle))
 
-                pre_existing_facts = doc.get(TEXTA_TAGS_KEY, [])
-                filtered_facts = ElasticDocument.remove_duplicate_facts(pre_existing_facts + matches_as_facts)
-                doc[TEXTA_TAGS_KEY] = filtered_facts
+            pre_existing_facts = doc.get(TEXTA_TAGS_KEY, [])
+            doc[TEXTA_TAGS_KEY] = ElasticDocument.remove_duplicate_facts(pre_existing_facts + new_facts)
 
         return docs
+
+
+@receiver(models.signals.pre_delete, sender=RegexTaggerGroup)
+def invalidate_cached_matcher_bundle(sender, instance: RegexTaggerGroup, **kwargs):
+    REGEX_TAGGER_GROUP_CACHE.invalidate(instance.pk)
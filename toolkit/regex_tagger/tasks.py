@@ -1,18 +1,14 @@
-import json
-import logging
-from typing import List, Optional, Union
+from typing import List, Optional
 
 from celery.decorators import task
-from elasticsearch.helpers import streaming_bulk
 from texta_elastic.core import ElasticCore
-from texta_elastic.document import ElasticDocument
-from texta_elastic.searcher import ElasticSearcher
 
 from toolkit.base_tasks import TransactionAwareTask
+from toolkit.elastic.tools.apply_to_index import get_field_texts, index_applier
+from toolkit.elastic.tools.tasks import apply_to_index
 from toolkit.regex_tagger.choices import PRIORITY_CHOICES
 from toolkit.regex_tagger.models import RegexTagger, RegexTaggerGroup, load_matcher
-from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, ERROR_LOGGER
-from toolkit.tools.show_progress import ShowProgress
+from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, REGEX_TAGGER_APPLY_PROCESSES
 
 
 def load_taggers(tagger_object: RegexTaggerGroup):
@@ -38,30 +34,26 @@ def process_texta_facts(facts: List[str], priority: Optional[str] = None):
         return facts
 
 
-def update_generator(generator: ElasticSearcher, ec: ElasticCore, fields: List[str], tagger_object: Union[RegexTagger, RegexTaggerGroup], fact_name: str, fact_value: str, add_spans: bool):
-    for scroll_batch in generator:
-        for raw_doc in scroll_batch:
-            hit = raw_doc["_source"]
-            flat_hit = ec.flatten(hit)
-            existing_facts = hit.get("texta_facts", [])
+@index_applier("regex_tagger", processes=REGEX_TAGGER_APPLY_PROCESSES)
+def get_regex_tagger_batch_function(object_id: int, object_type: str, fields: List[str], fact_name: str = "", fact_value: str = "", add_spans: bool = True):
+    # Matchers are compiled once per slice instead of for every text.
+    if object_type == "regex_tagger_group":
+        tagger_object = RegexTaggerGroup.objects.get(pk=object_id)
+        matcher_kwargs = {"bundle": tagger_object.load_cached_matcher_bundle()}
+    else:
+        tagger_object = RegexTagger.objects.get(pk=object_id)
+        matcher_kwargs = {"matcher": load_matcher(tagger_object)}
+    ec = ElasticCore()
 
-            for field in fields:
-                text = flat_hit.get(field, None)
-                if text and isinstance(text, str):
-                    results = tagger_object.apply([text], field_path=field, fact_name=fact_name, fact_value=fact_value, add_spans=add_spans)
-                    existing_facts.extend(results)
 
-                if existing_facts:
-                    # Remove duplicates to avoid adding the same facts with repetitive use.
-                    existing_facts = ElasticDocument.remove_duplicate_facts(existing_facts)
+    def process_batch(sources: List[dict]) -> List[List[dict]]:
+        batch_facts = [[] for _ in sources]
+        for doc_index, field, text in get_field_texts(ec, sources, fields):
+            batch_facts[doc_index].extend(tagger_object.apply([text], field_path=field, fact_name=fact_name, fact_value=fact_value, add_spans=add_spans, **matcher_kwargs))
+        return batch_facts
 
-                yield {
-                    "_index": raw_doc["_index"],
-                    "_id": raw_doc["_id"],
-                    "_type": raw_doc.get("_type", "_doc"),
-                    "_op_type": "update",
-                    "_source": {"doc": {"texta_facts": existing_facts}}
-                }
+
+    return process_batch
 
 
 @task(name="apply_regex_tagger_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
@@ -74,27 +66,8 @@ def apply_regex_tagger(object_id: int, object_type: str, indices: List[str], fie
             tagger_object = RegexTagger.objects.get(pk=object_id)
 
         task_object = tagger_object.tasks.last()
-        progress = ShowProgress(task_object)
-
-        ec = ElasticCore()
-        [ec.add_texta_facts_mapping(index) for index in indices]
-
-        searcher = ElasticSearcher(
-            indices=indices,
-            field_data=fields + ["texta_facts"],  # Get facts to add upon existing ones.
-            query=query,
-            timeout=f"{es_timeout}m",
-            output=ElasticSearcher.OUT_RAW,
-            callback_progress=progress,
-            scroll_size=bulk_size
-        )
-
-        actions = update_generator(generator=searcher, ec=ec, fields=fields, tagger_object=tagger_object, fact_name=fact_name, fact_value=fact_value, add_spans=add_spans)
-        for success, info in streaming_bulk(client=ec.es, actions=actions, refresh="wait_for", chunk_size=bulk_size, max_chunk_bytes=max_chunk_bytes):
-            if not success:
-                logging.getLogger(ERROR_LOGGER).exception(json.dumps(info))
-
-        task_object.complete()
+        applier_kwargs = {"object_id": object_id, "object_type": object_type, "fields": fields, "fact_name": fact_name, "fact_value": fact_value, "add_spans": add_spans}
+        apply_to_index("regex_tagger", applier_kwargs, task_object, indices=indices, fields=fields, query=query, bulk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, es_timeout=es_timeout)
         return True
 
     except Exception as e:
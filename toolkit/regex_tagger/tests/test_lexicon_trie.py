@@ -0,0 +1,46 @@
+import itertools
+
+from django.test import TestCase
+from texta_lexicon_matcher.lexicon_matcher import LexiconMatcher
+
+from toolkit.regex_tagger.lexicon_trie import TrieLexiconMatcher, get_literal_prefix
+
+
+LEXICON = ["varas", "var", "pea valutab", "peavalu", "dr.", "colou?r", "kõht", "STRASSE", "pea"]
+COUNTER_LEXICON = ["ei", "ei ole"]
+TEXTS = [
+    "Varas varastas eile auto, aga pea valutab.",
+    " pea  valutab ja peavalu ei ole, kõht KÕHT!",
+    "Dr. Straße ütles: color, colour ja colouur.\nvar",
+    "ei pea valutab",
+    "varas",
+    "",
+]
+
+
+class TrieLexiconMatcherTests(TestCase):
+
+    def test_matches_are_identical_to_the_regex_matcher(self):
+        options = itertools.product(["or", "and"], ["exact", "prefix"], [0, 1], [True, False], [True, False], [True, False])
+        for operator, match_type, phrase_slop, ignore_case, ignore_punctuation, return_fuzzy_match in options:
+            kwargs = dict(operator=operator, match_type=match_type, phrase_slop=phrase_slop, required_words=0.5, ignore_case=ignore_case,
+                          ignore_punctuation=ignore_punctuation, return_fuzzy_match=return_fuzzy_match, counter_lexicon=COUNTER_LEXICON)
+            regex_matcher = LexiconMatcher(LEXICON, **kwargs)
+            trie_matcher = TrieLexiconMatcher(LEXICON, **kwargs)
+            for text in TEXTS:
+                self.assertEqual(trie_matcher.get_matches(text), regex_matcher.get_matches(text), msg=f"{kwargs} {text}")
+
+
+    def test_unsupported_lexicons(self):
+        self.assertFalse(TrieLexiconMatcher.supports(LexiconMatcher(LEXICON, match_type="subword")))
+        self.assertFalse(TrieLexiconMatcher.supports(LexiconMatcher(LEXICON, n_allowed_edits=1)))
+        self.assertFalse(TrieLexiconMatcher.supports(LexiconMatcher(["(varas", "röövel)"])))
+        self.assertFalse(TrieLexiconMatcher.supports(LexiconMatcher([".*varas"])))
+        self.assertTrue(TrieLexiconMatcher.supports(LexiconMatcher(LEXICON)))
+
+
+    def test_literal_prefix(self):
+        self.assertEqual(get_literal_prefix("varas"), "varas")
+        self.assertEqual(get_literal_prefix("dr."), "dr")
+        self.assertEqual(get_literal_prefix("colou?r"), "colo")
+        self.assertEqual(get_literal_prefix(r"pea\s*(\S+\s+){,1}valutab"), "pea")
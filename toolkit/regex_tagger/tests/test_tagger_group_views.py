@@ -9,7 +9,7 @@ from rest_framework.test import APITransactionTestCase
 
 from texta_elastic.core import ElasticCore
 from toolkit.helper_functions import reindex_test_dataset
-from toolkit.regex_tagger.models import RegexTagger, RegexTaggerGroup
+from toolkit.regex_tagger.models import REGEX_TAGGER_GROUP_CACHE, RegexTagger, RegexTaggerGroup, load_matcher
 from toolkit.settings import TEXTA_TAGS_KEY
 from toolkit.test_settings import TEST_FIELD, TEST_INTEGER_FIELD, VERSION_NAMESPACE
 from toolkit.tools.utils_for_tests import create_test_user, print_output, project_creation
@@ -337,3 +337,41 @@ class RegexGroupTaggerTests(APITransactionTestCase):
         response = self.client.patch(tagger_group_url, payload, format="json")
         self.assertTrue(response.status_code == status.HTTP_200_OK)
         self.assertTrue(response.data["description"] == "hädaabi")
+
+
+    def test_matcher_bundle_is_cached_and_invalidated_on_tagger_edit(self):
+        tagger_group = RegexTaggerGroup.objects.get(pk=self.emergency_tagger_group_id)
+        bundle = tagger_group.load_cached_matcher_bundle()
+        self.assertTrue(tagger_group.load_cached_matcher_bundle() is bundle)
+        self.assertEqual(len(bundle), 3)
+
+        tag_text_url = reverse(f"{VERSION_NAMESPACE}:regex_tagger_group-tag-text", kwargs={"project_pk": self.project.pk, "pk": self.emergency_tagger_group_id})
+        response = self.client.post(tag_text_url, {"text": "Luure teatas, et staabis tekkis põleng."})
+        self.assertEqual([tag["str_val"] for tag in response.data["matches"]], ["tuletõrje"])
+
+        tagger_url = reverse(f"{VERSION_NAMESPACE}:regex_tagger-detail", kwargs={"project_pk": self.project.pk, "pk": self.police_id})
+        response = self.client.patch(tagger_url, {"lexicon": ["luure"]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(tagger_group.load_cached_matcher_bundle() is not bundle)
+
+        response = self.client.post(tag_text_url, {"text": "Luure teatas, et staabis tekkis põleng."})
+        print_output("test_matcher_bundle_is_cached_and_invalidated_on_tagger_edit:response.data", response.data)
+        self.assertEqual(sorted(tag["str_val"] for tag in response.data["matches"]), ["politsei", "tuletõrje"])
+
+        self.client.delete(reverse(f"{VERSION_NAMESPACE}:regex_tagger_group-detail", kwargs={"project_pk": self.project.pk, "pk": self.emergency_tagger_group_id}))
+        self.assertFalse(self.emergency_tagger_group_id in REGEX_TAGGER_GROUP_CACHE)
+
+
+    def test_compiled_matcher_returns_the_same_matches(self):
+        from texta_lexicon_matcher.lexicon_matcher import LexiconMatcher
+
+        tagger = RegexTagger.objects.get(pk=self.headache_id)
+        tagger.counter_lexicon = json.dumps(["ei"])
+        tagger.save()
+        lexicon = json.loads(tagger.lexicon)
+        matcher = LexiconMatcher(lexicon, counter_lexicon=["ei"], operator=tagger.operator, match_type=tagger.match_type, required_words=tagger.required_words, phrase_slop=tagger.phrase_slop,
+                                 counter_slop=tagger.counter_slop, n_allowed_edits=tagger.n_allowed_edits, return_fuzzy_match=tagger.return_fuzzy_match, ignore_case=tagger.ignore_case,
+                                 ignore_punctuation=tagger.ignore_punctuation)
+        compiled_matcher = load_matcher(tagger)
+        for text in ["Mul valutab pea ja on migreen.", "Peavalu ei ole, aga migreenid on.", "Midagi ei juhtunud."]:
+            self.assertEqual(compiled_matcher.get_matches(text), matcher.get_matches(text))
@@ -16,7 +16,7 @@ from toolkit.core.project.models import Project
 from toolkit.core.task.models import Task
 from toolkit.filter_constants import FavoriteFilter
 from toolkit.permissions.project_permissions import ProjectAccessInApplicationsAllowed
-from toolkit.regex_tagger.models import RegexTagger, RegexTaggerGroup
+from toolkit.regex_tagger.models import REGEX_TAGGER_GROUP_CACHE, RegexTagger, RegexTaggerGroup
 from toolkit.regex_tagger.serializers import (ApplyRegexTaggerGroupSerializer, ApplyRegexTaggerSerializer, RegexGroupTaggerTagTextSerializer, RegexMultitagTextSerializer, RegexTaggerGroupMultitagDocsSerializer, RegexTaggerGroupMultitagTextSerializer, RegexTaggerGroupSerializer,
                                               RegexTaggerGroupTagDocumentSerializer, RegexTaggerSerializer, RegexTaggerTagDocsSerializer, RegexTaggerTagTextsSerializer, TagRandomDocSerializer)
 from toolkit.serializer_constants import GeneralTextSerializer, ProjectResourceImportModelSerializer
@@ -66,11 +66,14 @@ class RegexTaggerViewSet(viewsets.ModelViewSet, BulkDelete, FavoriteModelViewMix
         # when just another field is updated.
         kwargs = {field: json.dumps(serializer.validated_data.get(field), ensure_ascii=False) for field in fields if field in serializer.validated_data}
         project = Project.objects.get(id=self.kwargs['project_pk'])
-        serializer.save(
+        regex_tagger: RegexTagger = serializer.save(
             author=self.request.user,
             project=project,
             **kwargs
         )
+        # Groups recompile their matchers on the next use.
+        for group_id in regex_tagger.regextaggergroup_set.values_list("pk", flat=True):
+            REGEX_TAGGER_GROUP_CACHE.invalidate(group_id)
 
 
     @action(detail=True, methods=['post'], serializer_class=RegexTaggerSerializer)
@@ -332,7 +335,8 @@ class RegexTaggerGroupViewSet(viewsets.ModelViewSet, BulkDelete, FavoriteModelVi
 
 
     def perform_update(self, serializer: RegexTaggerGroupSerializer):
-        serializer.save()
+        regex_tagger_group: RegexTaggerGroup = serializer.save()
+        REGEX_TAGGER_GROUP_CACHE.invalidate(regex_tagger_group.pk)
 
         if "regex_taggers" in serializer.validated_data:
             available_taggers = RegexTagger.objects.filter(project=self.kwargs['project_pk'])
@@ -399,17 +403,13 @@ class RegexTaggerGroupViewSet(viewsets.ModelViewSet, BulkDelete, FavoriteModelVi
         result = []
         for regex_tagger_group in regex_taggers_groups:
             tags = []
-            for regex_tagger in regex_tagger_group.regex_taggers.all():
-
-                matches = regex_tagger.match_texts([text], as_texta_facts=False)
-
-                if matches:
-                    new_tag = {
-                        "tagger_id": regex_tagger.id,
-                        "tag": regex_tagger.description,
-                        "matches": matches
-                    }
-                    tags.append(new_tag)
+            for tagger_id, description, matches in regex_tagger_group.load_cached_matcher_bundle().get_matches(text):
+                new_tag = {
+                    "tagger_id": tagger_id,
+                    "tag": description,
+                    "matches": matches
+                }
+                tags.append(new_tag)
             if tags:
                 new_tagger_group_tag = {
                     "tagger_group_id": regex_tagger_group.id,
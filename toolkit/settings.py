@@ -300,6 +300,12 @@ ES_CONNECTION_PARAMETERS = {
     "sniff_on_start": env.bool("TEXTA_ES_SNIFF_ON_START", default=True),
     "sniff_on_connection_fail": env.bool("TEXTA_ES_SNIFF_ON_FAIL", default=True)
 }
+# Number of concurrent analyze requests sent to Elasticsearch when stemming or tokenizing texts in batches.
+ES_ANALYZER_WORKERS = env.int("TEXTA_ES_ANALYZER_WORKERS", default=4)
+# Backend used for Snowball stemming and tokenization, either "elasticsearch" or "local" for the in-process NLTK stemmers.
+STEMMER_BACKEND = env.str("TEXTA_STEMMER_BACKEND", default="elasticsearch")
+# Number of classes scrolled concurrently when collecting the training data of Taggers, Torch and BERT Taggers.
+DATA_SAMPLE_WORKERS = env.int("TEXTA_DATA_SAMPLE_WORKERS", default=4)
 
 # CELERY
 
@@ -307,6 +313,34 @@ ES_CONNECTION_PARAMETERS = {
 # Consider that processed text might be the size of a simple comment
 # or a whole article.
 MLP_BATCH_SIZE = env.int("TEXTA_MLP_BATCH_SIZE", default=25)
+# Maximum number of sliced scrolls applying MLP on indices is split into, each slice is processed by a separate MLP worker.
+APPLY_MLP_MAX_SLICES = env.int("TEXTA_APPLY_MLP_MAX_SLICES", default=4)
+# Whether the slices applying MLP on indices scroll the sources of the processed fields instead of fetching the documents by their ID-s.
+MLP_SCROLL_SOURCES = env.bool("TEXTA_MLP_SCROLL_SOURCES", default=True)
+# How long concurrent mlp_texts and mlp_docs requests of a web process are gathered into a single MLP task in milliseconds
+# and the number of texts or documents after which the gathered batch is sent without waiting.
+MLP_MICRO_BATCH_WAIT_MS = env.int("TEXTA_MLP_MICRO_BATCH_WAIT_MS", default=10)
+MLP_MICRO_BATCH_MAX_ITEMS = env.int("TEXTA_MLP_MICRO_BATCH_MAX_ITEMS", default=100)
+# Maximum number of sliced scrolls that applying taggers, extractors and analyzers on indices is split into, each slice is processed by a separate Celery task.
+APPLY_TO_INDEX_MAX_SLICES = env.int("TEXTA_APPLY_TO_INDEX_MAX_SLICES", default=4)
+# Maximum number of scroll pages of a slice queued for the processes of the appliers that are applied in a process pool.
+APPLY_TO_INDEX_MAX_PENDING_BATCHES = env.int("TEXTA_APPLY_TO_INDEX_MAX_PENDING_BATCHES", default=8)
+# Number of processes the documents of every slice are matched in when applying Regex Taggers on indices, 0 matches them in the Celery task.
+REGEX_TAGGER_APPLY_PROCESSES = env.int("TEXTA_REGEX_TAGGER_APPLY_PROCESSES", default=0)
+# Maximum number of sliced scrolls language detection on indices is split into, each slice is processed by a separate MLP worker.
+APPLY_LANG_MAX_SLICES = env.int("TEXTA_APPLY_LANG_MAX_SLICES", default=4)
+# Number of documents scrolled and written into the file at once when exporting search results.
+SEARCH_EXPORT_SCROLL_SIZE = env.int("TEXTA_SEARCH_EXPORT_SCROLL_SIZE", default=1000)
+
+# Bounds of the per-process caches for loaded models, 0 disables the bound.
+TAGGER_CACHE_MAX_ENTRIES = env.int("TEXTA_TAGGER_CACHE_MAX_ENTRIES", default=50)
+TAGGER_CACHE_MAX_SIZE_MB = env.int("TEXTA_TAGGER_CACHE_MAX_SIZE_MB", default=2048)
+BERT_TAGGER_CACHE_MAX_ENTRIES = env.int("TEXTA_BERT_TAGGER_CACHE_MAX_ENTRIES", default=5)
+BERT_TAGGER_CACHE_MAX_SIZE_MB = env.int("TEXTA_BERT_TAGGER_CACHE_MAX_SIZE_MB", default=4096)
+TAGGER_GROUP_ENGINE_CACHE_MAX_ENTRIES = env.int("TEXTA_TAGGER_GROUP_ENGINE_CACHE_MAX_ENTRIES", default=10)
+TAGGER_GROUP_ENGINE_CACHE_MAX_SIZE_MB = env.int("TEXTA_TAGGER_GROUP_ENGINE_CACHE_MAX_SIZE_MB", default=2048)
+REGEX_TAGGER_GROUP_CACHE_MAX_ENTRIES = env.int("TEXTA_REGEX_TAGGER_GROUP_CACHE_MAX_ENTRIES", default=50)
+REGEX_TAGGER_TRIE_MIN_LEXICON_SIZE = env.int("TEXTA_REGEX_TAGGER_TRIE_MIN_LEXICON_SIZE", default=100)
 
 # By default, the DB with number 0 is used in Redis. Other applications or instances of TTK should avoid using the same DB number.
 BROKER_URL = env('TEXTA_REDIS_URL', default='redis://localhost:6379')
@@ -340,6 +374,8 @@ CELERYBEAT_SCHEDULE = {
         'options': {"queue": CELERY_DEFAULT_QUEUE}
     }
 }
+# How old the statistics of an index shown in the index listing may get before the index sync refreshes them.
+INDEX_STATS_REFRESH_INTERVAL_IN_MINUTES = env.int("TEXTA_INDEX_STATS_REFRESH_INTERVAL_IN_MINUTES", default=10)
 
 ### DATA DIRECTORIES
 
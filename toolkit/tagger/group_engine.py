@@ -0,0 +1,369 @@
+import logging
+from typing import Dict, Hashable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.special import expit
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.svm import SVC
+from texta_tagger.tagger import Tagger as TextTagger
+
+from toolkit.settings import INFO_LOGGER
+
+
+# Vectorizer parameters that define how the text is split into features.
+# Taggers with equal parameters share a single counting pass over the text.
+ANALYZER_PARAMS = ("input", "encoding", "decode_error", "strip_accents", "lowercase", "preprocessor", "tokenizer", "stop_words", "token_pattern", "ngram_range", "analyzer", "binary")
+# Rough size of a single vocabulary entry in memory, used for estimating the size of the engine.
+VOCABULARY_ENTRY_BYTES = 100
+# Minimum probability used by libsvm for pairwise probabilities.
+LIBSVM_MIN_PROBABILITY = 1e-7
+
+
+def _hashable(value):
+    if isinstance(value, (list, set)):
+        return tuple(value)
+    return value
+
+
+def _get_field_layout(vectorizer) -> Optional[dict]:
+    """Describes how the vectorizer weights the counted features or returns None if the vectorizer can not be compiled."""
+    params = vectorizer.get_params()
+    spec = tuple((param, _hashable(params[param])) for param in ANALYZER_PARAMS)
+    # Subclass of CountVectorizer, hence checked first.
+    if isinstance(vectorizer, TfidfVectorizer):
+        if vectorizer.sublinear_tf or vectorizer.norm not in (None, "l2"):
+            return None
+        idf = vectorizer.idf_ if vectorizer.use_idf else np.ones(len(vectorizer.vocabulary_))
+        return {"kind": "vocabulary", "spec": spec, "vocabulary": vectorizer.vocabulary_, "size": len(vectorizer.vocabulary_), "idf": idf, "norm": vectorizer.norm}
+    if isinstance(vectorizer, CountVectorizer):
+        return {"kind": "vocabulary", "spec": spec, "vocabulary": vectorizer.vocabulary_, "size": len(vectorizer.vocabulary_), "idf": np.ones(len(vectorizer.vocabulary_)), "norm": None}
+    if isinstance(vectorizer, HashingVectorizer):
+        if vectorizer.norm not in (None, "l2"):
+            return None
+        # All hashed features take part in the norm, so the norm is shared by the taggers and has to be a part of the spec.
+        spec += (("n_features", vectorizer.n_features), ("alternate_sign", vectorizer.alternate_sign), ("norm", vectorizer.norm))
+        return {"kind": "hashing", "spec": spec, "size": vectorizer.n_features, "norm": vectorizer.norm}
+    return None
+
+
+def _get_linear_layout(model) -> Optional[dict]:
+    """
+    Extracts the linear form of a binary tagger pipeline (union -> feature_selector -> classifier).
+    Returns None if the pipeline can not be expressed as a single linear function of the counted features.
+    """
+    classifier = model.named_steps["classifier"]
+    union = model.named_steps["union"]
+    if len(classifier.classes_) != 2 or union.transformer_weights:
+        return None
+    if isinstance(classifier, SVC):
+        if classifier.kernel != "linear" or not classifier.probability:
+            return None
+        probability_params = (float(classifier.probA_[0]), float(classifier.probB_[0]))
+    elif isinstance(classifier, LogisticRegression):
+        if getattr(classifier, "multi_class", "auto") == "multinomial":
+            return None
+        probability_params = None
+    else:
+        return None
+
+    coef = classifier.coef_
+    coef = coef.toarray() if sparse.issparse(coef) else np.asarray(coef)
+    coef = coef.ravel()
+    # Classifier coefficients are defined over the features left in by the feature selector.
+    feature_selector = model.named_steps.get("feature_selector", None)
+    if hasattr(feature_selector, "get_support"):
+        support = feature_selector.get_support()
+        full_coef = np.zeros(len(support))
+        full_coef[support] = coef
+    else:
+        full_coef = coef
+
+    fields = []
+    offset = 0
+    for pipe_key, field_pipeline in union.transformer_list:
+        field_layout = _get_field_layout(field_pipeline.named_steps["vectorizer"])
+        if field_layout is None:
+            return None
+        field_layout["field"] = pipe_key[len("pipe_"):]
+        field_layout["coef"] = full_coef[offset:offset + field_layout["size"]]
+        offset += field_layout["size"]
+        fields.append(field_layout)
+
+    if offset != len(full_coef):
+        return None
+
+    return {
+        "classes": list(classifier.classes_),
+        "intercept": float(np.ravel(classifier.intercept_)[0]),
+        "probability_params": probability_params,
+        "fields": fields
+    }
+
+
+def _libsvm_binary_probability(decisions: np.ndarray, prob_a: np.ndarray, prob_b: np.ndarray) -> np.ndarray:
+    """
+    Vectorized libsvm Platt scaling for binary SVC, returns the probability of the first class.
+    For two classes libsvm still runs the iterative pairwise coupling of multiclass_probability
+    which stops early, so it is replicated step by step to keep the probabilities equal to SVC.predict_proba.
+    """
+    r01 = np.clip(1.0 / (1.0 + np.exp(-prob_a * decisions + prob_b)), LIBSVM_MIN_PROBABILITY, 1 - LIBSVM_MIN_PROBABILITY)
+    r10 = 1 - r01
+    q = np.array([[r10 * r10, -r10 * r01], [-r10 * r01, r01 * r01]])
+    p = np.full((2,) + decisions.shape, 0.5)
+    active = np.ones(decisions.shape, dtype=bool)
+    for _ in range(100):
+        qp = np.array([q[0][0] * p[0] + q[0][1] * p[1], q[1][0] * p[0] + q[1][1] * p[1]])
+        pqp = p[0] * qp[0] + p[1] * qp[1]
+        max_error = np.maximum(np.abs(qp[0] - pqp), np.abs(qp[1] - pqp))
+        active &= max_error >= 0.005 / 2
+        if not active.any():
+            break
+        for t in range(2):
+            diff = np.where(active, (-qp[t] + pqp) / q[t][t], 0.0)
+            p[t] = p[t] + diff
+            pqp = (pqp + diff * (diff * q[t][t] + 2 * qp[t])) / (1 + diff) / (1 + diff)
+            qp = np.array([(qp[j] + diff * q[t][j]) / (1 + diff) for j in range(2)])
+            p = p / (1 + diff)
+    return p[0]
+
+
+class _LinearBlock:
+    """
+    Binary linear taggers sharing the text processor and the vectorizer spec of every field.
+    Counted features of each field are weighted with the idf and coefficients of all the taggers at once,
+    so the decision values of the whole block are computed with a single sparse matrix product per field.
+    """
+
+
+    def __init__(self, processor_key: Hashable, members: List[dict]):
+        self.processor_key = processor_key
+        self.tagger_ids = [member["tagger_id"] for member in members]
+        self.descriptions = [member["description"] for member in members]
+        self.negative_labels = [member["layout"]["classes"][0] for member in members]
+        self.positive_labels = [member["layout"]["classes"][1] for member in members]
+        self.intercepts = np.array([member["layout"]["intercept"] for member in members])
+        self.is_svc = np.array([member["layout"]["probability_params"] is not None for member in members])
+        self.prob_a = np.array([(member["layout"]["probability_params"] or (0, 0))[0] for member in members])
+        self.prob_b = np.array([(member["layout"]["probability_params"] or (0, 0))[1] for member in members])
+        self.fields = [self._compile_field([member["layout"]["fields"][i] for member in members]) for i in range(len(members[0]["layout"]["fields"]))]
+
+
+    @staticmethod
+    def _compile_field(member_fields: List[dict]) -> dict:
+        first = member_fields[0]
+        params = dict(first["spec"][:len(ANALYZER_PARAMS)])
+        n_members = len(member_fields)
+
+        if first["kind"] == "hashing":
+            counter = HashingVectorizer(**params, n_features=first["size"], alternate_sign=dict(first["spec"])["alternate_sign"], norm=None, dtype=np.float64)
+            rows, columns, values = [], [], []
+            for column, member_field in enumerate(member_fields):
+                features = np.flatnonzero(member_field["coef"])
+                rows.append(features)
+                columns.append(np.full(len(features), column))
+                values.append(member_field["coef"][features])
+            weights = sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(columns))), shape=(first["size"], n_members))
+            return {"field": first["field"], "counter": counter, "weights": weights, "norms": None, "shared_norm": first["norm"] == "l2", "vocabulary_size": 0}
+
+        vocabulary = {}
+        weight_rows, weight_columns, weight_values = [], [], []
+        norm_rows, norm_columns, norm_values = [], [], []
+        for column, member_field in enumerate(member_fields):
+            # Map the features of the tagger to the shared vocabulary.
+            feature_indices = np.fromiter(member_field["vocabulary"].values(), dtype=np.int64, count=len(member_field["vocabulary"]))
+            shared_indices = np.fromiter((vocabulary.setdefault(term, len(vocabulary)) for term in member_field["vocabulary"]), dtype=np.int64, count=len(member_field["vocabulary"]))
+            idf = member_field["idf"][feature_indices]
+            coef = member_field["coef"][feature_indices]
+            selected = coef != 0
+            weight_rows.append(shared_indices[selected])
+            weight_columns.append(np.full(selected.sum(), column))
+            weight_values.append(idf[selected] * coef[selected])
+            # Norm of the tf-idf vector is computed over the whole vocabulary of the tagger.
+            if member_field["norm"] == "l2":
+                norm_rows.append(shared_indices)
+                norm_columns.append(np.full(len(shared_indices), column))
+                norm_values.append(idf ** 2)
+
+        shape = (len(vocabulary), n_members)
+        weights = sparse.csr_matrix((np.concatenate(weight_values), (np.concatenate(weight_rows), np.concatenate(weight_columns))), shape=shape)
+        norms = None
+        if norm_values:
+            norms = sparse.csr_matrix((np.concatenate(norm_values), (np.concatenate(norm_rows), np.concatenate(norm_columns))), shape=shape)
+        counter = CountVectorizer(**params, vocabulary=vocabulary, dtype=np.float64)
+        return {"field": first["field"], "counter": counter, "weights": weights, "norms": norms, "shared_norm": False, "vocabulary_size": len(vocabulary)}
+
+
+    @property
+    def size_mb(self) -> float:
+        size = 0
+        for field in self.fields:
+            for matrix in (field["weights"], field["norms"]):
+                if matrix is not None:
+                    size += matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+            size += field["vocabulary_size"] * VOCABULARY_ENTRY_BYTES
+        return size / 1024 ** 2
+
+
+    def decision_function(self, processed: Dict[str, List[str]]) -> np.ndarray:
+        n_texts = len(next(iter(processed.values())))
+        decisions = np.tile(self.intercepts, (n_texts, 1))
+        for field in self.fields:
+            counts = field["counter"].transform(processed[field["field"]])
+            scores = (counts @ field["weights"]).toarray()
+            squared_counts = counts.multiply(counts)
+            if field["norms"] is not None:
+                norms = np.sqrt((squared_counts @ field["norms"]).toarray())
+            elif field["shared_norm"]:
+                norms = np.sqrt(np.asarray(squared_counts.sum(axis=1)))
+            else:
+                norms = np.ones((n_texts, 1))
+            norms[norms == 0] = 1
+            decisions += scores / norms
+        return decisions
+
+
+    def predict(self, processed: Dict[str, List[str]]) -> List[List[tuple]]:
+        """Returns a (label, probability) tuple for every tagger in the block and every text."""
+        decisions = self.decision_function(processed)
+        positive_probabilities = expit(decisions)
+        if self.is_svc.any():
+            svc_probabilities = 1 - _libsvm_binary_probability(decisions[:, self.is_svc], self.prob_a[self.is_svc], self.prob_b[self.is_svc])
+            positive_probabilities[:, self.is_svc] = svc_probabilities
+        probabilities = np.maximum(positive_probabilities, 1 - positive_probabilities)
+        predictions = []
+        for text_decisions, text_probabilities in zip(decisions, probabilities):
+            labels = [positive if decision > 0 else negative for decision, positive, negative in zip(text_decisions, self.positive_labels, self.negative_labels)]
+            predictions.append(list(zip(labels, text_probabilities)))
+        return predictions
+
+
+class TaggerGroupEngine:
+    """
+    Multi-label inference engine for the taggers of a Tagger Group.
+
+    Taggers are compiled into blocks of binary linear models sharing the text processor and
+    the vectorizer parameters. Each text is processed once per block and all the tags of a block
+    are scored with a single sparse matrix product. Taggers that can not be compiled
+    (multiclass taggers, non-linear kernels) are applied with their own pipelines.
+    Predictions are identical to the ones of Tagger.apply_loaded_tagger.
+    """
+
+
+    def __init__(self):
+        self.blocks: List[_LinearBlock] = []
+        self.fallback_taggers: Dict[int, TextTagger] = {}
+        self.text_processors = {}
+        self.tagger_processor_keys = {}
+        self.descriptions = {}
+        self._members = {}
+        self._fallback_size_mb = 0
+
+
+    def add_tagger(self, tagger_id: int, tagger: TextTagger, processor_key: Hashable, size_mb: float = 0):
+        """
+        Adds a loaded tagger to the engine, compile has to be called after all the taggers have been added.
+        :param tagger_id: ID of the Tagger object.
+        :param tagger: Loaded tagger.
+        :param processor_key: Key of the text processor settings, taggers with equal keys share the text processing.
+        :param size_mb: Estimated size of the tagger, used when it can not be compiled and is kept in memory.
+        """
+        self.text_processors.setdefault(processor_key, tagger.text_processor)
+        self.tagger_processor_keys[tagger_id] = processor_key
+        self.descriptions[tagger_id] = tagger.description
+        layout = _get_linear_layout(tagger.model)
+        if layout is None:
+            self.fallback_taggers[tagger_id] = tagger
+            self._fallback_size_mb += size_mb
+            return
+        block_key = (processor_key, tuple((field["field"], field["kind"], field["spec"]) for field in layout["fields"]))
+        self._members.setdefault(block_key, []).append({"tagger_id": tagger_id, "description": tagger.description, "layout": layout})
+
+
+    def compile(self):
+        self.blocks = [_LinearBlock(block_key[0], members) for block_key, members in self._members.items()]
+        self._members = {}
+        n_compiled = sum(len(block.tagger_ids) for block in self.blocks)
+        logging.getLogger(INFO_LOGGER).info(
+            f"[Tagger Group Engine] Compiled {n_compiled} taggers into {len(self.blocks)} blocks, {len(self.fallback_taggers)} taggers are applied separately.")
+
+
+    @property
+    def size_mb(self) -> float:
+        return sum(block.size_mb for block in self.blocks) + self._fallback_size_mb
+
+
+    def get_text_processor(self, tagger_id: int):
+        return self.text_processors[self.tagger_processor_keys[tagger_id]]
+
+
+    def _get_processed(self, processor_key: Hashable, contents: List[Union[str, dict]], content_indices: List[int], fields: List[str], input_type: str,
+                       processed_texts: Dict[Hashable, dict]) -> Dict[str, List[str]]:
+        """Processes the contents like TextTagger.tag_text and tag_doc, processed texts are shared between the blocks."""
+        text_processor = self.text_processors[processor_key]
+        if input_type == "doc":
+            return {
+                field: [text_processor.process(contents[i][field]) if field in contents[i] else "" for i in content_indices]
+                for field in fields
+            }
+        cache = processed_texts.setdefault(processor_key, {})
+        for i in content_indices:
+            if i not in cache:
+                cache[i] = text_processor.process(contents[i])
+        texts = [cache[i] for i in content_indices]
+        return {field: texts for field in fields}
+
+
+    def tag(self, contents: List[Union[str, dict]], input_type: str = "text", candidates: Optional[List[List[str]]] = None) -> List[List[dict]]:
+        """
+        Applies the taggers on a batch of texts or documents.
+        :param contents: Texts or documents to tag.
+        :param input_type: Either 'text' or 'doc'.
+        :param candidates: Descriptions of the taggers to apply on each content, all the taggers are applied if not given.
+        :return: Predictions of the applied taggers in the form of Tagger.apply_loaded_tagger for each content.
+        """
+        if candidates is not None:
+            candidates = [{candidate.lower() for candidate in content_candidates} for content_candidates in candidates]
+
+        def is_applied(tagger_id: int, content_index: int) -> bool:
+            return candidates is None or self.descriptions[tagger_id].lower() in candidates[content_index]
+
+        results = [[] for _ in contents]
+        processed_texts = {}
+        for block in self.blocks:
+            content_indices = [i for i in range(len(contents)) if any(is_applied(tagger_id, i) for tagger_id in block.tagger_ids)]
+            if not content_indices:
+                continue
+            fields = [field["field"] for field in block.fields]
+            processed = self._get_processed(block.processor_key, contents, content_indices, fields, input_type, processed_texts)
+            for content_index, predictions in zip(content_indices, block.predict(processed)):
+                for tagger_id, description, (label, probability) in zip(block.tagger_ids, block.descriptions, predictions):
+                    if is_applied(tagger_id, content_index):
+                        results[content_index].append(self._to_prediction(tagger_id, description, label, probability))
+
+        for tagger_id, tagger in self.fallback_taggers.items():
+            content_indices = [i for i in range(len(contents)) if is_applied(tagger_id, i)]
+            if not content_indices:
+                continue
+            fields = tagger.get_fields_from_model()
+            processed = self._get_processed(self.tagger_processor_keys[tagger_id], contents, content_indices, fields, input_type, processed_texts)
+            df_texts = pd.DataFrame(processed)
+            labels = tagger.model.predict(df_texts)
+            probabilities = tagger.model.predict_proba(df_texts).max(axis=1)
+            for content_index, label, probability in zip(content_indices, labels, probabilities):
+                results[content_index].append(self._to_prediction(tagger_id, tagger.description, label, probability))
+
+        return results
+
+
+    @staticmethod
+    def _to_prediction(tagger_id: int, description: str, label: str, probability: float) -> dict:
+        # Same output as Tagger._to_prediction.
+        return {
+            'tag': description if label in {"true", "false"} else label,
+            'probability': probability,
+            'tagger_id': tagger_id,
+            'result': False if label == "false" else True
+        }
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tagger', '0032_reformat_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tagger',
+            name='stemmer_backend',
+            field=models.CharField(choices=[('elasticsearch', 'elasticsearch'), ('local', 'local')], default='elasticsearch', max_length=1000),
+        ),
+    ]
@@ -8,6 +8,7 @@ import tempfile
 import zipfile
 from typing import Dict, List, Union
 
+import pandas as pd
 from celery import chain, group
 from django.contrib.auth.models import User
 from django.core import serializers
@@ -22,15 +23,23 @@ from toolkit.constants import MAX_DESC_LEN
 from toolkit.core.lexicon.models import Lexicon
 from toolkit.core.project.models import Project
 from toolkit.core.task.models import Task
-from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, get_snowball_choices
+from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, STEMMER_BACKEND_CHOICES, STEMMER_BACKEND_ELASTIC, get_snowball_choices
 from toolkit.elastic.index.models import Index
 from toolkit.elastic.tools.feedback import Feedback
 from toolkit.embedding.models import Embedding
 from toolkit.helper_functions import load_stop_words
 from toolkit.model_constants import CommonModelMixin, FavoriteModelMixin
-from toolkit.settings import BASE_DIR, CELERY_LONG_TERM_TASK_QUEUE, INFO_LOGGER, RELATIVE_MODELS_PATH
+from toolkit.settings import (BASE_DIR, CELERY_LONG_TERM_TASK_QUEUE, INFO_LOGGER, RELATIVE_MODELS_PATH, TAGGER_CACHE_MAX_ENTRIES, TAGGER_CACHE_MAX_SIZE_MB,
+                              TAGGER_GROUP_ENGINE_CACHE_MAX_ENTRIES, TAGGER_GROUP_ENGINE_CACHE_MAX_SIZE_MB)
 from toolkit.tagger import choices
-from toolkit.tools.lemmatizer import CeleryLemmatizer, ElasticAnalyzer
+from toolkit.tagger.group_engine import TaggerGroupEngine
+from toolkit.tools.lemmatizer import CeleryLemmatizer, get_analyzer
+from toolkit.tools.model_cache import ModelCache
+
+
+# Global object for the process so tagger models won't get reloaded from disk on each prediction.
+TAGGER_CACHE = ModelCache("Tagger Cache", max_entries=TAGGER_CACHE_MAX_ENTRIES, max_size_mb=TAGGER_CACHE_MAX_SIZE_MB)
+TAGGER_GROUP_ENGINE_CACHE = ModelCache("Tagger Group Engine Cache", max_entries=TAGGER_GROUP_ENGINE_CACHE_MAX_ENTRIES, max_size_mb=TAGGER_GROUP_ENGINE_CACHE_MAX_SIZE_MB)
 
 
 class Tagger(FavoriteModelMixin, CommonModelMixin):
@@ -53,6 +62,7 @@ class Tagger(FavoriteModelMixin, CommonModelMixin):
     minimum_sample_size = models.IntegerField(default=choices.DEFAULT_MIN_SAMPLE_SIZE, blank=True)
     score_threshold = models.FloatField(default=choices.DEFAULT_SCORE_THRESHOLD, blank=True)
     snowball_language = models.CharField(choices=get_snowball_choices(), default=DEFAULT_SNOWBALL_LANGUAGE, null=True, max_length=MAX_DESC_LEN)
+    stemmer_backend = models.CharField(choices=STEMMER_BACKEND_CHOICES, default=STEMMER_BACKEND_ELASTIC, max_length=MAX_DESC_LEN)
     detect_lang = models.BooleanField(default=False)
     precision = models.FloatField(default=None, null=True)
     recall = models.FloatField(default=None, null=True)
@@ -195,7 +205,7 @@ class Tagger(FavoriteModelMixin, CommonModelMixin):
         #    logging.getLogger(INFO_LOGGER).info(f"Loading tagger with ID: {tagger_id} with params (lemmatize: {lemmatize})")
         # get lemmatizer/stemmer
         if self.snowball_language:
-            lemmatizer = ElasticAnalyzer(language=self.snowball_language)
+            lemmatizer = get_analyzer(language=self.snowball_language, backend=self.stemmer_backend)
         elif lemmatize:
             lemmatizer = CeleryLemmatizer()
         else:
@@ -216,6 +226,16 @@ class Tagger(FavoriteModelMixin, CommonModelMixin):
             return None
         return tagger
 
+    def load_cached_tagger(self, lemmatize: bool = False):
+        """
+        Loading tagger model from the process cache, falls back to the disc.
+        Name of the model file changes on every retrain, hence it is used as the version of the cached model
+        together with the description, which is the tag of binary taggers, and the fields that are used for building the text processor.
+        """
+        version = (self.model.name, self.description, self.stop_words, self.snowball_language, self.stemmer_backend, self.embedding_id)
+        size = ModelCache.get_file_size_mb(self.model.path) if self.model else 0
+        return TAGGER_CACHE.get((self.pk, lemmatize), version, lambda: self.load_tagger(lemmatize=lemmatize), size_mb=size)
+
     def apply_loaded_tagger(self, tagger: TextTagger, content: Union[str, Dict[str, str]], input_type: str = "text", feedback: bool = False):
         """Applying loaded tagger."""
         # check input type
@@ -223,28 +243,55 @@ class Tagger(FavoriteModelMixin, CommonModelMixin):
             tagger_result = tagger.tag_doc(content)
         else:
             tagger_result = tagger.tag_text(content)
+        prediction = self._to_prediction(tagger, tagger_result["prediction"], tagger_result["probability"])
+        # add feedback if asked
+        if feedback:
+            prediction = self.add_feedback(tagger.text_processor.process(content), prediction)
+        return prediction
+
+    def add_feedback(self, processed_text: str, prediction: dict) -> dict:
+        """Stores the prediction for feedback and adds the feedback info to it."""
+        logging.getLogger(INFO_LOGGER).info(f"Adding feedback for Tagger id: {self.pk}")
+        project_pk = self.project.pk
+        feedback_object = Feedback(project_pk, model_object=self)
+        feedback_id = feedback_object.store(processed_text, prediction)
+        feedback_url = f'/projects/{project_pk}/taggers/{self.pk}/feedback/'
+        prediction['feedback'] = {'id': feedback_id, 'url': feedback_url}
+        return prediction
+
+    def apply_loaded_tagger_on_texts(self, tagger: TextTagger, texts: List[str]) -> List[dict]:
+        """
+        Applying loaded tagger on a batch of texts.
+        Texts are vectorized and classified in a single pass instead of one by one,
+        predictions are returned in the order of the input texts.
+        """
+        if not texts:
+            return []
+        # retrieve field names from the model, every field gets the same text just like in TextTagger.tag_text
+        field_features = tagger.get_fields_from_model()
+        # Lemmatize the whole batch with a single MLP task per batch instead of a task per text,
+        # the text processor strips the texts before lemmatizing them.
+        if isinstance(tagger.text_processor.lemmatizer, CeleryLemmatizer):
+            tagger.text_processor.lemmatizer.lemmatize_texts([text.strip() for text in texts if text.strip()])
+        processed_texts = [tagger.text_processor.process(text) for text in texts]
+        df_texts = pd.DataFrame({feature_name: processed_texts for feature_name in field_features})
+        labels = tagger.model.predict(df_texts)
+        probabilities = tagger.model.predict_proba(df_texts).max(axis=1)
+        return [self._to_prediction(tagger, label, probability) for label, probability in zip(labels, probabilities)]
+
+    def _to_prediction(self, tagger: TextTagger, label: str, probability: float) -> dict:
         # Result is false if binary tagger's prediction is false, but true otherwise
         # (for multiclass, the result is always true as one of the classes is always predicted)
-        result = False if tagger_result["prediction"] == "false" else True
+        result = False if label == "false" else True
         # Use tagger description as tag for binary taggers and tagger prediction as tag for multiclass taggers
-        tag = tagger.description if tagger_result["prediction"] in {"true", "false"} else tagger_result["prediction"]
+        tag = tagger.description if label in {"true", "false"} else label
         # create output dict
-        prediction = {
+        return {
             'tag': tag,
-            'probability': tagger_result['probability'],
+            'probability': probability,
             'tagger_id': self.pk,
             'result': result
         }
-        # add feedback if asked
-        if feedback:
-            logging.getLogger(INFO_LOGGER).info(f"Adding feedback for Tagger id: {self.pk}")
-            project_pk = self.project.pk
-            feedback_object = Feedback(project_pk, model_object=self)
-            processed_text = tagger.text_processor.process(content)
-            feedback_id = feedback_object.store(processed_text, prediction)
-            feedback_url = f'/projects/{project_pk}/taggers/{self.pk}/feedback/'
-            prediction['feedback'] = {'id': feedback_id, 'url': feedback_url}
-        return prediction
 
 
 @receiver(models.signals.post_delete, sender=Tagger)
@@ -254,6 +301,8 @@ def auto_delete_file_on_delete(sender, instance: Tagger, **kwargs):
     Triggered on individual-queryset Tagger deletion and the deletion
     of a TaggerGroup.
     """
+    TAGGER_CACHE.invalidate(instance.pk)
+
     if instance.plot:
         if os.path.isfile(instance.plot.path):
             os.remove(instance.plot.path)
@@ -297,6 +346,37 @@ class TaggerGroup(FavoriteModelMixin, CommonModelMixin):
         tagger_ids = [tagger.pk for tagger in self.taggers.all()]
         self.train(tagger_ids=tagger_ids)
 
+    def load_engine(self, lemmatize: bool = False) -> TaggerGroupEngine:
+        """Compiles the completed taggers of the group into a single inference engine."""
+        engine = TaggerGroupEngine()
+        for tagger_object in self.taggers.all():
+            if tagger_object.tasks.last().status != Task.STATUS_COMPLETED:
+                continue
+            tagger = tagger_object.load_tagger(lemmatize=lemmatize)
+            # Taggers with the same stop words, stemmer and phraser share the text processing.
+            processor_key = (tagger_object.stop_words, tagger_object.snowball_language, tagger_object.stemmer_backend, tagger_object.embedding_id)
+            engine.add_tagger(tagger_object.pk, tagger, processor_key, size_mb=ModelCache.get_file_size_mb(tagger_object.model.path))
+        engine.compile()
+        return engine
+
+    def get_engine_version(self) -> tuple:
+        """
+        Version of the compiled engine, which changes with anything the engine is built from:
+        the model files of the taggers, which change on every retrain, their descriptions, which are matched and returned as tags,
+        the fields of their text processing and their statuses.
+        """
+        version = []
+        for tagger_object in self.taggers.order_by("pk").prefetch_related("tasks"):
+            last_task = max(tagger_object.tasks.all(), key=lambda task: task.pk, default=None)
+            status = last_task.status if last_task else None
+            version.append((tagger_object.pk, tagger_object.model.name, tagger_object.description, tagger_object.stop_words, tagger_object.snowball_language, tagger_object.stemmer_backend, tagger_object.embedding_id, status))
+        return tuple(version)
+
+    def load_cached_engine(self, lemmatize: bool = False) -> TaggerGroupEngine:
+        """Loading the compiled engine from the process cache, falls back to compiling it."""
+        version = self.get_engine_version()
+        return TAGGER_GROUP_ENGINE_CACHE.get((self.pk, lemmatize), version, lambda: self.load_engine(lemmatize=lemmatize), size_mb=lambda engine: engine.size_mb)
+
     def export_resources(self) -> HttpResponse:
         with tempfile.SpooledTemporaryFile(encoding="utf8") as tmp:
             with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as archive:
@@ -404,4 +484,5 @@ def auto_delete_taggers_of_taggergroup(sender, instance: TaggerGroup, **kwargs):
     Delete all the Taggers associated to the TaggerGroup before deletion
     to enforce a one-to-many behaviour. Triggered before the actual deletion.
     """
+    TAGGER_GROUP_ENGINE_CACHE.invalidate(instance.pk)
     instance.taggers.all().delete()
@@ -9,7 +9,7 @@ from texta_elastic.searcher import EMPTY_QUERY
 
 from toolkit.core.task.models import Task
 from toolkit.core.user_profile.serializers import UserSerializer
-from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, get_snowball_choices
+from toolkit.elastic.choices import DEFAULT_SNOWBALL_LANGUAGE, DEFAULT_STEMMER_BACKEND, STEMMER_BACKEND_CHOICES, get_snowball_choices
 from toolkit.embedding.models import Embedding
 from toolkit.helper_functions import load_stop_words
 from toolkit.serializer_constants import (CommonModelSerializerMixin, ElasticScrollMixIn, FavoriteModelSerializerMixin, FieldParseSerializer, IndicesSerializerMixin, ProjectFilteredPrimaryKeyRelatedField, ProjectResourceUrlSerializer)
@@ -136,6 +136,7 @@ class TaggerSerializer(FieldParseSerializer, serializers.ModelSerializer, Indice
     score_threshold = serializers.FloatField(default=choices.DEFAULT_SCORE_THRESHOLD,
                                              help_text=f'Elasticsearch score threshold for filtering out irrelevant examples. All examples below first document\'s score * score threshold are ignored. Float between 0 and 1. Default: {choices.DEFAULT_SCORE_THRESHOLD}')
     snowball_language = serializers.ChoiceField(choices=get_snowball_choices(), default=DEFAULT_SNOWBALL_LANGUAGE, help_text=f'Uses Snowball stemmer with specified language to normalize the texts. Default: {DEFAULT_SNOWBALL_LANGUAGE}')
+    stemmer_backend = serializers.ChoiceField(choices=STEMMER_BACKEND_CHOICES, default=DEFAULT_STEMMER_BACKEND, help_text=f'Whether to stem the texts with Elasticsearch or locally with NLTK, the same backend is used for tagging. Default: {DEFAULT_STEMMER_BACKEND}')
     scoring_function = serializers.ChoiceField(choices=choices.DEFAULT_SCORING_OPTIONS, default=choices.DEFAULT_SCORING_FUNCTION, required=False, help_text=f'Scoring function used while evaluating the results on dev set. Default: {choices.DEFAULT_SCORING_FUNCTION}')
     stop_words = serializers.ListField(child=serializers.CharField(), default=[], required=False, help_text='Stop words to add. Default = [].', write_only=True)
     ignore_numbers = serializers.BooleanField(default=choices.DEFAULT_IGNORE_NUMBERS, required=False, help_text='If enabled, ignore all numbers as possible features.')
@@ -155,7 +156,7 @@ class TaggerSerializer(FieldParseSerializer, serializers.ModelSerializer, Indice
     class Meta:
         model = Tagger
         fields = ('id', 'url', 'author', 'description', 'query', 'fact_name', 'indices', 'fields', 'detect_lang', 'embedding', 'vectorizer', 'analyzer', 'classifier', 'stop_words',
-                  'maximum_sample_size', 'minimum_sample_size', 'is_favorited', 'score_threshold', 'negative_multiplier', 'precision', 'recall', 'f1_score', 'snowball_language', 'scoring_function',
+                  'maximum_sample_size', 'minimum_sample_size', 'is_favorited', 'score_threshold', 'negative_multiplier', 'precision', 'recall', 'f1_score', 'snowball_language', 'stemmer_backend', 'scoring_function',
                   'num_features', 'num_examples', 'confusion_matrix', 'is_favorited', 'plot', 'tasks', 'tagger_groups', 'ignore_numbers', 'balance', 'balance_to_max_limit', 'pos_label', 'classes')
         read_only_fields = ('precision', 'recall', 'f1_score', 'num_features', 'num_examples', 'tagger_groups', 'confusion_matrix', 'classes')
         fields_to_parse = ('fields', 'classes',)
@@ -262,6 +263,7 @@ class TaggerGroupSerializer(serializers.ModelSerializer, ProjectResourceUrlSeria
                 'maximum_sample_size': first_tagger.maximum_sample_size,
                 'negative_multiplier': first_tagger.negative_multiplier,
                 'snowball_language': first_tagger.snowball_language,
+                'stemmer_backend': first_tagger.stemmer_backend,
                 'embedding': self._embedding_details(first_tagger),
                 'indices': first_tagger.get_indices(),
                 'vectorizer': first_tagger.vectorizer,
@@ -8,9 +8,7 @@ from typing import Dict, List, Union
 from celery import group, chain
 from celery.decorators import task
 from celery.result import allow_join_result
-from elasticsearch.helpers import streaming_bulk
 from texta_elastic.core import ElasticCore
-from texta_elastic.document import ElasticDocument
 from texta_elastic.query import Query
 from texta_elastic.searcher import ElasticSearcher
 from texta_embedding.embedding import W2VEmbedding
@@ -18,12 +16,15 @@ from texta_tagger.tagger import Tagger as TextTagger
 
 from toolkit.base_tasks import BaseTask, TransactionAwareTask
 from toolkit.core.task.models import Task
+from toolkit.elastic.tools.apply_to_index import index_applier
 from toolkit.elastic.tools.data_sample import DataSample
+from toolkit.elastic.tools.tasks import apply_to_index
 from toolkit.embedding.models import Embedding
 from toolkit.helper_functions import add_finite_url_to_feedback, get_indices_from_object, load_stop_words
 from toolkit.mlp.tasks import apply_mlp_on_list
 from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, CELERY_MLP_TASK_QUEUE, CELERY_SHORT_TERM_TASK_QUEUE, ERROR_LOGGER, INFO_LOGGER, MEDIA_URL
-from toolkit.tagger.models import Tagger, TaggerGroup
+from toolkit.tagger.group_engine import TaggerGroupEngine
+from toolkit.tagger.models import TAGGER_CACHE, Tagger, TaggerGroup
 from toolkit.tools.plots import create_tagger_plot
 from toolkit.tools.show_progress import ShowProgress
 
@@ -166,6 +167,7 @@ def train_tagger_task(tagger_id: int):
             field_data=field_data,
             show_progress=show_progress,
             snowball_language=tagger_object.snowball_language,
+            stemmer_backend=tagger_object.stemmer_backend,
             detect_lang=tagger_object.detect_lang,
             balance=tagger_object.balance,
             balance_to_max_limit=tagger_object.balance_to_max_limit
@@ -251,6 +253,9 @@ def save_tagger_results(result_data: dict):
         tagger_object.save()
         task_object.complete()
 
+        # Drop the previous model from the cache of this process, other processes notice the new model name.
+        TAGGER_CACHE.invalidate(tagger_id)
+
         # Cleanup after the transaction to ensure integrity database records.
         if model_path and model_path.exists():
             model_path.unlink(missing_ok=True)
@@ -286,23 +291,53 @@ def get_mlp(tagger_group_id: int, text: str, lemmatize: bool = False, use_ner: b
 
     # retrieve tags
     if use_ner and mlp_result:
-        seen_tags = {}
-        for fact in mlp_result["texta_facts"]:
-            fact_val = fact["str_val"].lower().strip()
-            if fact_val in taggers and fact_val not in seen_tags:
-                fact_val_dict = {
-                    "tag": taggers[fact_val]["tag"],
-                    "probability": 1.0,
-                    "tagger_id": taggers[fact_val]["id"],
-                    "ner_match": True
-                }
-                tags.append(fact_val_dict)
-                seen_tags[fact_val] = True
+        tags = get_ner_tags(mlp_result, taggers)
         logging.getLogger(INFO_LOGGER).info(f"[Get MLP] Detected {len(tags)} with NER.")
 
     return text, tags
 
 
+def get_ner_tags(mlp_result: dict, taggers: Dict[str, dict]) -> List[dict]:
+    """Retrieves tags predicted by MLP NER that are present in the Tagger Group models."""
+    tags = []
+    seen_tags = {}
+    for fact in mlp_result["texta_facts"]:
+        fact_val = fact["str_val"].lower().strip()
+        if fact_val in taggers and fact_val not in seen_tags:
+            fact_val_dict = {
+                "tag": taggers[fact_val]["tag"],
+                "probability": 1.0,
+                "tagger_id": taggers[fact_val]["id"],
+                "ner_match": True
+            }
+            tags.append(fact_val_dict)
+            seen_tags[fact_val] = True
+    return tags
+
+
+def get_mlp_on_batch(tagger_group_object: TaggerGroup, texts: List[str], lemmatize: bool = False, use_ner: bool = True) -> List[tuple]:
+    """
+    Batch version of get_mlp, analyzes all the texts of a scroll batch with a single MLP task.
+    :return: list of (text, tags) tuples in the order of the input texts.
+    """
+    if not texts or not (lemmatize or use_ner):
+        return [(text, []) for text in texts]
+
+    taggers = {t.description.lower(): {"tag": t.description, "id": t.id} for t in tagger_group_object.taggers.all()}
+    logging.getLogger(INFO_LOGGER).info(f"[Get MLP] Applying lemmatization and NER on {len(texts)} texts...")
+    with allow_join_result():
+        mlp_results = apply_mlp_on_list.apply_async(kwargs={"texts": texts, "analyzers": ["all"]}, queue=CELERY_MLP_TASK_QUEUE).get()
+    logging.getLogger(INFO_LOGGER).info(f"[Get MLP] Finished applying MLP.")
+
+    results = []
+    for text, mlp_result in zip(texts, mlp_results):
+        if lemmatize and mlp_result:
+            text = mlp_result["text_mlp"]["lemmas"]
+        tags = get_ner_tags(mlp_result, taggers) if use_ner and mlp_result else []
+        results.append((text, tags))
+    return results
+
+
 def get_tag_candidates(tagger_group_id: int, text: str, ignore_tags: List[str] = [], n_similar_docs: int = 10, max_candidates: int = 10):
     """
     Finds frequent tags from documents similar to input document.
@@ -323,21 +358,59 @@ def get_tag_candidates(tagger_group_id: int, text: str, ignore_tags: List[str] =
     info_logger.info(f"[Get Tag Candidates] Trying to retrieve {n_similar_docs} documents from Elastic...")
     docs = es_s.search(size=n_similar_docs)
     info_logger.info(f"[Get Tag Candidates] Successfully retrieved {len(docs)} documents from Elastic.")
+    tag_candidates = count_tag_candidates(docs, hybrid_tagger_object.fact_name, ignore_tags, max_candidates)
+    info_logger.info(f"[Get Tag Candidates] Retrieved {len(tag_candidates)} tag candidates.")
+    return tag_candidates
+
+
+def count_tag_candidates(docs: List[dict], fact_name: str, ignore_tags: Dict[str, bool], max_candidates: int) -> List[str]:
+    """Returns the most frequent values of the fact in the similar documents."""
     # dict for tag candidates from elastic
     tag_candidates = {}
     # retrieve tags from elastic response
     for doc in docs:
         if "texta_facts" in doc:
             for fact in doc["texta_facts"]:
-                if fact["fact"] == hybrid_tagger_object.fact_name:
+                if fact["fact"] == fact_name:
                     fact_val = fact["str_val"]
                     if fact_val not in ignore_tags:
                         if fact_val not in tag_candidates:
                             tag_candidates[fact_val] = 0
                         tag_candidates[fact_val] += 1
     # sort and limit candidates
-    tag_candidates = [item[0] for item in sorted(tag_candidates.items(), key=lambda k: k[1], reverse=True)][:max_candidates]
-    info_logger.info(f"[Get Tag Candidates] Retrieved {len(tag_candidates)} tag candidates.")
+    return [item[0] for item in sorted(tag_candidates.items(), key=lambda k: k[1], reverse=True)][:max_candidates]
+
+
+def get_tag_candidates_on_batch(tagger_group_object: TaggerGroup, texts: List[str], ignore_tags: List[List[dict]], n_similar_docs: int = 10, max_candidates: int = 10) -> List[List[str]]:
+    """
+    Batch version of get_tag_candidates, sends the MLT queries of all the texts in a single msearch request.
+    :return: list of tag candidates in the order of the input texts.
+    """
+    if not texts:
+        return []
+    field_paths = json.loads(tagger_group_object.taggers.first().fields)
+    indices = tagger_group_object.get_indices()
+    info_logger = logging.getLogger(INFO_LOGGER)
+
+    body = []
+    for text in texts:
+        query = Query()
+        query.add_mlt(field_paths, text)
+        body.append({"index": ",".join(indices)})
+        body.append({**query.query, "size": n_similar_docs, "_source": ["texta_facts"]})
+
+    info_logger.info(f"[Get Tag Candidates] Retrieving similar documents for {len(texts)} texts from Elastic...")
+    responses = ElasticCore().es.msearch(body=body)["responses"]
+
+    tag_candidates = []
+    for response, text_ignore_tags in zip(responses, ignore_tags):
+        if "error" in response:
+            logging.getLogger(ERROR_LOGGER).error(f"[Get Tag Candidates] MLT query failed: {json.dumps(response['error'])}")
+            tag_candidates.append([])
+            continue
+        docs = [hit["_source"] for hit in response["hits"]["hits"]]
+        text_ignore_tags = {tag["tag"]: True for tag in text_ignore_tags}
+        tag_candidates.append(count_tag_candidates(docs, tagger_group_object.fact_name, text_ignore_tags, max_candidates))
     return tag_candidates
 
 
@@ -350,8 +423,8 @@ def apply_tagger(tagger_id: int, content: Union[str, Dict[str, str]], input_type
 
     tagger_object = Tagger.objects.get(pk=tagger_id)
 
-    # Load tagger model from the disc
-    tagger = tagger_object.load_tagger(lemmatize=lemmatize)
+    # Load tagger model from the process cache or the disc
+    tagger = tagger_object.load_cached_tagger(lemmatize=lemmatize)
 
     # Use the loaded model for predicting
     prediction = tagger_object.apply_loaded_tagger(tagger=tagger, content=content, input_type=input_type, feedback=feedback)
@@ -360,41 +433,25 @@ def apply_tagger(tagger_id: int, content: Union[str, Dict[str, str]], input_type
 
 
 def apply_tagger_group(tagger_group_id: int, content: Union[str, Dict[str, str]], tag_candidates: List[str], request, input_type: str = 'text', lemmatize: bool = False,
-                       feedback: bool = False, use_async: bool = True):
+                       feedback: bool = False):
     # get tagger group object
     logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Starting apply_tagger_group...")
     tagger_group_object = TaggerGroup.objects.get(pk=tagger_group_id)
-    # get tagger objects
-    candidates_str = "|".join(tag_candidates)
-    tagger_objects = tagger_group_object.taggers.filter(description__iregex=f"^({candidates_str})$")
-    # filter out completed
-    tagger_objects = [tagger for tagger in tagger_objects if tagger.tasks.last().status == Task.STATUS_COMPLETED]
-    logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Loaded {len(tagger_objects)} tagger objects.")
-    # predict tags
-    if use_async:
-        with allow_join_result():
-            group_task = group(apply_tagger.s(tagger.pk, content, input_type=input_type, lemmatize=lemmatize, feedback=feedback, use_logger=False) for tagger in tagger_objects)
-            group_results = group_task.apply_async(queue=CELERY_SHORT_TERM_TASK_QUEUE)
-            result_tags = group_results.get()
-
-            logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Group task applied.")
-
-    else:
-        result_tags = []
-        for tagger in tagger_objects:
-            result = apply_tagger(tagger.pk, content, input_type=input_type, lemmatize=lemmatize, feedback=feedback, use_logger=False)
-            result_tags.append(result)
-
-    # retrieve results & remove non-hits
-    tags = [tag for tag in result_tags if tag]
+    # load the compiled taggers of the group
+    engine = tagger_group_object.load_cached_engine(lemmatize=lemmatize)
+    # predict tags of all the candidate taggers in a single pass
+    result_tags = engine.tag([content], input_type=input_type, candidates=[tag_candidates])[0]
 
-    logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Retrieved results for {len(tags)} taggers.")
+    logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Retrieved results for {len(result_tags)} taggers.")
     # remove non-hits
-    tags = [tag for tag in tags if tag["result"]]
+    tags = [tag for tag in result_tags if tag["result"]]
 
     logging.getLogger(INFO_LOGGER).info(f"[Apply Tagger Group] Retrieved {len(tags)} positive tags.")
     # if feedback was enabled, add urls
     if feedback:
+        for tag in tags:
+            tagger_object = Tagger.objects.get(pk=tag["tagger_id"])
+            tagger_object.add_feedback(engine.get_text_processor(tag["tagger_id"]).process(content), tag)
         tags = [add_finite_url_to_feedback(tag, request) for tag in tags]
     # sort by probability and return
     return sorted(tags, key=lambda k: k["probability"], reverse=True)
@@ -415,51 +472,88 @@ def to_texta_fact(tagger_result: List[Dict[str, Union[str, int, bool]]], field:
     return new_facts
 
 
-def update_generator(generator: ElasticSearcher, ec: ElasticCore, fields: List[str], fact_name: str, fact_value: str, max_tags: int, object_id: int, object_type: str,
-                     tagger_object: Union[Tagger, TaggerGroup], object_args: Dict, tagger: TextTagger = None):
-    for i, scroll_batch in enumerate(generator):
-        logging.getLogger(INFO_LOGGER).info(f"[Tagger] Appyling {object_type} with ID {object_id} to batch {i + 1}...")
-        for raw_doc in scroll_batch:
-            hit = raw_doc["_source"]
-            flat_hit = ec.flatten(hit)
-            existing_facts = hit.get("texta_facts", [])
-
-            for field in fields:
-                text = flat_hit.get(field, None)
-                if text and isinstance(text, str):
-                    if object_type == "tagger":
-                        result = tagger_object.apply_loaded_tagger(tagger, text, input_type="text", feedback=None)
-                        if result:
-                            tags = [result]
-                        else:
-                            tags = []
-                    else:
-                        # update text and tags with MLP
-                        combined_texts, ner_tags = get_mlp(object_id, [text], lemmatize=object_args["lemmatize"], use_ner=object_args["use_ner"])
-                        # retrieve tag candidates
-                        tag_candidates = get_tag_candidates(object_id, [text], ignore_tags=ner_tags, n_similar_docs=object_args["n_similar_docs"],
-                                                            max_candidates=object_args["n_candidate_tags"])
-                        # get tags (sorted by probability in descending order)
-                        tagger_group_tags = apply_tagger_group(object_id, text, tag_candidates, request=None, input_type='text', lemmatize=object_args["lemmatize"], feedback=False,
-                                                               use_async=False)
-                        # take only `max_tags` first tags
-                        tags = ner_tags + tagger_group_tags[:max_tags]
-
-                    new_facts = to_texta_fact(tags, field, fact_name, fact_value)
-                    if new_facts:
-                        existing_facts.extend(new_facts)
-
-            if existing_facts:
-                # Remove duplicates to avoid adding the same facts with repetitive use.
-                existing_facts = ElasticDocument.remove_duplicate_facts(existing_facts)
-
-            yield {
-                "_index": raw_doc["_index"],
-                "_id": raw_doc["_id"],
-                "_type": raw_doc.get("_type", "_doc"),
-                "_op_type": "update",
-                "_source": {"doc": {"texta_facts": existing_facts}}
-            }
+def apply_tagger_on_batch(tagger_object: Tagger, tagger: TextTagger, flat_hits: List[dict], fields: List[str]) -> Dict[tuple, dict]:
+    """
+    Applies loaded tagger on every field of every document in the batch with a single prediction pass.
+    Returns predictions keyed by the position of the document in the batch and the field name.
+    """
+    positions = []
+    texts = []
+    for doc_index, flat_hit in enumerate(flat_hits):
+        for field in fields:
+            text = flat_hit.get(field, None)
+            if text and isinstance(text, str):
+                positions.append((doc_index, field))
+                texts.append(text)
+
+    predictions = tagger_object.apply_loaded_tagger_on_texts(tagger, texts)
+    return dict(zip(positions, predictions))
+
+
+def apply_tagger_group_on_batch(tagger_group_object: TaggerGroup, engine: TaggerGroupEngine, flat_hits: List[dict], fields: List[str], object_args: Dict,
+                                max_tags: int) -> Dict[tuple, List[dict]]:
+    """
+    Applies Tagger Group on every field of every document in the batch.
+    MLP and candidate retrieval are done once per batch and the candidate tags of all the texts are predicted by the compiled engine in a single pass.
+    Returns tags keyed by the position of the document in the batch and the field name.
+    """
+    positions = []
+    texts = []
+    for doc_index, flat_hit in enumerate(flat_hits):
+        for field in fields:
+            text = flat_hit.get(field, None)
+            if text and isinstance(text, str):
+                positions.append((doc_index, field))
+                texts.append(text)
+
+    # update texts and tags with MLP
+    mlp_results = get_mlp_on_batch(tagger_group_object, texts, lemmatize=object_args["lemmatize"], use_ner=object_args["use_ner"])
+    texts = [text for text, ner_tags in mlp_results]
+    ner_tags = [ner_tags for text, ner_tags in mlp_results]
+    # retrieve tag candidates
+    tag_candidates = get_tag_candidates_on_batch(tagger_group_object, texts, ignore_tags=ner_tags, n_similar_docs=object_args["n_similar_docs"],
+                                                 max_candidates=object_args["n_candidate_tags"])
+
+    tagger_group_tags = engine.tag(texts, input_type="text", candidates=tag_candidates)
+
+    batch_tags = {}
+    for position, text_ner_tags, text_tags in zip(positions, ner_tags, tagger_group_tags):
+        # remove non-hits and take only `max_tags` most probable tags
+        text_tags = sorted([tag for tag in text_tags if tag["result"]], key=lambda k: k["probability"], reverse=True)
+        batch_tags[position] = text_ner_tags + text_tags[:max_tags]
+    return batch_tags
+
+
+@index_applier("tagger")
+def get_tagger_batch_function(object_id: int, object_type: str, fields: List[str], fact_name: str, fact_value: str, object_args: Dict, max_tags: int = 10000):
+    tagger = None
+    engine = None
+    if object_type == "tagger":
+        tagger_object = Tagger.objects.get(pk=object_id)
+        tagger = tagger_object.load_cached_tagger(lemmatize=object_args["lemmatize"])
+    else:
+        tagger_object = TaggerGroup.objects.get(pk=object_id)
+        # Texts are lemmatized in batches beforehand, so the engine is compiled without the lemmatizer.
+        engine = tagger_object.load_cached_engine()
+    ec = ElasticCore()
+
+
+    def process_batch(sources: List[dict]) -> List[List[dict]]:
+        logging.getLogger(INFO_LOGGER).info(f"[Tagger] Appyling {object_type} with ID {object_id} to a batch of {len(sources)} documents...")
+        flat_hits = [ec.flatten(source) for source in sources]
+        if object_type == "tagger":
+            batch_predictions = apply_tagger_on_batch(tagger_object, tagger, flat_hits, fields)
+        else:
+            batch_predictions = apply_tagger_group_on_batch(tagger_object, engine, flat_hits, fields, object_args, max_tags)
+
+        batch_facts = [[] for _ in sources]
+        for (doc_index, field), prediction in batch_predictions.items():
+            tags = [prediction] if object_type == "tagger" else prediction
+            batch_facts[doc_index].extend(to_texta_fact(tags, field, fact_name, fact_value))
+        return batch_facts
+
+
+    return process_batch
 
 
 @task(name="apply_tagger_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
@@ -467,35 +561,14 @@ def apply_tagger_to_index(object_id: int, indices: List[str], fields: List[str],
                           es_timeout: int, object_type: str, object_args: Dict, max_tags: int = 10000):
     """Apply Tagger or TaggerGroup to index."""
     try:
-        tagger = None
         if object_type == "tagger":
             tagger_object = Tagger.objects.get(pk=object_id)
-            tagger = tagger_object.load_tagger(lemmatize=object_args["lemmatize"], use_logger=True)
         else:
             tagger_object = TaggerGroup.objects.get(pk=object_id)
 
         task_object = tagger_object.tasks.last()
-        progress = ShowProgress(task_object)
-
-        ec = ElasticCore()
-        [ec.add_texta_facts_mapping(index) for index in indices]
-
-        searcher = ElasticSearcher(
-            indices=indices,
-            field_data=fields + ["texta_facts"],  # Get facts to add upon existing ones.
-            query=query,
-            output=ElasticSearcher.OUT_RAW,
-            timeout=f"{es_timeout}m",
-            callback_progress=progress,
-        )
-
-        actions = update_generator(generator=searcher, ec=ec, fields=fields, fact_name=fact_name, fact_value=fact_value, max_tags=max_tags, object_id=object_id,
-                                   object_type=object_type, tagger_object=tagger_object, object_args=object_args, tagger=tagger)
-        for success, info in streaming_bulk(client=ec.es, actions=actions, refresh="wait_for", chunk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, max_retries=3):
-            if not success:
-                logging.getLogger(ERROR_LOGGER).exception(json.dumps(info))
-
-        task_object.complete()
+        applier_kwargs = {"object_id": object_id, "object_type": object_type, "fields": fields, "fact_name": fact_name, "fact_value": fact_value, "object_args": object_args, "max_tags": max_tags}
+        apply_to_index("tagger", applier_kwargs, task_object, indices=indices, fields=fields, query=query, bulk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, es_timeout=es_timeout)
         return True
 
     except Exception as e:
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+from texta_tagger.pipeline import get_pipeline_builder
+from texta_tagger.tagger import Tagger as TextTagger
+
+from toolkit.tagger.group_engine import TaggerGroupEngine
+
+
+FIELDS = ["text", "title"]
+PIPELINE_OPTIONS = [
+    ("Count Vectorizer", "Logistic Regression", "word", "whitespace"),
+    ("TfIdf Vectorizer", "Logistic Regression", "word", "whitespace"),
+    ("TfIdf Vectorizer", "LinearSVC", "char_wb", "none"),
+    ("Hashing Vectorizer", "Logistic Regression", "word", "whitespace"),
+    ("Hashing Vectorizer", "LinearSVC", "word", "whitespace"),
+]
+
+
+class TaggerGroupEngineTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.random = np.random.RandomState(0)
+        cls.vocabulary = [f"word{i}" for i in range(200)]
+        cls.taggers = {}
+        tagger_id = 0
+        for options in PIPELINE_OPTIONS:
+            for _ in range(2):
+                tagger_id += 1
+                cls.taggers[tagger_id] = cls._train_tagger(options, tagger_id)
+        # Multiclass taggers can not be compiled and are applied with their own pipelines.
+        tagger_id += 1
+        cls.taggers[tagger_id] = cls._train_tagger(PIPELINE_OPTIONS[1], tagger_id, labels=["a", "b", "c"])
+
+        cls.engine = TaggerGroupEngine()
+        for tagger_id, tagger in cls.taggers.items():
+            cls.engine.add_tagger(tagger_id, tagger, processor_key="default")
+        cls.engine.compile()
+        cls.texts = [cls._generate_text(cls.random.randint(0, tagger_id + 1)) for _ in range(50)] + [""]
+
+
+    @classmethod
+    def _generate_text(cls, topic: int):
+        words = list(cls.random.choice(cls.vocabulary, cls.random.randint(3, 30)))
+        if topic:
+            words += [f"word{topic}"] * cls.random.randint(1, 3)
+        return " ".join(words)
+
+
+    @classmethod
+    def _train_tagger(cls, options, topic: int, labels=("false", "true")):
+        pipe_builder = get_pipeline_builder()
+        pipe_builder.set_pipeline_options(*options)
+        model, params = pipe_builder.build(FIELDS)
+        model.set_params(**{param: values[0] for param, values in params.items()})
+        classes = cls.random.randint(0, len(labels), 300)
+        data = pd.DataFrame({
+            "text": [cls._generate_text(topic + label_index if label_index else 0) for label_index in classes],
+            "title": [cls._generate_text(0) for _ in classes]
+        })
+        model.fit(data, np.array(labels)[classes])
+        tagger = TextTagger(description=f"Tag {topic}")
+        tagger.model = model
+        return tagger
+
+
+    def test_predictions_equal_to_tagger_predictions(self):
+        results = self.engine.tag(self.texts)
+        for text, predictions in zip(self.texts, results):
+            self.assertEqual(len(predictions), len(self.taggers))
+            for prediction in predictions:
+                expected = self.taggers[prediction["tagger_id"]].tag_text(text)
+                self.assertEqual(prediction["result"], expected["prediction"] != "false")
+                self.assertAlmostEqual(prediction["probability"], expected["probability"], places=9)
+
+
+    def test_doc_predictions_equal_to_tagger_predictions(self):
+        docs = [{"text": self.texts[i], "title": self.texts[i + 1]} for i in range(10)] + [{"text": self.texts[0]}]
+        results = self.engine.tag(docs, input_type="doc")
+        for doc, predictions in zip(docs, results):
+            for prediction in predictions:
+                expected = self.taggers[prediction["tagger_id"]].tag_doc(doc)
+                self.assertEqual(prediction["result"], expected["prediction"] != "false")
+                self.assertAlmostEqual(prediction["probability"], expected["probability"], places=9)
+
+
+    def test_only_candidates_are_applied(self):
+        results = self.engine.tag(self.texts[:2], candidates=[["tag 1", "TAG 3"], []])
+        self.assertEqual({prediction["tagger_id"] for prediction in results[0]}, {1, 3})
+        self.assertEqual(results[1], [])
+
+
+    def test_multiclass_tagger_is_not_compiled(self):
+        multiclass_tagger_id = max(self.taggers)
+        self.assertIn(multiclass_tagger_id, self.engine.fallback_taggers)
+        self.assertEqual(sum(len(block.tagger_ids) for block in self.engine.blocks), len(self.taggers) - 1)
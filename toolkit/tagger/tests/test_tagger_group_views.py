@@ -81,6 +81,7 @@ class TaggerGroupViewTests(APITransactionTestCase):
         self.run_apply_tagger_group_to_index_invalid_input()
         self.run_model_export_import()
         self.run_tagger_instances_have_mention_to_tagger_group()
+        self.run_engine_version_changes_with_the_taggers()
         self.run_check_that_filtering_taggers_by_tagger_group_description_works()
 
 
@@ -497,6 +498,36 @@ class TaggerGroupViewTests(APITransactionTestCase):
             self.add_cleanup_files(tagger.id)
 
 
+    def run_engine_version_changes_with_the_taggers(self):
+        tg = TaggerGroup.objects.get(pk=self.test_tagger_group_id)
+        version = tg.get_engine_version()
+        self.assertEqual(version, tg.get_engine_version())
+
+        tagger = tg.taggers.order_by("pk").first()
+        original_stop_words = tagger.stop_words
+        tagger.stop_words = json.dumps(["changed"])
+        tagger.save()
+        self.assertNotEqual(version, tg.get_engine_version())
+        tagger.stop_words = original_stop_words
+        tagger.save()
+
+        original_description = tagger.description
+        tagger.description = "renamed_tag"
+        tagger.save()
+        self.assertNotEqual(version, tg.get_engine_version())
+        tagger.description = original_description
+        tagger.save()
+
+        task = tagger.tasks.last()
+        original_status = task.status
+        task.status = Task.STATUS_FAILED
+        task.save()
+        self.assertNotEqual(version, tg.get_engine_version())
+        task.status = original_status
+        task.save()
+        self.assertEqual(version, tg.get_engine_version())
+
+
     def run_tagger_instances_have_mention_to_tagger_group(self):
         tg = TaggerGroup.objects.get(pk=self.test_tagger_group_id)
         description = tg.description
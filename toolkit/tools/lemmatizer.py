@@ -1,66 +1,211 @@
+import bisect
+import html
 import logging
-from typing import Optional
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
 import elasticsearch
 from celery.result import allow_join_result
 from elasticsearch.client import IndicesClient
+from nltk.stem.snowball import SnowballStemmer
 from texta_tools.text_splitter import TextSplitter
 
 from texta_elastic.core import ElasticCore
-from toolkit.mlp.tasks import apply_mlp_on_list
-from toolkit.settings import CELERY_MLP_TASK_QUEUE, ERROR_LOGGER
+from toolkit.elastic.choices import STEMMER_BACKENDS, STEMMER_BACKEND_ELASTIC, STEMMER_BACKEND_LOCAL
+from toolkit.helper_functions import chunks
+from toolkit.mlp.tasks import apply_lemmatization_on_list
+from toolkit.settings import CELERY_MLP_TASK_QUEUE, ERROR_LOGGER, ES_ANALYZER_WORKERS, MLP_BATCH_SIZE, STEMMER_BACKEND
+
+
+# Maximum number of words sent to Elasticsearch in a single analyze request.
+# Elastic will complain if token count exceeds 10K.
+ANALYZER_WORD_LIMIT = 5000
+# Offset gap Elasticsearch adds between the elements of the analyzed text array.
+ANALYZER_OFFSET_GAP = 1
+
+# Maximum number of texts the lemmas are kept for by CeleryLemmatizer.
+LEMMA_CACHE_SIZE = 10000
+
+# Maximum token length of the Elasticsearch standard tokenizer, longer tokens are split.
+STANDARD_MAX_TOKEN_LENGTH = 255
+# Characters the standard tokenizer emits as single character tokens (Hiragana, CJK ideographs, emoji).
+_SINGLE_CHARACTERS = "\u3040-\u309f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u2600-\u27bf\U0001f300-\U0001faff"
+_WORD_CHARACTERS = f"[^\\W{_SINGLE_CHARACTERS}]"
+# Approximation of the Unicode word boundary rules used by the standard tokenizer:
+# letters and digits are joined by dots and apostrophes, letters by colons and digits by commas and semicolons.
+STANDARD_TOKEN_PATTERN = re.compile(
+    f"[{_SINGLE_CHARACTERS}]|{_WORD_CHARACTERS}+(?:(?:[.'’]|(?<=[^\\W\\d_])[:·](?=[^\\W\\d_])|(?<=\\d)[,;](?=\\d)){_WORD_CHARACTERS}+)*"
+)
+HTML_IGNORED_PATTERN = re.compile(r"<!--.*?-->|<(script|style)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r"</?[a-zA-Z][^>]*>")
 
 
 class CeleryLemmatizer:
 
-    def __init__(self):
-        pass
+    def __init__(self, batch_size: int = MLP_BATCH_SIZE, cache_size: int = LEMMA_CACHE_SIZE):
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        # Lemmas of the most recently lemmatized texts, so that the text processors calling lemmatize
+        # one text at a time don't send a task per text. The lemmas depend only on the text,
+        # so the callers sharing the lemmatizer can't get each other's results.
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_lock = threading.Lock()
 
 
-    def lemmatize(self, text):
+    def _apply_lemmatization(self, texts: List[str]) -> List[str]:
+        # All the batches are sent before waiting for the results so that they are processed by the MLP workers in parallel.
+        async_results = [
+            apply_lemmatization_on_list.apply_async(kwargs={"texts": batch}, queue=CELERY_MLP_TASK_QUEUE)
+            for batch in chunks(texts, self.batch_size)
+        ]
         with allow_join_result():
-            mlp = apply_mlp_on_list.apply_async(kwargs={"texts": [text], "analyzers": ["lemmas"]}, queue=CELERY_MLP_TASK_QUEUE).get()
-            lemmas = mlp[0]["text_mlp"]["lemmas"]
-            return lemmas
+            return [lemmas for async_result in async_results for lemmas in async_result.get()]
+
+
+    def _get_cached(self, texts: List[str]) -> Dict[str, str]:
+        with self._cache_lock:
+            cached = {}
+            for text in texts:
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    cached[text] = self._cache[text]
+            return cached
+
+
+    def _add_to_cache(self, lemmas: Dict[str, str]):
+        with self._cache_lock:
+            for text, lemmatized_text in lemmas.items():
+                self._cache[text] = lemmatized_text
+                self._cache.move_to_end(text)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+    def lemmatize_texts(self, texts: List[str]) -> List[str]:
+        """Lemmatizes the texts with a single MLP task per batch_size texts and keeps the lemmas for lemmatize."""
+        unique_texts = list(dict.fromkeys(texts))
+        lemmas = self._get_cached(unique_texts)
+        missing_texts = [text for text in unique_texts if text not in lemmas]
+        if missing_texts:
+            new_lemmas = dict(zip(missing_texts, self._apply_lemmatization(missing_texts)))
+            self._add_to_cache(new_lemmas)
+            lemmas.update(new_lemmas)
+        return [lemmas[text] for text in texts]
+
+
+    def lemmatize(self, text):
+        return self.lemmatize_texts([text])[0]
 
 
 class ElasticAnalyzer:
 
-    def __init__(self, language="english"):
+    def __init__(self, language="english", workers: int = ES_ANALYZER_WORKERS):
         self.core = ElasticCore()
         self.indices_client = IndicesClient(self.core.es)
         self.splitter = TextSplitter(split_by="WORD_LIMIT")
         self.language = language
+        self.workers = workers
 
 
     def chunk_input(self, text):
         analyzed_chunks = []
         # Split input if token count greater than 5K.
         # Elastic will complain if token count exceeds 10K.
-        docs = self.splitter.split(text, max_limit=5000)
+        docs = self.splitter.split(text, max_limit=ANALYZER_WORD_LIMIT)
         # Extract text chunks from docs.
         text_chunks = [doc["text"] for doc in docs]
         return text_chunks
 
 
+    @staticmethod
+    def _is_invalid_stemmer_error(e: Exception) -> bool:
+        return isinstance(e, elasticsearch.exceptions.RequestError) and "Invalid stemmer class" in str(e.info)
+
+
+    @staticmethod
+    def _log_analyzer_error(e: Exception):
+        if ElasticAnalyzer._is_invalid_stemmer_error(e):
+            logging.getLogger(ERROR_LOGGER).warning(e)
+        else:
+            logging.getLogger(ERROR_LOGGER).exception(e)
+
+
     def apply_analyzer(self, body):
         try:
             analysis = self.indices_client.analyze(body=body)
             tokens = [token["token"] for token in analysis["tokens"]]
             token_string = " ".join(tokens)
             return token_string
-        except elasticsearch.exceptions.RequestError as e:
-            reason = e.info["error"]["reason"]
-            if "Invalid stemmer class" in reason:
-                logging.getLogger(ERROR_LOGGER).warning(e)
-            else:
-                logging.getLogger(ERROR_LOGGER).exception(e)
-            return ""
         except Exception as e:
-            logging.getLogger(ERROR_LOGGER).exception(e)
+            self._log_analyzer_error(e)
             return ""
 
 
+    def apply_analyzer_on_batch(self, texts: List[str], body: dict) -> List[str]:
+        """
+        Analyzes multiple texts with a single request as the text field of the analyze API accepts an array.
+        Elasticsearch continues the offsets of every array element from the end of the previous one (plus an offset gap),
+        which is used for assigning the tokens back to the texts. Offsets are counted in UTF-16 code units.
+        When the request fails, the texts are analyzed one by one so that a single bad text only loses its own output.
+        """
+        try:
+            analysis = self.indices_client.analyze(body={**body, "text": texts})
+        except Exception as e:
+            self._log_analyzer_error(e)
+            # Requests with an unsupported stemmer language fail for every text.
+            if len(texts) == 1 or self._is_invalid_stemmer_error(e):
+                return ["" for _ in texts]
+            return [self.apply_analyzer({**body, "text": text}) for text in texts]
+
+        text_starts = []
+        offset = 0
+        for text in texts:
+            text_starts.append(offset)
+            offset += len(text.encode("utf-16-le")) // 2 + ANALYZER_OFFSET_GAP
+
+        tokens = [[] for _ in texts]
+        for token in analysis["tokens"]:
+            text_index = bisect.bisect_right(text_starts, token["start_offset"]) - 1
+            tokens[text_index].append(token["token"])
+        return [" ".join(text_tokens) for text_tokens in tokens]
+
+
+    def analyze_texts(self, texts: List[str], body: dict) -> List[str]:
+        """
+        Batch version of analyze, gives the same output for every text.
+        Chunks of all the texts are packed into requests of up to ANALYZER_WORD_LIMIT words
+        which are sent to Elasticsearch concurrently by self.workers threads.
+        """
+        chunk_text_indices = []
+        batches = [[]]
+        batch_words = 0
+        for text_index, text in enumerate(texts):
+            for chunk in self.chunk_input(text):
+                chunk_words = len(chunk.split())
+                if batches[-1] and batch_words + chunk_words > ANALYZER_WORD_LIMIT:
+                    batches.append([])
+                    batch_words = 0
+                batches[-1].append(chunk)
+                batch_words += chunk_words
+                chunk_text_indices.append(text_index)
+
+        batches = [batch for batch in batches if batch]
+        if len(batches) > 1 and self.workers > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                analysed_batches = list(executor.map(lambda batch: self.apply_analyzer_on_batch(batch, body), batches))
+        else:
+            analysed_batches = [self.apply_analyzer_on_batch(batch, body) for batch in batches]
+
+        analysed_chunks = [[] for _ in texts]
+        analysed_chunk_strings = (chunk for batch in analysed_batches for chunk in batch)
+        for text_index, analysed_chunk in zip(chunk_text_indices, analysed_chunk_strings):
+            analysed_chunks[text_index].append(analysed_chunk)
+        return [" ".join(text_chunks) for text_chunks in analysed_chunks]
+
+
     def _prepare_stem_body(self, text, language, strip_html: bool, tokenizer="standard"):
         body = {"text": text, "tokenizer": tokenizer, "filter": [{"type": "snowball", "language": language}]}
         if strip_html:
@@ -78,6 +223,12 @@ class ElasticAnalyzer:
         return " ".join(analysed_chunks)
 
 
+    def stem_texts(self, texts: List[str], language: Optional[str], strip_html=True, tokenizer="standard") -> List[str]:
+        """Batch version of stem_text."""
+        body = self._prepare_stem_body(None, language, strip_html, tokenizer)
+        return self.analyze_texts(texts, body)
+
+
     def _prepare_tokenizer_body(self, text, tokenizer="standard", strip_html: bool = True):
         body = {"text": text, "tokenizer": tokenizer}
         if strip_html:
@@ -95,6 +246,12 @@ class ElasticAnalyzer:
         return " ".join(analysed_chunks)
 
 
+    def tokenize_texts(self, texts: List[str], tokenizer="standard", strip_html=True) -> List[str]:
+        """Batch version of tokenize_text."""
+        body = self._prepare_tokenizer_body(None, tokenizer, strip_html)
+        return self.analyze_texts(texts, body)
+
+
     def analyze(self, text: str, body: dict) -> str:
         analysed_chunks = []
         text_chunks = self.chunk_input(text)
@@ -109,3 +266,97 @@ class ElasticAnalyzer:
     # with the texta-tools library that send there as the lemmatizer.
     def lemmatize(self, text):
         return self.stem_text(text=text, language=self.language, strip_html=True)
+
+
+class LocalAnalyzer:
+    """
+    In-process alternative to ElasticAnalyzer which stems with the NLTK Snowball stemmers.
+    Html stripping and tokenization approximate the html_strip char filter and the standard tokenizer of Elasticsearch.
+    NLTK lowercases the words before stemming them while the Snowball filter of Elasticsearch keeps their case,
+    so unlike with ElasticAnalyzer the stems of the words with uppercase letters are lowercase ("Running" -> "run").
+    Lowercase texts are stemmed the same by both. Languages and tokenizers which are not available locally are delegated to Elasticsearch.
+    """
+
+    def __init__(self, language="english", workers: int = ES_ANALYZER_WORKERS):
+        self.language = language
+        self.workers = workers
+        self.stemmers: Dict[str, SnowballStemmer] = {}
+        self._elastic_analyzer = None
+
+
+    @property
+    def elastic_analyzer(self) -> ElasticAnalyzer:
+        if self._elastic_analyzer is None:
+            self._elastic_analyzer = ElasticAnalyzer(language=self.language, workers=self.workers)
+        return self._elastic_analyzer
+
+
+    @staticmethod
+    def is_supported(language: Optional[str] = None, tokenizer="standard") -> bool:
+        language_supported = language is None or language in SnowballStemmer.languages
+        return language_supported and tokenizer == "standard"
+
+
+    @staticmethod
+    def strip_html(text: str) -> str:
+        text = HTML_IGNORED_PATTERN.sub(" ", text)
+        text = HTML_TAG_PATTERN.sub(" ", text)
+        return html.unescape(text)
+
+
+    @staticmethod
+    def tokenize(text: str, strip_html=True) -> List[str]:
+        if strip_html:
+            text = LocalAnalyzer.strip_html(text)
+        tokens = []
+        for token in STANDARD_TOKEN_PATTERN.findall(text):
+            tokens.extend(token[i:i + STANDARD_MAX_TOKEN_LENGTH] for i in range(0, len(token), STANDARD_MAX_TOKEN_LENGTH))
+        return tokens
+
+
+    def _get_stemmer(self, language: str) -> SnowballStemmer:
+        if language not in self.stemmers:
+            self.stemmers[language] = SnowballStemmer(language)
+        return self.stemmers[language]
+
+
+    def stem_text(self, text: str, language: Optional[str], strip_html=True, tokenizer="standard"):
+        return self.stem_texts([text], language=language, strip_html=strip_html, tokenizer=tokenizer)[0]
+
+
+    def stem_texts(self, texts: List[str], language: Optional[str], strip_html=True, tokenizer="standard") -> List[str]:
+        if language is None or not self.is_supported(language, tokenizer):
+            return self.elastic_analyzer.stem_texts(texts, language=language, strip_html=strip_html, tokenizer=tokenizer)
+
+        stemmer = self._get_stemmer(language)
+        # Vocabulary of a batch is small compared to its token count, so every word is stemmed once.
+        stems = {}
+        texts_tokens = [self.tokenize(text, strip_html=strip_html) for text in texts]
+        for tokens in texts_tokens:
+            for token in tokens:
+                if token not in stems:
+                    stems[token] = stemmer.stem(token)
+        return [" ".join(stems[token] for token in tokens) for tokens in texts_tokens]
+
+
+    def tokenize_text(self, text, tokenizer="standard", strip_html=True):
+        return self.tokenize_texts([text], tokenizer=tokenizer, strip_html=strip_html)[0]
+
+
+    def tokenize_texts(self, texts: List[str], tokenizer="standard", strip_html=True) -> List[str]:
+        if not self.is_supported(tokenizer=tokenizer):
+            return self.elastic_analyzer.tokenize_texts(texts, tokenizer=tokenizer, strip_html=strip_html)
+        return [" ".join(self.tokenize(text, strip_html=strip_html)) for text in texts]
+
+
+    def lemmatize(self, text):
+        return self.stem_text(text=text, language=self.language, strip_html=True)
+
+
+def get_analyzer(language="english", backend: str = STEMMER_BACKEND, workers: int = ES_ANALYZER_WORKERS):
+    """Returns the stemmer and tokenizer of the given backend, both share the interface of ElasticAnalyzer."""
+    if backend == STEMMER_BACKEND_LOCAL:
+        return LocalAnalyzer(language=language, workers=workers)
+    elif backend == STEMMER_BACKEND_ELASTIC:
+        return ElasticAnalyzer(language=language, workers=workers)
+    raise ValueError(f"Unknown stemmer backend '{backend}', choose one of: {', '.join(STEMMER_BACKENDS)}.")
@@ -0,0 +1,171 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from toolkit.settings import INFO_LOGGER
+
+
+def serves_concurrent_requests() -> bool:
+    """
+    Whether the web process can handle several requests at once. uWSGI workers handle one request
+    at a time unless they run threads, the development servers handle every request in a thread.
+    """
+    try:
+        import uwsgi
+    except ImportError:
+        return True
+    threads = uwsgi.opt.get("threads", 1)
+    if isinstance(threads, list):
+        threads = threads[-1]
+    return int(threads) > 1
+
+
+class _PendingRequest:
+
+    def __init__(self, items: list):
+        self.items = items
+        self.time_enqueued = time.perf_counter()
+        self.time_dispatched = None
+        self.time_finished = None
+        self.results = None
+        self.error = None
+        self.batch_items = 0
+        self.batch_requests = 0
+        self.done = threading.Event()
+
+
+class _Batch:
+
+    def __init__(self):
+        self.requests: List[_PendingRequest] = []
+        self.item_count = 0
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Per-process micro-batching of concurrent requests.
+
+    The first request of a batch waits up to max_wait_ms for other requests with the same key
+    to join it (or until the batch holds max_batch_items items), then processes the items of all
+    the requests with a single call of process_batch and hands every request its own results.
+    Requests of the same key must be processable together, e.g. texts with the same MLP analyzers.
+    When a batch fails, the items of its requests are processed request by request, so only the failing requests get the error.
+    In processes that handle one request at a time nothing can join the batch, so the requests are processed without waiting.
+    """
+
+
+    def __init__(self, name: str, process_batch: Callable[[Hashable, list], list], max_wait_ms: float = 10, max_batch_items: int = 100, concurrent: Optional[bool] = None):
+        """
+        :param name: Name used in the log messages to distinguish batchers.
+        :param process_batch: Function that takes the key and the items of the batch and returns a result for every item.
+        :param max_wait_ms: How long the first request of a batch waits for others to join it.
+        :param max_batch_items: Number of items after which the batch is processed without waiting any longer.
+        :param concurrent: Whether the process handles requests concurrently, detected from the web server by default.
+        """
+        self.name = name
+        self.process_batch = process_batch
+        self.concurrent = serves_concurrent_requests() if concurrent is None else concurrent
+        self.max_wait_ms = max_wait_ms if self.concurrent else 0
+        self.max_batch_items = max_batch_items
+        self._batches: Dict[Hashable, _Batch] = {}
+        self._lock = threading.Lock()
+
+
+    def process(self, key: Hashable, items: list) -> Tuple[list, dict]:
+        """
+        Processes the items together with the items of concurrent requests of the same key.
+        :return: Results of the items and the timing metrics of the request.
+        """
+        request = _PendingRequest(items)
+        with self._lock:
+            batch = self._batches.get(key)
+            is_first = batch is None
+            if is_first:
+                batch = self._batches[key] = _Batch()
+            batch.requests.append(request)
+            batch.item_count += len(items)
+            if batch.item_count >= self.max_batch_items:
+                # Close the batch, new requests of the key start the next one.
+                del self._batches[key]
+                batch.full.set()
+
+        if is_first:
+            if self.max_wait_ms > 0:
+                batch.full.wait(timeout=self.max_wait_ms / 1000)
+            with self._lock:
+                if self._batches.get(key) is batch:
+                    del self._batches[key]
+            self._process_batch(key, batch)
+        else:
+            request.done.wait()
+
+        if request.error is not None:
+            raise request.error
+        return request.results, self._get_metrics(request)
+
+
+    def _process_batch(self, key: Hashable, batch: _Batch):
+        time_dispatched = time.perf_counter()
+        try:
+            results = self.process_batch(key, [item for request in batch.requests for item in request.items])
+            error = None
+        except Exception as e:
+            results = []
+            error = e
+        time_finished = time.perf_counter()
+
+        if error is not None and len(batch.requests) > 1:
+            logging.getLogger(INFO_LOGGER).info(f"[{self.name}] Batch of {len(batch.requests)} requests failed with: {error}, processing the requests one by one.")
+            for request in batch.requests:
+                self._process_request(key, request)
+                request.time_dispatched = time_dispatched
+                request.batch_items = batch.item_count
+                request.batch_requests = len(batch.requests)
+                request.done.set()
+            return
+
+        offset = 0
+        for request in batch.requests:
+            request.time_dispatched = time_dispatched
+            request.time_finished = time_finished
+            request.batch_items = batch.item_count
+            request.batch_requests = len(batch.requests)
+            request.error = error
+            request.results = results[offset:offset + len(request.items)]
+            offset += len(request.items)
+            request.done.set()
+
+        logging.getLogger(INFO_LOGGER).info(
+            f"[{self.name}] Processed a batch of {batch.item_count} items from {len(batch.requests)} requests in {(time_finished - time_dispatched) * 1000:.1f}ms."
+        )
+
+
+    def _process_request(self, key: Hashable, request: _PendingRequest):
+        """Processes the items of a single request of a failed batch."""
+        try:
+            request.results = self.process_batch(key, request.items)
+        except Exception as e:
+            request.results = []
+            request.error = e
+        request.time_finished = time.perf_counter()
+
+
+    @staticmethod
+    def _get_metrics(request: _PendingRequest) -> dict:
+        return {
+            "queue_wait_ms": (request.time_dispatched - request.time_enqueued) * 1000,
+            "processing_ms": (request.time_finished - request.time_dispatched) * 1000,
+            "batch_items": request.batch_items,
+            "batch_requests": request.batch_requests
+        }
+
+
+    @staticmethod
+    def to_server_timing(metrics: dict) -> str:
+        """Formats the metrics as a value of the Server-Timing header."""
+        return (
+            f"queue;dur={metrics['queue_wait_ms']:.1f}, processing;dur={metrics['processing_ms']:.1f}, "
+            f"batch;desc=\"{metrics['batch_items']} items from {metrics['batch_requests']} requests\""
+        )
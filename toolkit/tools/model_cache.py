@@ -0,0 +1,160 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Union
+
+from toolkit.settings import INFO_LOGGER
+
+
+class ModelCache:
+    """
+    Per-process LRU cache for loaded models.
+
+    Entries are keyed by the id of the model object (plus optional load variants
+    like lemmatization) and stamped with a version - usually the name of the model file,
+    which changes on every retrain. A version mismatch is treated as a miss and
+    the stale model is dropped before the new one is loaded.
+    Cache is bound by the number of entries and the estimated size of models in megabytes,
+    least recently used models are evicted first.
+    Models are loaded outside of the cache lock, so a slow load only blocks the requests for the same key.
+    """
+
+
+    def __init__(self, name: str, max_entries: int = 10, max_size_mb: float = 0):
+        """
+        :param name: Name used in the log messages to distinguish caches.
+        :param max_entries: Maximum number of models kept in memory, 0 means unlimited.
+        :param max_size_mb: Maximum estimated size of the models kept in memory, 0 means unlimited.
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.max_size_mb = max_size_mb
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+
+    @property
+    def size_mb(self) -> float:
+        return sum(entry["size"] for entry in self._entries.values())
+
+
+    @staticmethod
+    def get_file_size_mb(path: str) -> float:
+        """Estimates the in-memory size of a model by the size of its file (or directory) on disk."""
+        if not path or not os.path.exists(path):
+            return 0.0
+        if os.path.isdir(path):
+            size = sum(os.path.getsize(os.path.join(root, file)) for root, dirs, files in os.walk(path) for file in files)
+        else:
+            size = os.path.getsize(path)
+        return size / 1024 ** 2
+
+
+    def get(self, key: Hashable, version: Hashable, loader: Callable[[], Any], size_mb: Union[float, Callable[[Any], float]] = 0) -> Any:
+        """
+        Returns the cached model or loads it with the loader function and stores it.
+        :param key: Key of the model, first element of a tuple key is treated as the model id.
+        :param version: Version of the model, mismatch with the cached version forces a reload.
+        :param loader: Callable without arguments that returns the loaded model.
+        :param size_mb: Estimated size of the model in megabytes or a callable estimating it from the loaded model.
+        """
+        with self._lock:
+            entry = self._get_entry(key, version)
+            if entry:
+                return entry["model"]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Concurrent requests for the same model wait for a single load.
+        with key_lock:
+            with self._lock:
+                entry = self._get_entry(key, version)
+                if entry:
+                    return entry["model"]
+                self.misses += 1
+
+            model = loader()
+            # Do not cache failed loads.
+            if model is None:
+                return model
+
+            if callable(size_mb):
+                size_mb = size_mb(model)
+
+            with self._lock:
+                self._entries[key] = {"model": model, "version": version, "size": size_mb}
+                self._entries.move_to_end(key)
+                self._evict(keep=key)
+                logging.getLogger(INFO_LOGGER).info(f"[{self.name}] Loaded model {key} into cache: {self.stats()}.")
+            return model
+
+
+    def _get_entry(self, key: Hashable, version: Hashable) -> Optional[dict]:
+        """Returns the entry of the key if it has the given version, entries of other versions are dropped."""
+        entry = self._entries.get(key, None)
+        if entry and entry["version"] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        if entry:
+            # Model has been retrained since it was cached.
+            self._entries.pop(key)
+            self.invalidations += 1
+        return None
+
+
+    def _evict(self, keep: Optional[Hashable] = None):
+        """Removes least recently used entries until the cache fits its bounds, the newest entry is always kept."""
+        while len(self._entries) > 1 and self._is_full():
+            key = next(iter(self._entries))
+            if key == keep:
+                break
+            self._entries.pop(key)
+            self.evictions += 1
+            logging.getLogger(INFO_LOGGER).info(f"[{self.name}] Evicted model {key} from cache.")
+
+
+    def _is_full(self) -> bool:
+        if self.max_entries and len(self._entries) > self.max_entries:
+            return True
+        if self.max_size_mb and self.size_mb > self.max_size_mb:
+            return True
+        return False
+
+
+    def invalidate(self, model_id: Hashable):
+        """Removes all the cached variants of a model."""
+        with self._lock:
+            keys = [key for key in self._entries if key == model_id or (isinstance(key, tuple) and key[0] == model_id)]
+            for key in keys:
+                self._entries.pop(key)
+                self.invalidations += 1
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size_mb": round(self.size_mb, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from toolkit.tools.lemmatizer import ANALYZER_WORD_LIMIT, ElasticAnalyzer
+
+
+class ElasticAnalyzerBatchTests(TestCase):
+
+    def setUp(self):
+        self.analyzer = ElasticAnalyzer(language=None, workers=2)
+        self.texts = [
+            "Hello there, I am running tests!",
+            "",
+            "Smileys 😀😀 count as two characters in Elasticsearch offsets, running jumped",
+            "<p>Stripped <b>html</b> tags</p>",
+            " ".join(["walking"] * (ANALYZER_WORD_LIMIT + 100)),
+            "The last sentence is stemmed as well."
+        ]
+
+
+    def test_stem_texts_equal_to_stem_text(self):
+        stemmed_texts = self.analyzer.stem_texts(self.texts, language="english")
+        self.assertEqual(stemmed_texts, [self.analyzer.stem_text(text, language="english") for text in self.texts])
+
+
+    def test_tokenize_texts_equal_to_tokenize_text(self):
+        tokenized_texts = self.analyzer.tokenize_texts(self.texts)
+        self.assertEqual(tokenized_texts, [self.analyzer.tokenize_text(text) for text in self.texts])
+
+
+    def test_failed_request_returns_empty_texts(self):
+        stemmed_texts = self.analyzer.stem_texts(self.texts[:3], language="invalid_language")
+        self.assertEqual(stemmed_texts, ["", "", ""])
+
+
+    def test_failed_request_falls_back_to_single_texts(self):
+        # A single word with more tokens than Elasticsearch allows in an analyze request fails the whole batch.
+        too_many_tokens = "-".join(["a"] * 11000)
+        tokenized_texts = self.analyzer.tokenize_texts([self.texts[0], too_many_tokens, self.texts[5]])
+        self.assertEqual(tokenized_texts, [self.analyzer.tokenize_text(self.texts[0]), "", self.analyzer.tokenize_text(self.texts[5])])
@@ -0,0 +1,62 @@
+from django.test import TestCase
+
+from toolkit.tools.lemmatizer import ElasticAnalyzer, LocalAnalyzer, STEMMER_BACKEND_ELASTIC, STEMMER_BACKEND_LOCAL, get_analyzer
+
+
+class LocalAnalyzerParityTests(TestCase):
+
+    def setUp(self):
+        self.local_analyzer = LocalAnalyzer(language=None)
+        self.elastic_analyzer = ElasticAnalyzer(language=None)
+        self.texts = [
+            "Hello there, I am running tests!",
+            "",
+            "Numbers like 3.14 and 1,000 stay together, but e-mail and a,b are split. Don't split U.S.A either.",
+            "<p>Stripped <b>html</b> tags &amp; entities</p><script>var ignored = 1;</script>",
+            "snake_case words and words:with:colons",
+            " ".join(["walking"] * 300)
+        ]
+        self.stemmer_texts = {
+            "english": ["the connected cats were jumping happily over generously sized fences", "running runner runs ran"],
+            "german": ["die katzen sprangen fröhlich über die großzügigen zäune", "häuser haus häuslich"],
+            "spanish": ["los gatos saltaban felizmente sobre las cercas", "corriendo corredores corrió"],
+            "russian": ["кошки весело прыгали через большие заборы", "бегущий бегать бегал"]
+        }
+
+
+    def test_tokenize_texts_equal_to_elastic(self):
+        local_texts = self.local_analyzer.tokenize_texts(self.texts)
+        elastic_texts = self.elastic_analyzer.tokenize_texts(self.texts)
+        self.assertEqual(local_texts, elastic_texts)
+
+
+    def test_stem_texts_equal_to_elastic(self):
+        for language, texts in self.stemmer_texts.items():
+            local_texts = self.local_analyzer.stem_texts(texts, language=language)
+            elastic_texts = self.elastic_analyzer.stem_texts(texts, language=language)
+            self.assertEqual(local_texts, elastic_texts, language)
+
+
+    def test_words_with_uppercase_letters_are_stemmed_locally_in_lowercase(self):
+        texts = ["The Connected CATS were Jumping happily over Generously sized FENCES", "Running runner RUNS ran in London"]
+        local_texts = self.local_analyzer.stem_texts(texts, language="english")
+        self.assertEqual(local_texts, self.elastic_analyzer.stem_texts([text.lower() for text in texts], language="english"))
+        self.assertTrue(local_texts[1].startswith("run "))
+        # Supported languages don't need Elasticsearch.
+        self.assertIsNone(self.local_analyzer._elastic_analyzer)
+
+
+    def test_stem_text_equal_to_stem_texts(self):
+        texts = self.stemmer_texts["english"]
+        self.assertEqual(self.local_analyzer.stem_texts(texts, language="english"), [self.local_analyzer.stem_text(text, language="english") for text in texts])
+
+
+    def test_unsupported_language_is_delegated_to_elastic(self):
+        texts = ["kassid hüppasid rõõmsalt üle aedade"]
+        self.assertEqual(self.local_analyzer.stem_texts(texts, language="estonian"), self.elastic_analyzer.stem_texts(texts, language="estonian"))
+
+
+    def test_get_analyzer(self):
+        self.assertIsInstance(get_analyzer(backend=STEMMER_BACKEND_LOCAL), LocalAnalyzer)
+        self.assertIsInstance(get_analyzer(backend=STEMMER_BACKEND_ELASTIC), ElasticAnalyzer)
+        self.assertRaises(ValueError, get_analyzer, backend="invalid_backend")
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.test import TestCase
+
+from toolkit.tools.micro_batcher import MicroBatcher
+
+
+class MicroBatcherTests(TestCase):
+
+    def setUp(self):
+        self.batches = []
+
+
+    def _process_batch(self, key, items):
+        self.batches.append((key, items))
+        if "error" in items:
+            raise ValueError("Failed batch.")
+        return [f"{key}:{item}" for item in items]
+
+
+    def _process_concurrently(self, batcher, requests):
+        results = [None] * len(requests)
+
+        def run(i, key, items):
+            try:
+                results[i] = batcher.process(key, items)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=run, args=(i, key, items)) for i, (key, items) in enumerate(requests)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+
+    def test_concurrent_requests_are_processed_in_one_batch(self):
+        batcher = MicroBatcher("test", self._process_batch, max_wait_ms=500, max_batch_items=5)
+        requests = [("a", ["1", "2"]), ("a", ["3"]), ("a", ["4", "5"])]
+        results = self._process_concurrently(batcher, requests)
+        self.assertEqual(len(self.batches), 1)
+        for (key, items), (request_results, metrics) in zip(requests, results):
+            self.assertEqual(request_results, [f"{key}:{item}" for item in items])
+            self.assertEqual(metrics["batch_items"], 5)
+            self.assertEqual(metrics["batch_requests"], 3)
+            self.assertTrue(metrics["queue_wait_ms"] >= 0)
+            self.assertTrue(metrics["processing_ms"] >= 0)
+            self.assertIn("queue;dur=", MicroBatcher.to_server_timing(metrics))
+
+
+    def test_requests_of_different_keys_are_not_mixed(self):
+        batcher = MicroBatcher("test", self._process_batch, max_wait_ms=50)
+        results = self._process_concurrently(batcher, [("a", ["1"]), ("b", ["1"])])
+        self.assertEqual(sorted(key for key, items in self.batches), ["a", "b"])
+        self.assertEqual(sorted(request_results for request_results, metrics in results), [["a:1"], ["b:1"]])
+
+
+    def test_requests_are_not_held_without_concurrent_requests(self):
+        batcher = MicroBatcher("test", self._process_batch, max_wait_ms=5000, concurrent=False)
+        start = time.perf_counter()
+        request_results, metrics = batcher.process("a", ["1"])
+        self.assertTrue(time.perf_counter() - start < 1)
+        self.assertEqual(request_results, ["a:1"])
+        self.assertEqual(metrics["batch_requests"], 1)
+
+
+    def test_error_is_raised_only_for_the_failing_requests_of_the_batch(self):
+        batcher = MicroBatcher("test", self._process_batch, max_wait_ms=500, max_batch_items=3)
+        results = self._process_concurrently(batcher, [("a", ["error"]), ("a", ["1"]), ("a", ["2"])])
+        # The failed batch is followed by a batch per request.
+        self.assertEqual(len(self.batches), 4)
+        self.assertEqual(len([result for result in results if isinstance(result, ValueError)]), 1)
+        successful_results = [result for result in results if isinstance(result, tuple)]
+        self.assertEqual(sorted(request_results for request_results, metrics in successful_results), [["a:1"], ["a:2"]])
+        for request_results, metrics in successful_results:
+            self.assertEqual(metrics["batch_requests"], 3)
+
+
+    def test_error_of_a_single_request_is_raised(self):
+        batcher = MicroBatcher("test", self._process_batch, max_wait_ms=0, concurrent=False)
+        self.assertRaises(ValueError, batcher.process, "a", ["error"])
+        self.assertEqual(len(self.batches), 1)
@@ -0,0 +1,92 @@
+import threading
+
+from django.test import TestCase
+
+from toolkit.tools.model_cache import ModelCache
+
+
+class ModelCacheTests(TestCase):
+
+    def test_hit_after_first_load(self):
+        cache = ModelCache("Test Cache", max_entries=2)
+        loads = []
+        loader = lambda: loads.append(1) or "model"
+        self.assertEqual(cache.get((1, False), "v1", loader), "model")
+        self.assertEqual(cache.get((1, False), "v1", loader), "model")
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+
+    def test_version_change_reloads_model(self):
+        cache = ModelCache("Test Cache", max_entries=2)
+        cache.get((1, False), "v1", lambda: "old_model")
+        model = cache.get((1, False), "v2", lambda: "new_model")
+        self.assertEqual(model, "new_model")
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+
+    def test_least_recently_used_is_evicted(self):
+        cache = ModelCache("Test Cache", max_entries=2)
+        cache.get((1, False), "v1", lambda: "first")
+        cache.get((2, False), "v1", lambda: "second")
+        cache.get((1, False), "v1", lambda: "first")
+        cache.get((3, False), "v1", lambda: "third")
+        self.assertIn((1, False), cache)
+        self.assertNotIn((2, False), cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+    def test_size_bound_keeps_newest_model(self):
+        cache = ModelCache("Test Cache", max_entries=0, max_size_mb=100)
+        cache.get((1, False), "v1", lambda: "first", size_mb=60)
+        cache.get((2, False), "v1", lambda: "second", size_mb=150)
+        self.assertNotIn((1, False), cache)
+        self.assertIn((2, False), cache)
+
+
+    def test_size_estimated_from_loaded_model(self):
+        cache = ModelCache("Test Cache", max_entries=0, max_size_mb=100)
+        cache.get((1, False), "v1", lambda: [0] * 80, size_mb=len)
+        cache.get((2, False), "v1", lambda: [0] * 30, size_mb=len)
+        self.assertNotIn((1, False), cache)
+        self.assertEqual(cache.stats()["size_mb"], 30)
+
+
+    def test_invalidate_removes_all_variants(self):
+        cache = ModelCache("Test Cache", max_entries=5)
+        cache.get((1, False), "v1", lambda: "plain")
+        cache.get((1, True), "v1", lambda: "lemmatized")
+        cache.get((2, False), "v1", lambda: "other")
+        cache.invalidate(1)
+        self.assertEqual(len(cache), 1)
+        self.assertIn((2, False), cache)
+
+
+    def test_failed_load_is_not_cached(self):
+        cache = ModelCache("Test Cache", max_entries=5)
+        self.assertIsNone(cache.get((1, False), "v1", lambda: None))
+        self.assertEqual(len(cache), 0)
+
+
+    def test_load_does_not_block_other_models(self):
+        cache = ModelCache("Test Cache", max_entries=5)
+        cache.get((2, False), "v1", lambda: "loaded")
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_loader():
+            loading.set()
+            release.wait(5)
+            return "slow"
+
+        thread = threading.Thread(target=cache.get, args=((1, False), "v1", slow_loader))
+        thread.start()
+        loading.wait(5)
+        # Cached model is returned while the other one is still loading.
+        self.assertEqual(cache.get((2, False), "v1", lambda: "reloaded"), "loaded")
+        release.set()
+        thread.join()
+        self.assertEqual(cache.get((1, False), "v1", lambda: "reloaded"), "slow")
+        self.assertEqual(cache.stats()["misses"], 2)
@@ -1,14 +1,16 @@
-import pickle
 import re
-from collections import defaultdict
+from collections import Counter, defaultdict
 from typing import List
 
 import numpy as np
+from scipy import sparse
 from gensim import corpora, models, utils
 from gensim.matutils import corpus2csc
 from gensim.parsing.preprocessing import preprocess_string, strip_short, strip_tags
 from sklearn.cluster import KMeans, MiniBatchKMeans
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+from toolkit.topic_analyzer.vector_store import DocumentVectorStore
 
 
 class Clustering:
@@ -39,7 +41,9 @@ class Clustering:
         self.tfidf_model = None
         self.lsi_model = None
         self.dictionary = None
-        self.doc_vectors = {}
+        # Sparse vectors of the documents as the rows of a CSR matrix in the order of their ID-s.
+        self.doc_ids = []
+        self.doc_vectors = None
 
 
     def to_json(self):
@@ -54,7 +58,7 @@ class Clustering:
             "num_topics": self.num_topics,
             "ignore_doc_ids": self.ignore_doc_ids,
             "clustering_result": self.clustering_result,
-            "doc_vectors": self.doc_vectors
+            "doc_ids": self.doc_ids
         }
 
 
@@ -110,7 +114,7 @@ class Clustering:
             transformed_corpus = self.lsi_model[transformed_corpus]
 
         matrix = corpus2csc(transformed_corpus, num_terms=len(self.dictionary.keys()), num_docs=self.dictionary.num_docs)
-        return matrix.transpose()
+        return matrix.transpose().tocsr()
 
 
     def cluster(self):
@@ -126,7 +130,9 @@ class Clustering:
 
         for ix, doc in enumerate(self.docs):
             self.clustering_result[int(labels[ix])].append(doc["id"])
-            self.doc_vectors[doc["id"]] = vectors[ix].toarray()[0]
+
+        self.doc_ids = [doc["id"] for doc in self.docs]
+        self.doc_vectors = vectors
 
 
     def exclude_doc_from_cluster(self, cluster_id, document_id):
@@ -155,67 +161,79 @@ class Clustering:
 
 
     def save_transformation(self, file_path):
-        with open(file_path, "wb") as f:
-            pickle.dump({
-                "tfidf_model": self.tfidf_model,
-                "lsi_model": self.lsi_model,
-                "dictionary": self.dictionary,
-                "doc_vectors": self.doc_vectors
-            }, f)
-
+        models = {
+            "tfidf_model": self.tfidf_model,
+            "lsi_model": self.lsi_model,
+            "dictionary": self.dictionary
+        }
+        DocumentVectorStore.write(file_path, self.doc_ids, self.doc_vectors, models)
         return True
 
 
 class ClusterContent:
-    def __init__(self, doc_ids, models=None, vectors_filepath=""):
-        self.doc_ids = doc_ids
-        self.vectors_filepath = vectors_filepath
-        self.models = self._get_models(models, vectors_filepath)
-
-
-    def _get_models(self, models, vectors_filepath):
-        if models is None:
-            return self._load_models(vectors_filepath)
-        else:
-            return models
+    """
+    Vectors of the documents of a cluster, read from the memory mapped vector file of the clustering.
+    """
 
 
-    def _load_models(self, file_path):
-        with open(file_path, "rb") as f:
-            models = pickle.load(f)
-        return models
+    def __init__(self, doc_ids, vectors_filepath=""):
+        self.doc_ids = doc_ids
+        self.vectors_filepath = vectors_filepath
+        self.store = DocumentVectorStore.open(vectors_filepath)
+        # Sum of the normalized vectors of the documents, set by get_intracluster_similarity.
+        self.vector_sum = None
 
 
-    def _save_updated_models(self):
-        with open(self.vectors_filepath, "wb") as f:
-            pickle.dump(self.models, f)
+    @staticmethod
+    def get_document_vector(document: dict, models: dict, phraser=None):
+        dictionary = models["dictionary"]
+        processed_text = Clustering._tokenize(document, phraser=phraser)
+        doc_vec = [dictionary.doc2bow(processed_text)]
 
+        if models["tfidf_model"] is not None:
+            doc_vec = models["tfidf_model"][doc_vec]
 
-    def get_intracluster_similarity(self, new_documents=[], phraser=None):
-        if len(new_documents) > 0:
-            dictionary = self.models["dictionary"]
+        if models["lsi_model"] is not None:
+            doc_vec = models["lsi_model"][doc_vec]
 
-            for doc in new_documents:
-                processed_text = Clustering._tokenize(doc["text"], phraser=phraser)
-                doc_vec = [dictionary.doc2bow(processed_text)]
+        full_vec = corpus2csc(doc_vec, num_terms=len(dictionary.keys()), num_docs=dictionary.num_docs)
+        return full_vec.transpose().tocsr()
 
-                if self.models["tfidf_model"] is not None:
-                    doc_vec = self.models["tfidf_model"][doc_vec]
 
-                if self.models["lsi_model"] is not None:
-                    doc_vec = self.models["lsi_model"][doc_vec]
+    def get_vector_sum(self, doc_ids) -> np.ndarray:
+        """Returns the sum of the vectors of the documents normalized to unit length."""
+        if not doc_ids:
+            return np.zeros(self.store.shape[1])
+        vectors = normalize(self.store.get_vectors(doc_ids))
+        return np.asarray(vectors.sum(axis=0)).ravel()
 
-                full_vec = corpus2csc(doc_vec, num_terms=len(dictionary.keys()), num_docs=dictionary.num_docs)
-                full_vec = full_vec.transpose()
-                self.models["doc_vectors"][doc["id"]] = full_vec[0].toarray()[0]
 
-            self._save_updated_models()
+    def get_intracluster_similarity(self, new_documents=[], phraser=None, previous_doc_ids=None, previous_vector_sum=None):
+        """
+        Returns the mean cosine similarity of all the pairs of the documents, which is the squared length
+        of the sum of their normalized vectors divided by the squared number of the documents.
+        Given the document ids and the vector sum of the cluster before the change, only the vectors
+        of the added and removed documents are read.
+        """
+        new_ids = [doc["id"] for doc in new_documents]
+        if len(new_documents) > 0:
+            models = self.store.get_models()
+            new_vectors = [self.get_document_vector(doc["text"], models, phraser=phraser) for doc in new_documents]
+            self.store = self.store.add_vectors(new_ids, sparse.vstack(new_vectors))
+
+        # The sum has to be calculated again when the vectors of its documents were replaced.
+        is_incremental = previous_doc_ids is not None and previous_vector_sum is not None \
+                         and len(previous_vector_sum) == self.store.shape[1] and not set(new_ids).intersection(previous_doc_ids)
+        if is_incremental:
+            current_counts = Counter(self.doc_ids)
+            previous_counts = Counter(previous_doc_ids)
+            added_ids = list((current_counts - previous_counts).elements())
+            removed_ids = list((previous_counts - current_counts).elements())
+            self.vector_sum = np.asarray(previous_vector_sum, dtype=float) + self.get_vector_sum(added_ids) - self.get_vector_sum(removed_ids)
+        else:
+            self.vector_sum = self.get_vector_sum(self.doc_ids)
 
         if self.doc_ids:
-            cluster_vectors = []
-            for doc_id in self.doc_ids:
-                cluster_vectors.append(self.models["doc_vectors"][doc_id])
-            similarities = cosine_similarity(cluster_vectors)
-            return np.mean(similarities)
+            return float(np.dot(self.vector_sum, self.vector_sum)) / len(self.doc_ids) ** 2
         else:
             return 0
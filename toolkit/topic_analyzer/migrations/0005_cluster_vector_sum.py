@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('topic_analyzer', '0004_reformat_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cluster',
+            name='vector_sum',
+            field=models.TextField(default='[]'),
+        ),
+    ]
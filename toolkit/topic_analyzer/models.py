@@ -1,7 +1,6 @@
 # Create your models here.
 import json
 import logging
-import os
 import pathlib
 import secrets
 from typing import List
@@ -21,6 +20,8 @@ from toolkit.model_constants import CommonModelMixin
 from toolkit.settings import BASE_DIR, CELERY_LONG_TERM_TASK_QUEUE, ERROR_LOGGER, RELATIVE_MODELS_PATH
 from texta_tools.text_processor import StopWords
 from toolkit.topic_analyzer.choices import CLUSTERING_ALGORITHMS, VECTORIZERS
+from toolkit.topic_analyzer.clustering import ClusterContent
+from toolkit.topic_analyzer.vector_store import DocumentVectorStore
 
 
 class Cluster(models.Model):
@@ -31,6 +32,8 @@ class Cluster(models.Model):
     indices = models.TextField(default="[]")
     significant_words = models.TextField(default="[]")
     intracluster_similarity = models.FloatField()
+    # JSON list of the sum of the normalized document vectors, which the intracluster similarity is updated from.
+    vector_sum = models.TextField(default="[]")
 
 
     @staticmethod
@@ -71,6 +74,27 @@ class Cluster(models.Model):
         return len(documents)
 
 
+    def update_documents(self, document_ids: List[str], vectors_filepath: str, new_documents: List[dict] = [], phraser=None):
+        """
+        Replaces the documents of the cluster and updates its intracluster similarity
+        from the vector sum of the previous documents with the vectors of the changed ones.
+        Args:
+            document_ids: IDs of all the documents of the cluster after the change.
+            vectors_filepath: Path to the document vectors of the clustering.
+            new_documents: Documents as dictionaries of id and text that don't have vectors yet.
+            phraser: Phraser of the embedding the clustering was made with.
+        """
+        cluster_content = ClusterContent(document_ids, vectors_filepath=vectors_filepath)
+        self.intracluster_similarity = cluster_content.get_intracluster_similarity(
+            new_documents=new_documents,
+            phraser=phraser,
+            previous_doc_ids=json.loads(self.document_ids),
+            previous_vector_sum=json.loads(self.vector_sum)
+        )
+        self.document_ids = json.dumps(document_ids)
+        self.vector_sum = json.dumps(cluster_content.vector_sum.tolist())
+
+
 class ClusteringResult(CommonModelMixin):
     query = models.TextField(default=json.dumps(EMPTY_QUERY))
     clustering_algorithm = models.CharField(max_length=100, default=CLUSTERING_ALGORITHMS[0][0])
@@ -142,7 +166,6 @@ def auto_delete_file_on_delete(sender, instance: ClusteringResult, **kwargs):
     """
     try:
         if instance.vector_model:
-            if os.path.isfile(instance.vector_model.path):
-                os.remove(instance.vector_model.path)
+            DocumentVectorStore.remove(instance.vector_model.path)
     except Exception as e:
         logging.getLogger(ERROR_LOGGER).exception(e)
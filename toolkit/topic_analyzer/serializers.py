@@ -48,7 +48,7 @@ class ClusterSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Cluster
-        fields = "__all__"
+        exclude = ("vector_sum",)
 
 
 class ClusteringSerializer(FieldParseSerializer, serializers.ModelSerializer, CommonModelSerializerMixin, IndicesSerializerMixin):
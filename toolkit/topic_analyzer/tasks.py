@@ -146,6 +146,7 @@ def save_clustering_results(clustering_result: dict):
 
         sw = Cluster.get_significant_words(indices=indices, document_ids=document_ids, fields=fields, stop_words=stop_words, exclude=significant_words_filter)
         cluster_content = ClusterContent(document_ids, vectors_filepath=vectors_filepath)
+        intracluster_similarity = cluster_content.get_intracluster_similarity()
 
         label = Cluster.objects.create(
             significant_words=json.dumps(sw),
@@ -154,7 +155,8 @@ def save_clustering_results(clustering_result: dict):
             fields=json.dumps(fields),
             display_fields=json.dumps(display_fields),
             indices=json.dumps(indices),
-            intracluster_similarity=cluster_content.get_intracluster_similarity()
+            intracluster_similarity=intracluster_similarity,
+            vector_sum=json.dumps(cluster_content.vector_sum.tolist())
         )
 
         clusters.append(label)
@@ -0,0 +1,110 @@
+import os
+import pickle
+import tempfile
+
+import numpy as np
+from django.test import TestCase
+from scipy import sparse
+from sklearn.metrics.pairwise import cosine_similarity
+
+from toolkit.topic_analyzer.clustering import ClusterContent
+from toolkit.topic_analyzer.vector_store import DocumentVectorStore
+
+
+class DocumentVectorStoreTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "vectors")
+        self.doc_ids = ["c", "a", "document_b", "ä"]
+        self.vectors = sparse.random(len(self.doc_ids), 20, density=0.3, format="csr", random_state=1)
+        self.models = {"tfidf_model": None, "lsi_model": None, "dictionary": {"word": 0}}
+        DocumentVectorStore.write(self.file_path, self.doc_ids, self.vectors, self.models)
+
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+
+    def test_vectors_are_read_by_document_ids(self):
+        store = DocumentVectorStore.open(self.file_path)
+        self.assertEqual(len(store), 4)
+        self.assertIsInstance(store.data, np.memmap)
+        vectors = store.get_vectors(["ä", "c"])
+        self.assertEqual(vectors.shape, (2, 20))
+        self.assertTrue(np.array_equal(vectors.toarray(), self.vectors[[3, 0]].toarray()))
+        self.assertEqual(store.get_models(), self.models)
+        for missing_id in ["b", "document", "document_bb", "ö"]:
+            with self.assertRaises(KeyError):
+                store.get_vectors([missing_id])
+
+
+    def test_added_vectors_replace_the_existing_ones(self):
+        store = DocumentVectorStore.open(self.file_path)
+        new_vectors = sparse.csr_matrix(np.arange(40, dtype=float).reshape(2, 20))
+        store = store.add_vectors(["a", "new_document"], new_vectors)
+        for store in [store, DocumentVectorStore.open(self.file_path)]:
+            self.assertEqual(len(store), 5)
+            self.assertTrue(np.array_equal(store.get_vectors(["a", "new_document"]).toarray(), new_vectors.toarray()))
+            self.assertTrue(np.array_equal(store.get_vectors(["new_document", "c", "a"]).toarray(), sparse.vstack([new_vectors[1], self.vectors[0], new_vectors[0]]).toarray()))
+            self.assertEqual(store.get_models(), self.models)
+        # Vectors are appended to a side file instead of writing the store again.
+        self.assertEqual(store.generation, DocumentVectorStore.open(self.file_path).generation)
+        self.assertEqual(sorted(os.listdir(self.directory.name)), sorted(["vectors", os.path.basename(store.added_path)]))
+
+
+    def test_added_vectors_of_concurrent_stores_are_merged(self):
+        first_store = DocumentVectorStore.open(self.file_path)
+        second_store = DocumentVectorStore.open(self.file_path)
+        first_vectors = sparse.random(1, 20, density=0.5, format="csr", random_state=3)
+        second_vectors = sparse.random(1, 20, density=0.5, format="csr", random_state=4)
+        first_store.add_vectors(["first"], first_vectors)
+        second_store = second_store.add_vectors(["second"], second_vectors)
+        self.assertEqual(len(second_store), 6)
+        self.assertTrue(np.array_equal(second_store.get_vectors(["first", "second"]).toarray(), sparse.vstack([first_vectors, second_vectors]).toarray()))
+
+        # New models write the main file again with the added vectors.
+        new_models = {**self.models, "dictionary": {"word": 0, "new_word": 1}}
+        store = second_store.add_vectors(["a"], first_vectors, models=new_models)
+        self.assertEqual(os.listdir(self.directory.name), ["vectors"])
+        self.assertFalse(store.added)
+        self.assertEqual(len(store), 6)
+        self.assertTrue(np.array_equal(store.get_vectors(["a", "first", "second", "c"]).toarray(), sparse.vstack([first_vectors, first_vectors, second_vectors, self.vectors[0]]).toarray()))
+        self.assertEqual(store.get_models(), new_models)
+
+
+    def test_store_keeps_reading_its_file_after_it_is_replaced(self):
+        store = DocumentVectorStore.open(self.file_path)
+        new_models = {**self.models, "dictionary": {"word": 0, "new_word": 1}}
+        DocumentVectorStore.open(self.file_path).add_vectors(["new_document"], sparse.random(1, 20, density=0.5, format="csr"), models=new_models)
+        self.assertEqual(store.get_models(), self.models)
+        self.assertTrue(np.array_equal(store.get_vectors(["c"]).toarray(), self.vectors[0].toarray()))
+        self.assertEqual(DocumentVectorStore.open(self.file_path).get_models(), new_models)
+
+
+    def test_pickled_vector_files_are_converted(self):
+        dense_vectors = self.vectors.toarray()
+        with open(self.file_path, "wb") as fp:
+            pickle.dump({**self.models, "doc_vectors": dict(zip(self.doc_ids, dense_vectors))}, fp)
+        store = DocumentVectorStore.open(self.file_path)
+        self.assertTrue(np.array_equal(store.get_vectors(self.doc_ids).toarray(), dense_vectors))
+        self.assertEqual(store.get_models(), self.models)
+        # The file is in the new format after the first read.
+        self.assertEqual(DocumentVectorStore(self.file_path).get_models(), self.models)
+
+
+    def test_intracluster_similarity_is_updated_from_the_vector_sum(self):
+        doc_ids = [f"document_{i}" for i in range(50)]
+        vectors = sparse.random(len(doc_ids), 30, density=0.2, format="csr", random_state=2)
+        DocumentVectorStore.write(self.file_path, doc_ids, vectors, self.models)
+
+        cluster_content = ClusterContent(doc_ids[:20], vectors_filepath=self.file_path)
+        similarity = cluster_content.get_intracluster_similarity()
+        self.assertAlmostEqual(similarity, np.mean(cosine_similarity(vectors[:20])))
+
+        # Remove five documents and add ten, the last one twice.
+        changed_rows = list(range(5, 30)) + [29]
+        changed_content = ClusterContent([doc_ids[row] for row in changed_rows], vectors_filepath=self.file_path)
+        changed_similarity = changed_content.get_intracluster_similarity(previous_doc_ids=doc_ids[:20], previous_vector_sum=cluster_content.vector_sum.tolist())
+        self.assertAlmostEqual(changed_similarity, np.mean(cosine_similarity(vectors[changed_rows])))
+        self.assertTrue(np.allclose(changed_content.vector_sum, ClusterContent(changed_content.doc_ids, vectors_filepath=self.file_path).get_vector_sum(changed_content.doc_ids)))
@@ -0,0 +1,286 @@
+import json
+import os
+import pathlib
+import pickle
+import struct
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+# Start of the vector files, the older files are pickled dictionaries.
+MAGIC = b"TEXTA-DOCUMENT-VECTORS-1\n"
+# Sections of the file start at multiples of this for the memory mapped arrays.
+ALIGNMENT = 8
+# Added vectors are appended to a side file until there are more of them than this
+# or the given ratio of the rows of the main file, then both are merged into a new main file.
+ADDED_ROWS_MERGE_MIN = 1000
+ADDED_ROWS_MERGE_RATIO = 0.1
+
+_HEADER_LENGTH = struct.Struct("<Q")
+
+
+def _align(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+class DocumentVectorStore:
+    """
+    Vectors of the clustered documents as a CSR matrix in a single file, which consists of a JSON header and
+    the memory mapped arrays of the matrix, the sorted document ID-s with their rows and the pickled models.
+    Only the rows of the requested documents are read from the disk, the models are unpickled when vectorizing new documents.
+    Vectors added afterwards are appended to a side file of the main file, so that adding documents doesn't rewrite the store.
+    """
+
+
+    def __init__(self, file_path: str):
+        self.file_path = str(file_path)
+        self.header, self.data_start = self._read_header(self.file_path)
+        if self.header is None:
+            raise ValueError(f"File {self.file_path} is not a document vector file.")
+        self.shape = tuple(self.header["shape"])
+
+        self.data = self._map("data")
+        self.indices = self._map("indices")
+        self.indptr = self._map("indptr")
+        self.ids = self._map("ids")
+        self.id_rows = self._map("id_rows")
+        # The models are mapped as well, so that the store keeps reading its own file after it has been replaced.
+        self.models_data = self._map("models")
+
+        # Files written before the side files have no generation, vectors are added to them by writing them again.
+        self.generation = self.header.get("generation")
+        self.added_path = self._get_added_path(self.file_path, self.generation) if self.generation else None
+        self.added: Dict[str, sparse.csr_matrix] = {}
+        self.added_new_count = 0
+        self._added_offset = 0
+        self._read_added()
+
+
+    def __len__(self):
+        return len(self.ids) + self.added_new_count
+
+
+    @classmethod
+    def open(cls, file_path: str) -> "DocumentVectorStore":
+        """Opens the vector file, the pickled files of the older versions are converted the first time they're opened."""
+        with open(file_path, "rb") as fp:
+            is_store = fp.read(len(MAGIC)) == MAGIC
+        if not is_store:
+            with open(file_path, "rb") as fp:
+                models = pickle.load(fp)
+            doc_vectors = models.pop("doc_vectors")
+            vectors = sparse.csr_matrix(np.vstack(list(doc_vectors.values()))) if doc_vectors else sparse.csr_matrix((0, 0))
+            cls.write(file_path, list(doc_vectors.keys()), vectors, models)
+        return cls(file_path)
+
+
+    @staticmethod
+    def _read_header(file_path: str) -> Tuple[Optional[dict], int]:
+        """Returns the header of the vector file and the position of its first section, the header is None for other files."""
+        with open(file_path, "rb") as fp:
+            if fp.read(len(MAGIC)) != MAGIC:
+                return None, 0
+            header_length, = _HEADER_LENGTH.unpack(fp.read(_HEADER_LENGTH.size))
+            header = json.loads(fp.read(header_length).decode("utf8"))
+        return header, _align(len(MAGIC) + _HEADER_LENGTH.size + header_length)
+
+
+    @staticmethod
+    def _get_added_path(file_path: str, generation: str) -> str:
+        file_path = pathlib.Path(file_path)
+        return str(file_path.with_name(f".{file_path.name}.{generation}.added"))
+
+
+    @staticmethod
+    def _get_existing_added_path(file_path: str) -> Optional[str]:
+        """Returns the path of the side file of the current version of the vector file."""
+        if not os.path.isfile(file_path):
+            return None
+        header, data_start = DocumentVectorStore._read_header(file_path)
+        if header and header.get("generation"):
+            return DocumentVectorStore._get_added_path(file_path, header["generation"])
+        return None
+
+
+    @staticmethod
+    def remove(file_path: str):
+        """Removes the vector file with its side file."""
+        added_path = DocumentVectorStore._get_existing_added_path(file_path)
+        if added_path and os.path.exists(added_path):
+            os.remove(added_path)
+        if os.path.isfile(file_path):
+            os.remove(file_path)
+
+
+    @staticmethod
+    def write(file_path: str, doc_ids: List[str], vectors: sparse.spmatrix, models: dict):
+        """
+        Writes the vectors with the models into the file, the file is replaced only once it's complete.
+        Rows of repeated document ID-s replace the earlier ones like in a dictionary.
+        """
+        vectors = sparse.csr_matrix(vectors)
+        rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        sorted_ids = sorted(rows)
+        max_id_length = max((len(doc_id) for doc_id in sorted_ids), default=1)
+        arrays = {
+            "data": vectors.data,
+            "indices": vectors.indices,
+            "indptr": vectors.indptr,
+            "ids": np.array(sorted_ids, dtype=f"<U{max(max_id_length, 1)}"),
+            "id_rows": np.array([rows[doc_id] for doc_id in sorted_ids], dtype=np.int64)
+        }
+        sections = {}
+        position = 0
+        for name, array in arrays.items():
+            sections[name] = {"offset": position, "dtype": array.dtype.str, "count": len(array)}
+            position = _align(position + array.nbytes)
+        models_bytes = pickle.dumps(models)
+        sections["models"] = {"offset": position, "size": len(models_bytes)}
+
+        header = json.dumps({"shape": list(vectors.shape), "sections": sections, "generation": uuid.uuid4().hex}).encode("utf8")
+        data_start = _align(len(MAGIC) + _HEADER_LENGTH.size + len(header))
+
+        file_path = pathlib.Path(file_path)
+        part_path = file_path.with_name(f".{file_path.name}.{os.getpid()}.part")
+        try:
+            with open(part_path, "wb") as fp:
+                fp.write(MAGIC)
+                fp.write(_HEADER_LENGTH.pack(len(header)))
+                fp.write(header)
+                for name, array in arrays.items():
+                    fp.seek(data_start + sections[name]["offset"])
+                    fp.write(np.ascontiguousarray(array).tobytes())
+                fp.seek(data_start + sections["models"]["offset"])
+                fp.write(models_bytes)
+            old_added_path = DocumentVectorStore._get_existing_added_path(str(file_path))
+            # Readers that have the old file mapped keep reading it.
+            os.replace(part_path, file_path)
+            # The added vectors of the old file are either merged into the new one or replaced by it.
+            if old_added_path and os.path.exists(old_added_path):
+                os.remove(old_added_path)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+
+
+    def _map(self, name: str) -> np.ndarray:
+        section = self.header["sections"][name]
+        # The pickled models are mapped as bytes.
+        dtype = np.dtype(section.get("dtype", np.uint8))
+        count = section.get("count", section.get("size"))
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.file_path, dtype=dtype, mode="r", offset=self.data_start + section["offset"], shape=(count,))
+
+
+    def _read_added(self):
+        """Reads the vectors appended to the side file since it was last read, an incomplete last record is left for the next read."""
+        if not self.added_path or not os.path.exists(self.added_path):
+            return
+        with open(self.added_path, "rb") as fp:
+            fp.seek(self._added_offset)
+            content = fp.read()
+        position = 0
+        while position + _HEADER_LENGTH.size <= len(content):
+            record_length, = _HEADER_LENGTH.unpack_from(content, position)
+            record_end = position + _HEADER_LENGTH.size + record_length
+            if record_end > len(content):
+                break
+            doc_ids, vectors = pickle.loads(content[position + _HEADER_LENGTH.size:record_end])
+            for row, doc_id in enumerate(doc_ids):
+                if doc_id not in self.added and not self._has_row(doc_id):
+                    self.added_new_count += 1
+                self.added[doc_id] = vectors[row]
+            position = record_end
+        self._added_offset += position
+
+
+    def _has_row(self, doc_id: str) -> bool:
+        """Whether the document has a row in the main file."""
+        position = np.searchsorted(self.ids, doc_id) if len(self.ids) else 0
+        return position < len(self.ids) and self.ids[position] == doc_id
+
+
+    def get_rows(self, doc_ids: List[str]) -> np.ndarray:
+        """Returns the rows of the documents in the main file, raises a KeyError for documents without vectors."""
+        if not len(self.ids):
+            if doc_ids:
+                raise KeyError(doc_ids[0])
+            return np.empty(0, dtype=np.int64)
+        positions = np.searchsorted(self.ids, doc_ids)
+        rows = []
+        for doc_id, position in zip(doc_ids, positions):
+            # The ID-s are compared as they are, longer ones are truncated by the search.
+            if position >= len(self.ids) or self.ids[position] != doc_id:
+                raise KeyError(doc_id)
+            rows.append(self.id_rows[position])
+        return np.array(rows, dtype=np.int64)
+
+
+    def get_vectors(self, doc_ids: List[str]) -> sparse.csr_matrix:
+        """Returns the vectors of the documents as rows of a CSR matrix in the order of the ID-s."""
+        main_ids = [doc_id for doc_id in doc_ids if doc_id not in self.added]
+        rows = self.get_rows(main_ids)
+        starts = self.indptr[rows]
+        ends = self.indptr[rows + 1]
+        indptr = np.concatenate(([0], np.cumsum(ends - starts)))
+        data = np.concatenate([self.data[start:end] for start, end in zip(starts, ends)]) if len(rows) else np.empty(0, dtype=self.data.dtype)
+        indices = np.concatenate([self.indices[start:end] for start, end in zip(starts, ends)]) if len(rows) else np.empty(0, dtype=self.indices.dtype)
+        vectors = sparse.csr_matrix((data, indices, indptr), shape=(len(rows), self.shape[1]))
+        if len(main_ids) == len(doc_ids):
+            return vectors
+
+        # Rows of the added vectors follow the rows of the main file, the order of the ID-s is restored by indexing.
+        added_vectors = [self.added[doc_id] for doc_id in doc_ids if doc_id in self.added]
+        order = []
+        main_count, added_count = 0, 0
+        for doc_id in doc_ids:
+            if doc_id in self.added:
+                order.append(len(main_ids) + added_count)
+                added_count += 1
+            else:
+                order.append(main_count)
+                main_count += 1
+        return sparse.vstack([vectors] + added_vectors, format="csr")[order]
+
+
+    def get_models(self) -> dict:
+        """Returns the models the vectors were created with."""
+        return pickle.loads(self.models_data)
+
+
+    def _should_merge(self, added_count: int) -> bool:
+        return len(self.added) + added_count > max(ADDED_ROWS_MERGE_MIN, ADDED_ROWS_MERGE_RATIO * len(self.ids))
+
+
+    def add_vectors(self, doc_ids: List[str], vectors: sparse.spmatrix, models: Optional[Dict] = None) -> "DocumentVectorStore":
+        """
+        Adds or replaces the vectors of the documents and returns the store with them.
+        The vectors are appended to the side file, the main file is written again only with new models
+        or once the side file has grown too large compared to it.
+        """
+        vectors = sparse.csr_matrix(vectors)
+        if len(self) and vectors.shape[1] != self.shape[1]:
+            raise ValueError(f"Vectors of {vectors.shape[1]} dimensions can't be added to vectors of {self.shape[1]} dimensions.")
+
+        header, data_start = self._read_header(self.file_path)
+        if header is None or header.get("generation") != self.generation:
+            # The file has been written again since it was opened, the vectors are added to the new one.
+            return DocumentVectorStore(self.file_path).add_vectors(doc_ids, vectors, models=models)
+
+        if models is not None or not self.added_path or not len(self) or self._should_merge(len(doc_ids)):
+            models = models if models is not None else self.get_models()
+            all_ids = self.ids.tolist() + list(self.added)
+            all_vectors = self.get_vectors(all_ids)
+            self.write(self.file_path, all_ids + list(doc_ids), sparse.vstack([all_vectors, vectors]) if all_vectors.shape[0] else vectors, models)
+            return DocumentVectorStore(self.file_path)
+
+        record = pickle.dumps((list(doc_ids), vectors))
+        # Records are written with a single append, so that concurrent writers don't interleave them.
+        with open(self.added_path, "ab") as fp:
+            fp.write(_HEADER_LENGTH.pack(len(record)) + record)
+        self._read_added()
+        return self
@@ -19,7 +19,6 @@ from toolkit.core.task.models import Task
 from toolkit.elastic.index.models import Index
 from toolkit.topic_analyzer.models import Cluster, ClusteringResult
 from toolkit.topic_analyzer.serializers import ClusterSerializer, ClusteringIdsSerializer, ClusteringSerializer, TransferClusterDocumentsSerializer
-from .clustering import ClusterContent
 from .tasks import tag_cluster
 from texta_elastic.document import ElasticDocument
 from texta_elastic.searcher import ElasticSearcher
@@ -72,15 +71,14 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
             validated_docs = ed.get_bulk(document_ids)
             if validated_docs:
                 unique_ids = list(set([index["_id"] for index in validated_docs]))
-                cluster.document_ids = json.dumps(unique_ids)
 
                 sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=unique_ids, stop_words=stop_words)
                 cluster.significant_words = json.dumps(sw)
 
-                cluster_content = ClusterContent(unique_ids, vectors_filepath=clustering_object.vector_model.name)
-                cluster.intracluster_similarity = cluster_content.get_intracluster_similarity()
+                cluster.update_documents(unique_ids, vectors_filepath=clustering_object.vector_model.name)
             else:
                 cluster.document_ids = json.dumps([])
+                cluster.vector_sum = json.dumps([])
 
         cluster.save()
         return Response({"message": "Cluster has been updated successfully!"})
@@ -145,11 +143,9 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
             if (len(to_transfer) > 0):
                 # Remove the documents to be transferred from the original cluster.
                 remaining_documents = [doc_id for doc_id in cluster_documents if doc_id not in to_transfer]
-                cluster_obj.document_ids = json.dumps(remaining_documents)
 
                 # Save the new similarity score.
-                cc = ClusterContent(doc_ids=remaining_documents, vectors_filepath=clustering_obj.vector_model.path)
-                cluster_obj.intracluster_similarity = float(cc.get_intracluster_similarity())
+                cluster_obj.update_documents(remaining_documents, vectors_filepath=clustering_obj.vector_model.path)
 
                 # Edit the significant words of the cluster from which we took the documents from.
                 sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=remaining_documents, stop_words=stop_words)
@@ -193,11 +189,9 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
         # Save the new list of document ids.
         cluster_documents = json.loads(current_cluster_obj.document_ids)
         expanded_ids = cluster_documents + documents_for_expanding
-        current_cluster_obj.document_ids = json.dumps(expanded_ids)
 
         # Update the similarity score since the documents were changed.
-        cc = ClusterContent(doc_ids=expanded_ids, vectors_filepath=clustering_obj.vector_model.path)
-        current_cluster_obj.intracluster_similarity = float(cc.get_intracluster_similarity(new_documents=to_add_documents_texts, phraser=phraser))
+        current_cluster_obj.update_documents(expanded_ids, vectors_filepath=clustering_obj.vector_model.path, new_documents=to_add_documents_texts, phraser=phraser)
 
         # Update the significant words since the documents were changed.
         sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=expanded_ids, stop_words=stop_words)
@@ -224,11 +218,9 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
         # Remove the documents from the initial cluster.
         saved_documents = json.loads(cluster_obj.document_ids)
         unique_ids = list(set([document for document in saved_documents if document not in documents_to_transfer]))
-        cluster_obj.document_ids = json.dumps(unique_ids)
 
         # Save the new similarity score.
-        cc = ClusterContent(doc_ids=unique_ids, vectors_filepath=clustering_obj.vector_model.path)
-        cluster_obj.intracluster_similarity = float(cc.get_intracluster_similarity())
+        cluster_obj.update_documents(unique_ids, vectors_filepath=clustering_obj.vector_model.path)
 
         # Edit the significant words of the cluster from which you took the documents from.
         sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=unique_ids, stop_words=stop_words)
@@ -240,11 +232,9 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
         cluster_for_transfer = Cluster.objects.get(pk=serializer.validated_data["receiving_cluster_id"])
         cluster_documents = json.loads(cluster_for_transfer.document_ids)
         unique_ids = list(set(cluster_documents + documents_to_transfer))
-        cluster_for_transfer.document_ids = json.dumps(unique_ids)
 
         # Update the score.
-        cc = ClusterContent(doc_ids=unique_ids, vectors_filepath=clustering_obj.vector_model.path)
-        cluster_for_transfer.intracluster_similarity = float(cc.get_intracluster_similarity())
+        cluster_for_transfer.update_documents(unique_ids, vectors_filepath=clustering_obj.vector_model.path)
 
         # Edit the significant words of the cluster from which you took the documents from.
         sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=unique_ids, stop_words=stop_words)
@@ -274,7 +264,6 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
 
         saved_documents = json.loads(cluster_obj.document_ids)
         unique_ids = list(set(existing_documents + saved_documents))
-        cluster_obj.document_ids = json.dumps(unique_ids)
 
         # get texts of new documents
         new_documents = []
@@ -310,8 +299,7 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
                 phraser = None
 
         # Update the similarity score since the documents were changed.
-        cc = ClusterContent(doc_ids=unique_ids, vectors_filepath=clustering_obj.vector_model.path)
-        cluster_obj.intracluster_similarity = float(cc.get_intracluster_similarity(new_documents=new_documents, phraser=phraser))
+        cluster_obj.update_documents(unique_ids, vectors_filepath=clustering_obj.vector_model.path, new_documents=new_documents, phraser=phraser)
 
         # Update the significant words since the documents were changed.
         sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=unique_ids, stop_words=stop_words)
@@ -337,11 +325,9 @@ class ClusterViewSet(mixins.RetrieveModelMixin, mixins.UpdateModelMixin, mixins.
         # Edit the changed document ids, removing duplicates.
         saved_documents = json.loads(cluster_obj.document_ids)
         filtered_documents = list(set([document for document in saved_documents if document not in serializer.validated_data["ids"]]))
-        cluster_obj.document_ids = json.dumps(filtered_documents)
 
         # Edit the similarity score bc the set of documents have been changed.
-        cc = ClusterContent(doc_ids=filtered_documents, vectors_filepath=clustering_obj.vector_model.path)
-        cluster_obj.intracluster_similarity = float(cc.get_intracluster_similarity())
+        cluster_obj.update_documents(filtered_documents, vectors_filepath=clustering_obj.vector_model.path)
 
         # Edit the significant words since the documents aren't the same anymore.
         sw = Cluster.get_significant_words(indices=indices, fields=fields, document_ids=filtered_documents, stop_words=stop_words)
@@ -0,0 +1,68 @@
+from typing import List, Optional
+
+import torch
+from texta_torch_tagger.models.fasttext.model import fastText
+from texta_torch_tagger.models.rcnn.model import RCNN
+from texta_torch_tagger.models.text_rnn.model import TextRNN
+from torch.nn.utils.rnn import pack_padded_sequence, pad_packed_sequence
+
+
+PADDED_MODELS = (fastText, TextRNN, RCNN)
+
+
+def supports_padding(model: torch.nn.Module) -> bool:
+    """Whether texts of different lengths can be predicted in the same batch with the model."""
+    return isinstance(model, PADDED_MODELS)
+
+
+def get_batches(tokenized_texts: List[List[str]], batch_size: int, padded: bool) -> List[List[int]]:
+    """
+    Returns the indices of the texts in mini-batches. Padded batches consist of texts of similar length,
+    other batches of texts with equal token counts. Texts without tokens can't be packed, so they're never padded.
+    """
+    buckets = {}
+    for text_index, tokens in enumerate(tokenized_texts):
+        key = -1 if padded and tokens else len(tokens)
+        buckets.setdefault(key, []).append(text_index)
+
+    batches = []
+    for text_indices in buckets.values():
+        text_indices = sorted(text_indices, key=lambda text_index: len(tokenized_texts[text_index]))
+        batches.extend(text_indices[start:start + batch_size] for start in range(0, len(text_indices), batch_size))
+    return batches
+
+
+def forward_padded(model: torch.nn.Module, texts: torch.Tensor, lengths: torch.Tensor) -> Optional[torch.Tensor]:
+    """
+    Forward pass of the models of texta-torch-tagger on a padded batch of shape (max_length, batch_size),
+    which ignores the padding so that the outputs are equal to the ones of the texts predicted one by one.
+    The averages and max-pools are masked and the LSTMs get packed sequences.
+    """
+    embedded = model.embeddings(texts)
+    positions = torch.arange(texts.shape[0], device=texts.device).unsqueeze(1)
+    # mask.shape = (max_length, batch_size, 1)
+    mask = (positions < lengths.to(texts.device).unsqueeze(0)).unsqueeze(2)
+
+    if isinstance(model, fastText):
+        mean = (embedded * mask).sum(0) / lengths.to(embedded.device, embedded.dtype).unsqueeze(1)
+        return model.softmax(model.fc2(model.fc1(mean)))
+
+    packed = pack_padded_sequence(embedded, lengths.cpu(), enforce_sorted=False)
+    if isinstance(model, TextRNN):
+        # Final states are of the last tokens of the texts, returned in the order of the batch.
+        lstm_out, (h_n, c_n) = model.lstm(packed)
+        final_feature_map = model.dropout(h_n)
+        final_feature_map = torch.cat([final_feature_map[i, :, :] for i in range(final_feature_map.shape[0])], dim=1)
+        return model.softmax(model.fc(final_feature_map))
+
+    if isinstance(model, RCNN):
+        lstm_out, (h_n, c_n) = model.lstm(packed)
+        lstm_out, _ = pad_packed_sequence(lstm_out, total_length=texts.shape[0])
+        input_features = torch.cat([lstm_out, embedded], 2).permute(1, 0, 2)
+        linear_output = model.tanh(model.W(input_features))
+        # Padding never wins the max-pool over the positions.
+        linear_output = linear_output.masked_fill(~mask.permute(1, 0, 2), float("-inf"))
+        max_out_features = linear_output.max(dim=1).values
+        return model.softmax(model.fc(model.dropout(max_out_features)))
+
+    return None
@@ -5,6 +5,7 @@ DEFAULT_MIN_SAMPLE_SIZE = 50
 DEFAULT_NEGATIVE_MULTIPLIER = 1
 DEFAULT_NUM_EPOCHS = 5
 DEFAULT_VALIDATION_SPLIT = 0.8
+DEFAULT_INFERENCE_BATCH_SIZE = 128
 
 DEFAULT_REPORT_IGNORE_FIELDS = ["true_positive_rate", "false_positive_rate"]
 
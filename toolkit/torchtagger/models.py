@@ -7,6 +7,8 @@ import tempfile
 import zipfile
 from typing import Dict, List, Union
 
+import numpy as np
+import torch
 from django.contrib.auth.models import User
 from django.core import serializers
 from django.db import models, transaction
@@ -25,6 +27,7 @@ from toolkit.embedding.models import Embedding
 from toolkit.model_constants import CommonModelMixin, FavoriteModelMixin
 from toolkit.settings import BASE_DIR, CELERY_LONG_TERM_TASK_QUEUE, RELATIVE_MODELS_PATH
 from toolkit.torchtagger import choices
+from toolkit.torchtagger.batch_inference import forward_padded, get_batches, supports_padding
 
 
 class TorchTagger(FavoriteModelMixin, CommonModelMixin):
@@ -241,6 +244,38 @@ class TorchTagger(FavoriteModelMixin, CommonModelMixin):
         return prediction
 
 
+    def apply_loaded_tagger_on_texts(self, tagger: TextTorchTagger, texts: List[str], batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE) -> List[dict]:
+        """
+        Predict with loaded tagger on a batch of texts, one forward pass per mini-batch.
+        The models average or recur over every position of the input, so texts of similar length are padded
+        into the same batch and the padding is masked out to keep the predictions identical to the ones of tag_text.
+        Models which can't ignore the padding only batch texts with equal token counts.
+        Predictions are returned in the order of the input texts.
+        """
+        tokenized_texts = [tagger.text_field.preprocess(tagger.text_processor.process(text)) for text in texts]
+        padded = supports_padding(tagger.model)
+
+        predictions = [None] * len(texts)
+        for batch_indices in get_batches(tokenized_texts, batch_size, padded=padded):
+            batch_tokens = [tokenized_texts[text_index] for text_index in batch_indices]
+            processed_texts = tagger.text_field.process(batch_tokens)
+            if torch.cuda.is_available():
+                processed_texts = processed_texts.to('cuda')
+            with torch.no_grad():
+                if padded and batch_tokens[0]:
+                    outputs = forward_padded(tagger.model, processed_texts, torch.tensor([len(tokens) for tokens in batch_tokens]))
+                else:
+                    outputs = tagger.model(processed_texts)
+            for text_index, text_output in zip(batch_indices, outputs):
+                label_index = text_output.argmax().item()
+                predictions[text_index] = {
+                    'probability': np.exp(text_output[label_index].item()),
+                    'tagger_id': self.pk,
+                    'result': tagger.label_reverse_index[label_index]
+                }
+        return predictions
+
+
 @receiver(models.signals.post_delete, sender=TorchTagger)
 def auto_delete_torchtagger_on_delete(sender, instance: TorchTagger, **kwargs):
     """
@@ -16,6 +16,12 @@ class ApplyTaggerSerializer(FieldParseSerializer, IndicesSerializerMixin, Elasti
     new_fact_value = serializers.CharField(required=False, default="", help_text="NB! Only applicable for binary taggers! Used as fact value when applying the tagger. Defaults to tagger description (binary) / tagger result (multiclass).")
     fields = serializers.ListField(required=True, child=serializers.CharField(), help_text="Which fields to extract the text from.")
     query = serializers.JSONField(help_text="Filter the documents which to scroll and apply to.", default=EMPTY_QUERY)
+    inference_batch_size = serializers.IntegerField(
+        min_value=1,
+        max_value=10000,
+        default=choices.DEFAULT_INFERENCE_BATCH_SIZE,
+        help_text=f"How many texts are passed through the model at once. Default:{choices.DEFAULT_INFERENCE_BATCH_SIZE}."
+    )
 
 
 class EpochReportSerializer(serializers.Serializer):
@@ -7,19 +7,19 @@ from typing import Dict, List, Union
 
 from celery.decorators import task
 from django.db import connections
-from elasticsearch.helpers import streaming_bulk
 from texta_elastic.core import ElasticCore
-from texta_elastic.document import ElasticDocument
-from texta_elastic.searcher import ElasticSearcher
 from texta_embedding.embedding import W2VEmbedding
 from texta_torch_tagger.tagger import TorchTagger
 
 from toolkit.base_tasks import TransactionAwareTask
+from toolkit.elastic.tools.apply_to_index import index_applier
 from toolkit.elastic.tools.data_sample import DataSample
+from toolkit.elastic.tools.tasks import apply_to_index
 from toolkit.helper_functions import get_indices_from_object
-from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, ERROR_LOGGER, INFO_LOGGER, RELATIVE_MODELS_PATH
+from toolkit.settings import CELERY_LONG_TERM_TASK_QUEUE, INFO_LOGGER, RELATIVE_MODELS_PATH
 from toolkit.tools.plots import create_tagger_plot
 from toolkit.tools.show_progress import ShowProgress
+from toolkit.torchtagger import choices
 from toolkit.torchtagger.models import TorchTagger as TorchTaggerObject
 
 
@@ -134,74 +134,59 @@ def to_texta_facts(tagger_result: List[Dict[str, Union[str, int, bool]]], field:
     return [new_fact]
 
 
-def update_generator(generator: ElasticSearcher, ec: ElasticCore, fields: List[str], fact_name: str, fact_value: str, tagger_object: TorchTaggerObject, tagger: TorchTagger = None):
-    for i, scroll_batch in enumerate(generator):
-        logging.getLogger(INFO_LOGGER).info(f"Appyling Torch Tagger with ID {tagger_object.id} to batch {i + 1}...")
-        for raw_doc in scroll_batch:
-            hit = raw_doc["_source"]
-            flat_hit = ec.flatten(hit)
-            existing_facts = hit.get("texta_facts", [])
+def apply_tagger_on_batch(tagger_object: TorchTaggerObject, tagger: TorchTagger, flat_hits: List[dict], fields: List[str], inference_batch_size: int) -> Dict[tuple, dict]:
+    """
+    Applies loaded tagger on every field of every document in the scroll batch in mini-batches of inference_batch_size.
+    Returns predictions keyed by the position of the document in the batch and the field name.
+    """
+    positions = []
+    texts = []
+    for doc_index, flat_hit in enumerate(flat_hits):
+        for field in fields:
+            text = flat_hit.get(field, None)
+            if text and isinstance(text, str):
+                positions.append((doc_index, field))
+                texts.append(text)
 
-            for field in fields:
-                text = flat_hit.get(field, None)
-                if text and isinstance(text, str):
+    predictions = tagger_object.apply_loaded_tagger_on_texts(tagger, texts, batch_size=inference_batch_size)
+    return dict(zip(positions, predictions))
 
-                    result = tagger_object.apply_loaded_tagger(tagger, text, input_type="text", feedback=False)
 
-                    # If tagger is binary and fact value is not specified by the user, use tagger description as fact value
-                    if result["result"] in ["true", "false"]:
-                        if not fact_value:
-                            fact_value = tagger_object.description
+@index_applier("torch_tagger")
+def get_tagger_batch_function(object_id: int, fields: List[str], fact_name: str, fact_value: str, inference_batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE):
+    tagger_object = TorchTaggerObject.objects.get(pk=object_id)
+    tagger = tagger_object.load_tagger()
+    ec = ElasticCore()
+
 
-                    # For multitag, use the prediction as fact value
-                    else:
-                        fact_value = result["result"]
+    def process_batch(sources: List[dict]) -> List[List[dict]]:
+        logging.getLogger(INFO_LOGGER).info(f"Appyling Torch Tagger with ID {object_id} to a batch of {len(sources)} documents...")
+        flat_hits = [ec.flatten(source) for source in sources]
+        batch_predictions = apply_tagger_on_batch(tagger_object, tagger, flat_hits, fields, inference_batch_size)
 
-                    new_facts = to_texta_facts(result, field, fact_name, fact_value, text)
-                    existing_facts.extend(new_facts)
+        batch_facts = [[] for _ in sources]
+        for (doc_index, field), result in batch_predictions.items():
+            # If tagger is binary and fact value is not specified by the user, use tagger description as fact value,
+            # for multitag, use the prediction as fact value.
+            if result["result"] in ["true", "false"]:
+                result_fact_value = fact_value or tagger_object.description
+            else:
+                result_fact_value = result["result"]
+            batch_facts[doc_index].extend(to_texta_facts(result, field, fact_name, result_fact_value, flat_hits[doc_index][field]))
+        return batch_facts
 
-            if existing_facts:
-                # Remove duplicates to avoid adding the same facts with repetitive use.
-                existing_facts = ElasticDocument.remove_duplicate_facts(existing_facts)
 
-            yield {
-                "_index": raw_doc["_index"],
-                "_id": raw_doc["_id"],
-                "_type": raw_doc.get("_type", "_doc"),
-                "_op_type": "update",
-                "_source": {"doc": {"texta_facts": existing_facts}}
-            }
+    return process_batch
 
 
 @task(name="apply_torch_tagger_to_index", base=TransactionAwareTask, queue=CELERY_LONG_TERM_TASK_QUEUE)
-def apply_tagger_to_index(object_id: int, indices: List[str], fields: List[str], fact_name: str, fact_value: str, query: dict, bulk_size: int, max_chunk_bytes: int, es_timeout: int):
+def apply_tagger_to_index(object_id: int, indices: List[str], fields: List[str], fact_name: str, fact_value: str, query: dict, bulk_size: int, max_chunk_bytes: int, es_timeout: int, inference_batch_size: int = choices.DEFAULT_INFERENCE_BATCH_SIZE):
     """Apply Torch Tagger to index."""
     try:
         tagger_object = TorchTaggerObject.objects.get(pk=object_id)
-        tagger = tagger_object.load_tagger()
-
         task_object = tagger_object.tasks.last()
-        progress = ShowProgress(task_object)
-
-        ec = ElasticCore()
-        [ec.add_texta_facts_mapping(index) for index in indices]
-
-        searcher = ElasticSearcher(
-            indices=indices,
-            field_data=fields + ["texta_facts"],  # Get facts to add upon existing ones.
-            query=query,
-            output=ElasticSearcher.OUT_RAW,
-            timeout=f"{es_timeout}m",
-            callback_progress=progress,
-            scroll_size=bulk_size
-        )
-
-        actions = update_generator(generator=searcher, ec=ec, fields=fields, fact_name=fact_name, fact_value=fact_value, tagger_object=tagger_object, tagger=tagger)
-        for success, info in streaming_bulk(client=ec.es, actions=actions, refresh="wait_for", chunk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, max_retries=3):
-            if not success:
-                logging.getLogger(ERROR_LOGGER).exception(json.dumps(info))
-
-        task_object.complete()
+        applier_kwargs = {"object_id": object_id, "fields": fields, "fact_name": fact_name, "fact_value": fact_value, "inference_batch_size": inference_batch_size}
+        apply_to_index("torch_tagger", applier_kwargs, task_object, indices=indices, fields=fields, query=query, bulk_size=bulk_size, max_chunk_bytes=max_chunk_bytes, es_timeout=es_timeout)
         return True
 
     except Exception as e:
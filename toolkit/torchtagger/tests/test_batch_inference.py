@@ -0,0 +1,41 @@
+import torch
+from django.test import TestCase
+from texta_torch_tagger.models.models import TORCH_MODELS
+
+from toolkit.torchtagger.batch_inference import forward_padded, get_batches, supports_padding
+
+
+class BatchInferenceTests(TestCase):
+
+    def setUp(self):
+        torch.manual_seed(1)
+        self.vocab_size = 50
+        self.lengths = [7, 1, 4, 7, 2, 12]
+        self.texts = [torch.randint(2, self.vocab_size, (length,)) for length in self.lengths]
+
+
+    def _get_model(self, model_name):
+        config = TORCH_MODELS[model_name]["config"]()
+        config.embed_size = 16
+        config.output_size = 3
+        model = TORCH_MODELS[model_name]["model"](config, self.vocab_size, torch.randn(self.vocab_size, config.embed_size), None)
+        model.eval()
+        return model
+
+
+    def test_padded_batch_equals_single_texts(self):
+        # Column of every text in a (max_length, batch_size) batch padded with the index 1.
+        padded_texts = torch.nn.utils.rnn.pad_sequence(self.texts, padding_value=1)
+        for model_name in TORCH_MODELS:
+            model = self._get_model(model_name)
+            self.assertTrue(supports_padding(model))
+            with torch.no_grad():
+                outputs = forward_padded(model, padded_texts, torch.tensor(self.lengths))
+                single_outputs = torch.cat([model(text.unsqueeze(1)) for text in self.texts])
+            self.assertTrue(torch.allclose(outputs, single_outputs, atol=1e-5), model_name)
+
+
+    def test_texts_of_similar_length_are_batched_together(self):
+        tokenized_texts = [["word"] * length for length in [3, 1, 0, 3, 2, 0, 5]]
+        self.assertEqual(get_batches(tokenized_texts, batch_size=2, padded=True), [[1, 4], [0, 3], [6], [2, 5]])
+        self.assertEqual(get_batches(tokenized_texts, batch_size=2, padded=False), [[0, 3], [1], [2, 5], [4], [6]])
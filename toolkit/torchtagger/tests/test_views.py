@@ -434,7 +434,8 @@ class TorchTaggerViewTests(APITransactionTestCase):
             "new_fact_name": self.new_fact_name,
             "new_fact_value": self.new_fact_value,
             "indices": [{"name": self.test_index_copy}],
-            "fields": TEST_FIELD_CHOICE
+            "fields": TEST_FIELD_CHOICE,
+            "inference_batch_size": 8
         }
         response = self.client.post(url, payload, format='json')
         print_output('test_apply_binary_torch_tagger_to_index:response.data', response.data)
@@ -9,6 +9,7 @@ from toolkit.core.health.views import HealthView
 from toolkit.core.project.views import (
     AggregateFactsView,
     DocumentView,
+    ExportSearchTaskView,
     ExportSearchView,
     GetFactsView,
     GetFieldsView,
@@ -114,6 +115,7 @@ urlpatterns = [
 
     # Previous projects extra actions.
     path('projects/<int:project_pk>/export_search/', ExportSearchView.as_view(), name="project-export-search"),
+    path('projects/<int:project_pk>/export_search/<int:task_pk>/', ExportSearchTaskView.as_view(), name="project-export-search-task"),
     path('projects/<int:project_pk>/document/', DocumentView.as_view(), name="project-document"),
     path('projects/<int:project_pk>/get_spam/', GetSpamView.as_view(), name="project-get-spam"),
     path('projects/<int:project_pk>/get_facts/', GetFactsView.as_view(), name="get_facts"),